@@ -0,0 +1,180 @@
+# asr_backends.py
+
+import os
+from abc import ABC, abstractmethod
+
+# Whisper model sizes, smallest first
+MODEL_SIZES = ('tiny', 'base', 'small', 'medium', 'large-v3')
+
+# Rough real-time factor (processing time / audio time) of each backend and model size
+# on a 4-core x86 CPU, used to pick the largest model that fits the configured RTF
+# budget. Refine them for new hardware with `python benchmark.py asr`.
+CPU_RTF_ESTIMATES = {
+    'whisper': {'tiny': 0.06, 'base': 0.12, 'small': 0.35, 'medium': 1.0, 'large-v3': 2.0},
+    'whisper-int8': {'tiny': 0.04, 'base': 0.07, 'small': 0.2, 'medium': 0.6, 'large-v3': 1.2},
+    'faster-whisper': {'tiny': 0.015, 'base': 0.03, 'small': 0.08, 'medium': 0.25, 'large-v3': 0.5}
+}
+# Approximate resident size in bytes of each model size in full precision; the int8
+# backends hold roughly a third of it. Used for the model registry's memory budget.
+MODEL_MEMORY_ESTIMATES = {
+    'tiny': 200 * 1024 ** 2, 'base': 350 * 1024 ** 2, 'small': 1024 ** 3,
+    'medium': 2.5 * 1024 ** 3, 'large-v3': 5 * 1024 ** 3
+}
+GPU_RTF_ESTIMATES = {'tiny': 0.01, 'base': 0.015, 'small': 0.03, 'medium': 0.06, 'large-v3': 0.1}
+REFERENCE_CPU_COUNT = 4
+
+# Fields of an openai-whisper segment dict, which every backend returns
+SEGMENT_FIELDS = ('id', 'seek', 'start', 'end', 'text', 'tokens', 'temperature',
+                  'avg_logprob', 'compression_ratio', 'no_speech_prob')
+
+
+class ASRBackend(ABC):
+    """A speech recognition engine that turns 16 kHz mono float32 audio into Whisper-style segments.
+
+    Subclasses load their model in ``load`` and return a list of segment dicts with at
+    least ``start``, ``end`` (seconds) and ``text`` from ``transcribe``. uses_torch
+    marks engines that run on torch, whose thread pool must be sized for them.
+    """
+    name = None
+    uses_torch = False
+
+    def __init__(self, model_name, device, threads=None):
+        self.model_name = model_name
+        self.device = str(device)
+        self.threads = threads or os.cpu_count() or 1
+        self.model = None
+
+    @abstractmethod
+    def load(self):
+        """Load the model and return self."""
+
+    @abstractmethod
+    def transcribe(self, audio):
+        """Return the segments of a 16 kHz mono float32 array."""
+
+    def fingerprint(self):
+        """Describe everything that affects the transcription output, for result caching."""
+        return {'engine': self.name, 'model': self.model_name}
+
+    def registry_key(self):
+        """Key identifying the loaded model in the model registry."""
+        return ('asr', self.name, self.model_name, self.device)
+
+    def memory_estimate(self):
+        """Approximate resident size of the loaded model in bytes."""
+        return int(MODEL_MEMORY_ESTIMATES.get(self.model_name, MODEL_MEMORY_ESTIMATES['medium']))
+
+
+class WhisperBackend(ASRBackend):
+    """openai-whisper in full precision (fp16 on GPU)."""
+    name = 'whisper'
+    uses_torch = True
+
+    def load(self):
+        import whisper
+        self.model = whisper.load_model(self.model_name, device=self.device)
+        return self
+
+    def transcribe(self, audio):
+        return self.model.transcribe(audio, language='en', fp16=self.device.startswith('cuda'))['segments']
+
+    def fingerprint(self):
+        import whisper
+        return dict(super().fingerprint(), version=getattr(whisper, '__version__', 'unknown'))
+
+
+class QuantizedWhisperBackend(WhisperBackend):
+    """openai-whisper on CPU with torch dynamic int8 quantization of its linear layers."""
+    name = 'whisper-int8'
+
+    def load(self):
+        import torch
+        import whisper
+        model = whisper.load_model(self.model_name, device='cpu')
+        # whisper wraps nn.Linear in a subclass that only casts weights to the input
+        # dtype; quantize_dynamic matches exact types, so expose them as plain nn.Linear
+        for module in model.modules():
+            if isinstance(module, torch.nn.Linear):
+                module.__class__ = torch.nn.Linear
+        self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.device = 'cpu'
+        return self
+
+    def transcribe(self, audio):
+        return self.model.transcribe(audio, language='en', fp16=False)['segments']
+
+    def registry_key(self):
+        return ('asr', self.name, self.model_name, 'cpu')
+
+    def memory_estimate(self):
+        return super().memory_estimate() // 3
+
+
+class FasterWhisperBackend(ASRBackend):
+    """CTranslate2 Whisper through faster-whisper, int8 on CPU and float16 on GPU."""
+    name = 'faster-whisper'
+
+    def __init__(self, model_name, device, threads=None):
+        super().__init__(model_name, device, threads)
+        self.compute_type = 'float16' if self.device.startswith('cuda') else 'int8'
+
+    def load(self):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise Exception("The faster-whisper backend requires the faster-whisper package.")
+        self.model = WhisperModel(
+            self.model_name,
+            device='cuda' if self.device.startswith('cuda') else 'cpu',
+            compute_type=self.compute_type,
+            cpu_threads=self.threads
+        )
+        return self
+
+    def transcribe(self, audio):
+        segments, _ = self.model.transcribe(audio, language='en', beam_size=5)
+        return [
+            {field: getattr(segment, field, None) for field in SEGMENT_FIELDS}
+            for segment in segments
+        ]
+
+    def memory_estimate(self):
+        return super().memory_estimate() // (2 if self.compute_type == 'float16' else 3)
+
+    def fingerprint(self):
+        import faster_whisper
+        return dict(super().fingerprint(), version=getattr(faster_whisper, '__version__', 'unknown'),
+                    compute_type=self.compute_type)
+
+
+ASR_BACKENDS = {
+    backend.name: backend for backend in (WhisperBackend, QuantizedWhisperBackend, FasterWhisperBackend)
+}
+
+
+def pick_model_size(backend_name, rtf_budget, device='cpu', threads=None):
+    """Return the largest Whisper model size expected to run within rtf_budget.
+
+    Estimates for the reference CPU are scaled by the number of threads available;
+    when even the smallest model is over budget, the smallest model is returned.
+    """
+    if str(device).startswith('cuda') and backend_name != 'whisper-int8':
+        estimates = GPU_RTF_ESTIMATES
+        scale = 1.0
+    else:
+        estimates = CPU_RTF_ESTIMATES[backend_name]
+        scale = REFERENCE_CPU_COUNT / max(1, threads or os.cpu_count() or 1)
+    chosen = MODEL_SIZES[0]
+    for size in MODEL_SIZES:
+        if estimates[size] * scale <= rtf_budget:
+            chosen = size
+    return chosen
+
+
+def create_backend(backend_name, model_name, device, rtf_budget=None, threads=None):
+    """Build (without loading) the named ASR backend; model_name 'auto' picks a size from rtf_budget."""
+    if backend_name not in ASR_BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{backend_name}'. Choose from: {', '.join(ASR_BACKENDS)}")
+    if model_name == 'auto':
+        model_name = pick_model_size(backend_name, rtf_budget or 1.0, device, threads)
+    return ASR_BACKENDS[backend_name](model_name, device, threads)
@@ -1,41 +1,246 @@
 # audio_processor.py
 
 import os
-import torch
-import whisper
-from moviepy.editor import VideoFileClip
-from pydub import AudioSegment
+import shutil
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+
+from asr_backends import create_backend
+from events import EventBus
+from model_registry import get_registry
+from vad import detect_speech, pack_chunks
+from video_io import get_ffmpeg_exe
+
+# Whisper models expect 16 kHz mono audio
+SAMPLE_RATE = 16000
+
+# ASR backend of a transcription pool process, loaded once by _init_transcriber
+_worker_backend = None
+
+
+def _init_transcriber(backend_name, model_name, device, threads):
+    """Load the ASR model once in a transcription pool process."""
+    global _worker_backend
+    backend = create_backend(backend_name, model_name, device, threads=threads)
+    if backend.uses_torch:
+        import torch
+        torch.set_num_threads(threads)
+    _worker_backend = backend.load()
+
+
+def _transcribe_chunk(audio):
+    """Transcribe one packed speech chunk in a pool process and return its segments."""
+    return _worker_backend.transcribe(audio)
+
+
+class TranscriptionPool(ProcessPoolExecutor):
+    """Process pool whose processes each hold an ASR model, kept in the model registry.
+
+    The registry closes the pool when it evicts it, which releases the models.
+    """
+    def close(self):
+        self.shutdown(cancel_futures=True)
+
 
 class AudioProcessor:
     """Class for handling audio processing operations."""
-    def __init__(self, config):
+    def __init__(self, config, events=None):
+        self.events = events or EventBus()
         self.device = config.device
-        print(f"AudioProcessor using device: {self.device}")
-        self.model = whisper.load_model("medium", device=self.device)
+        self.backend = create_backend(config.asr_backend, config.whisper_model, self.device, config.asr_rtf_budget)
+        self.model_name = self.backend.model_name
+        self.registry = get_registry(config.model_memory_budget)
+        self.vad_enabled = config.vad_enabled
+        self.chunk_seconds = config.transcribe_chunk_seconds
+        self.workers = config.transcribe_workers or (
+            1 if self.device.startswith('cuda') else max(1, min(4, (os.cpu_count() or 1) // 4)))
+        if config.model_memory_budget:
+            # Every pool process holds its own model, and all of them count against the budget
+            self.workers = max(1, min(self.workers, int(config.model_memory_budget // self.backend.memory_estimate())))
+        print(f"AudioProcessor using {self.backend.name} ({self.model_name}) on device: {self.device}")
 
-    def convert_to_wav(self, input_path, output_path):
-        """Convert audio or video file to WAV format."""
-        try:
-            # Try to load as a video file
-            video_clip = VideoFileClip(input_path)
-            if video_clip.audio is not None:
-                video_clip.audio.write_audiofile(output_path, verbose=False, logger=None)
-                video_clip.close()
-            else:
-                # If no audio track, try loading directly as audio
-                audio = AudioSegment.from_file(input_path)
-                audio.export(output_path, format="wav")
-        except Exception as e:
+    def fingerprint(self):
+        """Describe everything that affects the transcription output, for result caching."""
+        return {
+            'backend': self.backend.fingerprint(),
+            'language': 'en',
+            'vad': self.vad_enabled,
+            'chunk_seconds': self.chunk_seconds if self.vad_enabled else None
+        }
+
+    def model(self):
+        """Hold the shared, loaded ASR backend; the model is loaded on first use."""
+        return self.registry.use(
+            self.backend.registry_key(),
+            lambda: create_backend(self.backend.name, self.model_name, self.device).load(),
+            self.backend.memory_estimate()
+        )
+
+    def warmup(self):
+        """Load the ASR model into the model registry ahead of the first transcription.
+
+        Nothing is loaded when speech chunks are transcribed in a process pool: the
+        pool processes load their own copies, and one in this process would go unused.
+        """
+        if self.vad_enabled and self._uses_pool():
+            return
+        with self.model():
+            pass
+
+    def load_audio(self, input_path, output_path=None):
+        """Decode the audio track of an audio or video file to 16 kHz mono float32.
+
+        ffmpeg resamples straight into a pipe, so no intermediate WAV is written. With
+        output_path the raw samples are streamed to disk and a memory map of them is
+        returned; otherwise the samples are returned as an in-memory array. A file
+        without an audio track yields an empty array.
+        """
+        with self.events.span('decode_audio', component='audio'):
+            self.events.count('bytes_read', os.path.getsize(input_path), component='audio')
+            command = [
+                get_ffmpeg_exe(), '-nostdin', '-loglevel', 'error', '-threads', '0',
+                '-i', input_path, '-vn', '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 'f32le', '-'
+            ]
             try:
-                # Alternative method using pydub directly
-                audio = AudioSegment.from_file(input_path)
-                audio.export(output_path, format="wav")
-            except Exception as inner_e:
-                raise Exception(f"Failed to convert audio: {str(e)}; {str(inner_e)}")
-
-    def transcribe_audio(self, audio_path):
-        """Transcribe audio file using Whisper model."""
+                process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                if output_path:
+                    with open(output_path, 'wb') as f:
+                        shutil.copyfileobj(process.stdout, f, 1024 * 1024)
+                    data = None
+                else:
+                    data = process.stdout.read()
+                error = process.stderr.read()
+                if process.wait() != 0:
+                    if b'does not contain any stream' not in error:
+                        raise Exception(error.decode(errors='replace').strip())
+                    # No audio track: treat as silence of zero length
+                    data = b''
+                    if output_path:
+                        open(output_path, 'wb').close()
+            except Exception as e:
+                raise Exception(f"Failed to decode audio: {str(e)}")
+
+            if output_path:
+                self.events.count('bytes_written', os.path.getsize(output_path), component='audio')
+                return self.open_audio(output_path)
+            return np.frombuffer(data, np.float32).copy()
+
+    def open_audio(self, audio_path):
+        """Memory-map raw 16 kHz mono float32 samples written by load_audio."""
+        if os.path.getsize(audio_path) == 0:
+            return np.zeros(0, np.float32)
+        # Copy-on-write keeps the map writable for torch without touching the file
+        return np.memmap(audio_path, dtype=np.float32, mode='c')
+
+    def transcribe_audio(self, audio, progress=None):
+        """Transcribe an audio file path or a 16 kHz mono float32 array using Whisper model.
+
+        With VAD enabled only the detected speech is transcribed: speech regions are
+        packed into chunks of up to chunk_seconds, the chunks are transcribed in
+        parallel, and segment times are mapped back onto the original timeline.
+        progress(message, percent), if given, is called as each chunk is done; an
+        exception it raises stops the transcription.
+        """
         try:
-            return self.model.transcribe(audio_path, language='en')
+            if isinstance(audio, str):
+                audio = self.load_audio(audio)
+            if len(audio) == 0:
+                return {'text': '', 'segments': [], 'language': 'en'}
+            with self.events.span('whisper_transcribe', component='audio',
+                                  backend=self.backend.name, model=self.model_name):
+                self.events.count('audio_seconds', len(audio) / SAMPLE_RATE, component='audio')
+                if not self.vad_enabled:
+                    with self.model() as backend:
+                        segments = backend.transcribe(audio)
+                    self.events.count('segments', len(segments), component='audio')
+                    return {
+                        'text': ''.join(segment['text'] for segment in segments),
+                        'segments': segments,
+                        'language': 'en'
+                    }
+
+                regions = detect_speech(audio, SAMPLE_RATE)
+                chunks = pack_chunks(audio, regions, SAMPLE_RATE, self.chunk_seconds)
+                self.events.count('speech_seconds', sum(end - start for start, end in regions) / SAMPLE_RATE,
+                                  component='audio')
+                self.events.count('chunks', len(chunks), component='audio')
+
+                segments = []
+                for chunk, chunk_segments in zip(chunks, self._transcribe_chunks(chunks, progress)):
+                    for segment in chunk_segments:
+                        segment = dict(segment, id=len(segments))
+                        segment['start'] = chunk.to_source_time(segment['start'])
+                        segment['end'] = chunk.to_source_time(segment['end'])
+                        segments.append(segment)
+                self.events.count('segments', len(segments), component='audio')
+                return {
+                    'text': ''.join(segment['text'] for segment in segments),
+                    'segments': segments,
+                    'language': 'en'
+                }
         except Exception as e:
             raise Exception(f"Failed to transcribe audio: {str(e)}")
+
+    def _uses_pool(self):
+        """Tell whether speech chunks are transcribed in a process pool."""
+        # Pool processes of worker.py are daemonic and may not start children; they
+        # already run one job per core, so transcribe in-process there
+        return self.workers > 1 and not multiprocessing.current_process().daemon
+
+    def _pool_key(self):
+        return ('asr-pool', self.workers) + self.backend.registry_key()
+
+    def _start_pool(self):
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        return TranscriptionPool(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_transcriber,
+            initargs=(self.backend.name, self.model_name, self.device, threads)
+        )
+
+    def _transcribe_chunks(self, chunks, progress=None):
+        """Transcribe speech chunks, in a process pool when more than one worker is configured.
+
+        The pool is started on first use and kept in the model registry for the
+        following transcriptions, counted as one model per process; the registry's
+        in-process copy of the model is dropped while the pool is used.
+        """
+        if self._uses_pool() and len(chunks) > 1:
+            self.registry.evict(self.backend.registry_key())
+            try:
+                with self.registry.use(self._pool_key(), self._start_pool,
+                                       self.workers * self.backend.memory_estimate()) as pool:
+                    futures = [pool.submit(_transcribe_chunk, chunk.audio) for chunk in chunks]
+                    try:
+                        results = []
+                        for future in futures:
+                            results.append(future.result())
+                            self._chunk_done(progress, len(results), len(chunks))
+                        return results
+                    finally:
+                        # Chunks still queued when the transcription is cancelled are dropped
+                        for future in futures:
+                            future.cancel()
+            except BrokenProcessPool:
+                # A pool process died (out of memory, say); the next transcription starts a new pool
+                self.close()
+                raise
+        results = []
+        with self.model() as backend:
+            for chunk in chunks:
+                results.append(backend.transcribe(chunk.audio))
+                self._chunk_done(progress, len(results), len(chunks))
+        return results
+
+    @staticmethod
+    def _chunk_done(progress, done, total):
+        if progress is not None:
+            progress(f"Transcribed {done}/{total} speech chunks...", 100 * done // total)
+
+    def close(self):
+        """Shut down the transcription process pool, if one was started."""
+        self.registry.evict(self._pool_key())
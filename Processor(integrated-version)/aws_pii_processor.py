@@ -1,127 +1,471 @@
 # aws_pii_processor.py
 
 import io
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
 import numpy as np
 import cv2
 from PIL import Image, ImageDraw, ImageFilter
-from moviepy.editor import VideoFileClip
-import numpy as np
+
+from video_io import SegmentedVideoWriter, concat_segments, read_ahead
+from events import EventBus
+from rate_limiter import aws_retryable, get_scheduler
+from frame_diff import FrameChangeDetector, box_to_pixels, rects_intersect
+from mosaic import Mosaic, REKOGNITION_MAX_BYTES, REKOGNITION_MAX_WORDS
+
+# Joins the texts of several frames in one Comprehend request; entities are never
+# reported across it, since it is not part of any frame's text
+PII_BATCH_SEPARATOR = "\n\n###\n\n"
+
+
+class RekognitionImageEncoder:
+    """Encode the images sent to Rekognition detect_text.
+
+    PNG is lossless but slow to encode and large for full screens; JPEG at quality
+    is several times smaller and faster, but may lose faint or small words, which
+    then go unblurred. Images with a long edge over max_long_edge pixels are
+    downscaled first, and grayscale drops the colour channels. Rekognition returns
+    boxes normalized to the image it was sent, so they map onto the full-resolution
+    frame unchanged.
+    """
+    def __init__(self, format="PNG", quality=90, max_long_edge=None, grayscale=False):
+        self.format = format.upper()
+        self.quality = quality
+        self.max_long_edge = max_long_edge
+        self.grayscale = grayscale
+
+    def fingerprint(self):
+        """Describe everything that affects the uploaded images, for result caching."""
+        return {
+            'format': self.format,
+            'quality': self.quality if self.format == 'JPEG' else None,
+            'max_long_edge': self.max_long_edge,
+            'grayscale': self.grayscale
+        }
+
+    def encode(self, image):
+        """Return the bytes of a PIL image as sent to Rekognition."""
+        if self.grayscale:
+            image = image.convert('L')
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        width, height = image.size
+        if self.max_long_edge and max(width, height) > self.max_long_edge:
+            scale = self.max_long_edge / max(width, height)
+            image = image.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.BOX)
+        img_byte_arr = io.BytesIO()
+        if self.format == 'JPEG':
+            image.save(img_byte_arr, format='JPEG', quality=self.quality)
+        else:
+            image.save(img_byte_arr, format=self.format)
+        return img_byte_arr.getvalue()
+
 
 class AWSPIIProcessor:
     """Class for handling PII detection and reduction using AWS services."""
-    def __init__(self, config):
+    def __init__(self, config, events=None):
+        self.events = events or EventBus()
         self.config = config
+        # Retries are left to the shared schedulers, which also pace the calls
+        boto_config = BotoConfig(retries={'max_attempts': 1, 'mode': 'standard'},
+                                 max_pool_connections=config.aws_max_concurrency)
         self.aws_client = boto3.client(
             'rekognition',
             aws_access_key_id=config.aws_access_key_id,
             aws_secret_access_key=config.aws_secret_access_key,
-            region_name=config.region_name
+            region_name=config.region_name,
+            config=boto_config
         )
         self.comp_detect = boto3.client(
             'comprehend',
             aws_access_key_id=config.aws_access_key_id,
             aws_secret_access_key=config.aws_secret_access_key,
-            region_name=config.region_name
+            region_name=config.region_name,
+            config=boto_config
+        )
+        limits = dict(max_concurrency=config.aws_max_concurrency, max_retries=config.api_max_retries,
+                      base_delay=config.api_backoff_base, max_delay=config.api_backoff_max)
+        self.rekognition_scheduler = get_scheduler(
+            'rekognition', requests_per_second=config.rekognition_requests_per_second, **limits)
+        self.comprehend_scheduler = get_scheduler(
+            'comprehend', requests_per_second=config.comprehend_requests_per_second, **limits)
+        self.image_encoder = RekognitionImageEncoder(
+            format=config.rekognition_image_format,
+            quality=config.rekognition_jpeg_quality,
+            max_long_edge=config.rekognition_max_long_edge,
+            grayscale=config.rekognition_grayscale
+        )
+
+    def fingerprint(self):
+        """Describe everything that affects the processed video, for result caching."""
+        detector = self._change_detector()
+        return {'backend': 'aws', 'region': self.config.region_name, 'blur_radius': 20,
+                'change_detection': detector.fingerprint() if detector else None,
+                'diff_max_regions': self.config.pii_diff_max_regions,
+                'diff_full_frame_ratio': self.config.pii_diff_full_frame_ratio,
+                # Mosaics and Comprehend batches change which words are read together
+                'mosaic': {'enabled': self.config.pii_mosaic_enabled,
+                           'max_side': self.config.pii_mosaic_max_side,
+                           'max_crops': self.config.pii_mosaic_max_crops},
+                'comprehend_batch': {'frames': self.config.comprehend_batch_frames,
+                                     'bytes': self.config.comprehend_batch_bytes},
+                'image_encoder': self.image_encoder.fingerprint()}
+
+    def _change_detector(self):
+        """Return a new FrameChangeDetector for one video, or None when change detection is off."""
+        if not self.config.pii_diff_enabled:
+            return None
+        return FrameChangeDetector(
+            cell=self.config.pii_diff_cell,
+            threshold=self.config.pii_diff_threshold,
+            max_regions=self.config.pii_diff_max_regions,
+            full_frame_ratio=self.config.pii_diff_full_frame_ratio
         )
 
     def detect_pii_from_text(self, text, language_code="en"):
         """Detect PII entities in text using AWS Comprehend."""
         try:
-            response = self.comp_detect.detect_pii_entities(
-                Text=text,
-                LanguageCode=language_code
+            response = self._scheduled(
+                self.comprehend_scheduler,
+                lambda: self.comp_detect.detect_pii_entities(Text=text, LanguageCode=language_code)
             )
+            self.events.count('api_calls', component='aws', service='comprehend')
             return response['Entities']
         except Exception as e:
             raise Exception(f"PII detection failed: {str(e)}")
 
-    def detect_text_from_image(self, image):
-        """Detect text in image using AWS Rekognition."""
+    def detect_text_from_image(self, image, image_bytes=None):
+        """Detect text in image using AWS Rekognition; returns its (word, bounding box) pairs in reading order."""
         try:
-            image_bytes = self._pil_to_bytes(image)
-            response = self.aws_client.detect_text(
-                Image={'Bytes': image_bytes}
+            if image_bytes is None:
+                image_bytes = self.image_encoder.encode(image)
+            response = self._scheduled(
+                self.rekognition_scheduler,
+                lambda: self.aws_client.detect_text(Image={'Bytes': image_bytes})
             )
-            text_detections = response['TextDetections']
-            text_corpus = []
-            text_bounding_box = {}
-            for text in text_detections:
-                if text["Type"] == 'WORD':
-                    detected_text = text['DetectedText']
-                    text_corpus.append(detected_text)
-                    text_bounding_box[detected_text] = text["Geometry"]["BoundingBox"]
-            final_text_corpus = " ".join(text_corpus)
-            return final_text_corpus, text_bounding_box
+            self.events.count('api_calls', component='aws', service='rekognition')
+            self.events.count('bytes_uploaded', len(image_bytes), component='aws')
+            return [(text['DetectedText'], text["Geometry"]["BoundingBox"])
+                    for text in response['TextDetections'] if text["Type"] == 'WORD']
         except Exception as e:
             raise Exception(f"Text detection failed: {str(e)}")
 
-    def _pil_to_bytes(self, image, format="PNG"):
-        """Convert PIL image to bytes."""
-        img_byte_arr = io.BytesIO()
-        image.save(img_byte_arr, format=format)
-        return img_byte_arr.getvalue()
+    def _scheduled(self, scheduler, request):
+        """Send an AWS request through a rate-limit scheduler, retrying throttling errors."""
+        def send():
+            try:
+                return request()
+            except ClientError as e:
+                retryable = aws_retryable(e)
+                if retryable is None:
+                    raise
+                raise retryable
+        return scheduler.call(send, events=self.events)
 
-    def _blur_mask(self, image, box):
-        """Apply blur mask to a specific area of the image."""
+    def _blur_boxes(self, image, boxes):
+        """Blur every box of the image, with a single blur of the whole frame."""
+        if not boxes:
+            return image
         img_width, img_height = image.size
-        left = img_width * box['Left']
-        top = img_height * box['Top']
-        width = img_width * box['Width']
-        height = img_height * box['Height']
-
         mask = Image.new('L', image.size, 0)
         draw = ImageDraw.Draw(mask)
-        draw.rectangle([left, top, left + width, top + height], fill=255)
-        blurred = image.filter(ImageFilter.GaussianBlur(20))
-        image.paste(blurred, mask=mask)
+        for box in boxes:
+            draw.rectangle(box_to_pixels(box, img_width, img_height), fill=255)
+        image.paste(image.filter(ImageFilter.GaussianBlur(20)), mask=mask)
         return image
 
+    def detect_words(self, image, regions=None):
+        """Return the (word, box) pairs Rekognition reads in an image, with boxes normalized to the whole image.
+
+        With regions, a list of (left, top, right, bottom) pixel rectangles, only
+        those crops are sent to Rekognition.
+        """
+        img_width, img_height = image.size
+        words = []
+        for left, top, right, bottom in regions or [(0, 0, img_width, img_height)]:
+            width, height = right - left, bottom - top
+            crop = image if (width, height) == image.size else image.crop((left, top, right, bottom))
+            # Map the crop-relative boxes onto the whole image
+            for word, box in self.detect_text_from_image(crop):
+                words.append((word, {
+                    'Left': (left + box['Left'] * width) / img_width,
+                    'Top': (top + box['Top'] * height) / img_height,
+                    'Width': box['Width'] * width / img_width,
+                    'Height': box['Height'] * height / img_height
+                }))
+        return words
+
+    def _new_mosaic(self):
+        """Return an empty Mosaic; with mosaic packing off it takes a single crop.
+
+        Mosaics are kept within the encoder's max_long_edge, so their text is not downscaled.
+        """
+        max_side = self.config.pii_mosaic_max_side
+        if self.image_encoder.max_long_edge:
+            max_side = min(max_side, self.image_encoder.max_long_edge)
+        return Mosaic(max_side=max_side,
+                      max_crops=self.config.pii_mosaic_max_crops if self.config.pii_mosaic_enabled else 1)
+
+    def detect_words_mosaic(self, mosaic):
+        """Read every crop of a Mosaic with one detect_text request.
+
+        Returns the (word, box) pairs of each placement, with boxes normalized to
+        its frame. A mosaic over Rekognition's byte limit, or one whose response hit
+        the per-image word limit (so words may be missing), is split in two halves
+        that are read the same way.
+        """
+        if len(mosaic.placements) == 1:
+            image, region, _, _ = mosaic.placements[0]
+            return [self.detect_words(image, [region])]
+        image = mosaic.render()
+        image_bytes = self.image_encoder.encode(image)
+        if len(image_bytes) <= REKOGNITION_MAX_BYTES:
+            words = self.detect_text_from_image(image, image_bytes)
+            if len(words) < REKOGNITION_MAX_WORDS:
+                self.events.count('api_calls_saved', len(mosaic.placements) - 1, component='aws', service='rekognition')
+                return mosaic.split_words(words)
+        self.events.count('mosaic_splits', component='aws')
+        return [words for half in mosaic.split() for words in self.detect_words_mosaic(half)]
+
+    def detect_pii_batch(self, word_lists):
+        """Return the boxes of the PII words of several frames, given each frame's (word, box) pairs.
+
+        A frame's text is its words joined by spaces. The texts are sent to Comprehend
+        together, joined by PII_BATCH_SEPARATOR into requests of up to
+        comprehend_batch_bytes (identical texts are sent once), and the entity offsets
+        are mapped back to the words of each frame they overlap.
+        """
+        texts = [" ".join(word for word, _ in words) for words in word_lists]
+        unique = list(dict.fromkeys(text for text in texts if text))
+        if len(unique) < len(texts):
+            self.events.count('api_calls_saved', len(texts) - len(unique), component='aws', service='comprehend')
+        spans = {}
+        batch, batch_bytes = [], 0
+        separator_bytes = len(PII_BATCH_SEPARATOR.encode('utf-8'))
+        for text in unique:
+            text_bytes = len(text.encode('utf-8'))
+            if batch and batch_bytes + separator_bytes + text_bytes > self.config.comprehend_batch_bytes:
+                spans.update(self._detect_pii_spans(batch))
+                batch, batch_bytes = [], 0
+            batch_bytes += text_bytes + (separator_bytes if batch else 0)
+            batch.append(text)
+        if batch:
+            spans.update(self._detect_pii_spans(batch))
+
+        results = []
+        for words, text in zip(word_lists, texts):
+            entities = spans.get(text, [])
+            boxes = []
+            offset = 0
+            for word, box in words:
+                end = offset + len(word)
+                if any(begin < end and offset < stop for begin, stop in entities):
+                    boxes.append(box)
+                offset = end + 1
+            results.append(boxes)
+        return results
+
+    def _detect_pii_spans(self, texts):
+        """Send texts to Comprehend in one request; returns each text's entity (begin, end) offsets."""
+        joined = PII_BATCH_SEPARATOR.join(texts)
+        entities = self.detect_pii_from_text(joined)
+        if len(texts) > 1:
+            self.events.count('api_calls_saved', len(texts) - 1, component='aws', service='comprehend')
+        spans = {}
+        offset = 0
+        for text in texts:
+            end = offset + len(text)
+            spans[text] = [
+                (max(entity['BeginOffset'], offset) - offset, min(entity['EndOffset'], end) - offset)
+                for entity in entities if entity['BeginOffset'] < end and entity['EndOffset'] > offset
+            ]
+            offset = end + len(PII_BATCH_SEPARATOR)
+        return spans
+
+    def detect_pii_boxes(self, image, regions=None):
+        """Return the boxes of the PII words in an image (or only in its regions), normalized to the whole image."""
+        return self.detect_pii_batch([self.detect_words(image, regions)])[0]
+
+    @staticmethod
+    def grow_regions(image, regions, boxes):
+        """Grow each changed region over the boxes it touches, so a word only partly inside it is read whole."""
+        img_width, img_height = image.size
+        rects = [box_to_pixels(box, img_width, img_height) for box in boxes]
+        grown = []
+        for region in regions:
+            left, top, right, bottom = region
+            for rect in rects:
+                if rects_intersect(region, rect):
+                    left, top = min(left, int(rect[0])), min(top, int(rect[1]))
+                    right, bottom = max(right, -int(-rect[2])), max(bottom, -int(-rect[3]))
+            grown.append((max(0, left), max(0, top), min(img_width, right), min(img_height, bottom)))
+        return grown
+
+    @staticmethod
+    def _replace_boxes(image, previous_boxes, regions, detected):
+        """Return the previous boxes outside the changed regions of a frame, plus the boxes detected in them."""
+        img_width, img_height = image.size
+        kept = [box for box in previous_boxes
+                if not any(rects_intersect(region, box_to_pixels(box, img_width, img_height)) for region in regions)]
+        return kept + detected
+
+    def iter_pii_boxes(self, frames, detector=None):
+        """Yield (image, pii_boxes) for every RGB frame, in frame order.
+
+        The AWS requests of up to pii_pipeline_window frames are in flight at once,
+        on pools of aws_max_concurrency threads sharing the boto3 clients; results
+        are released in frame order, so at most that many frames are held. The crops
+        to analyze are tiled into Mosaics read by one Rekognition request each, and
+        the texts of up to comprehend_batch_frames frames share one Comprehend
+        request. With a FrameChangeDetector, unchanged frames reuse the previous
+        frame's boxes and changed frames are only analyzed in their changed regions.
+        Changed regions are grown over the words last read that they touch before
+        they are sent, and a crop's word count is estimated from those words, so
+        crops dense enough to reach DetectText's word limit are not packed together.
+        """
+        window = max(1, self.config.pii_pipeline_window)
+        batch_frames = max(1, self.config.comprehend_batch_frames)
+        pending = deque()
+        batch = []
+        boxes = []
+        # Boxes of the words on screen as of the last released frame
+        word_boxes = []
+        # The open mosaic, and the holder its words future is stored in once it is sent
+        mosaic = self._new_mosaic()
+        mosaic_holder = {}
+        ocr_executor = ThreadPoolExecutor(max_workers=self.config.aws_max_concurrency)
+        pii_executor = ThreadPoolExecutor(max_workers=self.config.aws_max_concurrency)
+
+        def submit_mosaic():
+            nonlocal mosaic, mosaic_holder
+            if mosaic.placements:
+                mosaic_holder['future'] = ocr_executor.submit(self.detect_words_mosaic, mosaic)
+            mosaic, mosaic_holder = self._new_mosaic(), {}
+
+        def frame_words(entry):
+            return [word for holder, index in entry['crops'] for word in holder['future'].result()[index]]
+
+        def submit_batch():
+            # The open mosaic only holds crops of frames in this batch
+            submit_mosaic()
+            entries = list(batch)
+            result = pii_executor.submit(lambda: self.detect_pii_batch([frame_words(entry) for entry in entries]))
+            for index, entry in enumerate(entries):
+                entry['pii'] = (result, index)
+            batch.clear()
+
+        def estimate_words(image, region):
+            img_width, img_height = image.size
+            left, top, right, bottom = region
+            return sum(1 for box in word_boxes
+                       if left <= (box['Left'] + box['Width'] / 2) * img_width < right
+                       and top <= (box['Top'] + box['Height'] / 2) * img_height < bottom)
+
+        def release():
+            nonlocal word_boxes
+            entry = pending.popleft()
+            if entry['regions'] and 'pii' not in entry:
+                submit_batch()
+            released = self._release(entry, boxes)
+            if entry['regions']:
+                word_boxes = self._replace_boxes(entry['image'], word_boxes, entry['regions'],
+                                                 [box for _, box in frame_words(entry)])
+            return entry['image'], released
+
+        try:
+            for frame in frames:
+                image = Image.fromarray(frame)
+                if detector:
+                    regions = self.grow_regions(image, detector.changes(frame), word_boxes)
+                else:
+                    regions = [(0, 0, image.width, image.height)]
+                entry = {'image': image, 'regions': regions, 'crops': []}
+                if regions:
+                    # Regions that changed to blank need no OCR, but still clear the boxes in them
+                    text_regions = [region for region in regions if detector is None or detector.has_content(region)]
+                    for region in text_regions:
+                        words = estimate_words(image, region)
+                        index = mosaic.add(image, region, words)
+                        if index is None:
+                            submit_mosaic()
+                            index = mosaic.add(image, region, words)
+                        entry['crops'].append((mosaic_holder, index))
+                    batch.append(entry)
+                    if len(batch) >= batch_frames:
+                        submit_batch()
+                pending.append(entry)
+                while len(pending) >= window:
+                    released, boxes = release()
+                    yield released, boxes
+            while pending:
+                released, boxes = release()
+                yield released, boxes
+        finally:
+            ocr_executor.shutdown(wait=True, cancel_futures=True)
+            pii_executor.shutdown(wait=True, cancel_futures=True)
+
+    def _release(self, entry, previous_boxes):
+        """Wait for one pipelined frame and return its final PII boxes."""
+        if not entry['regions']:
+            # Same screen as the last analyzed frame: no Rekognition or Comprehend call
+            self.events.count('frames_reused', component='aws')
+            self.events.count('api_calls_saved', 2, component='aws')
+            return previous_boxes
+        result, index = entry['pii']
+        return self._replace_boxes(entry['image'], previous_boxes, entry['regions'], result.result()[index])
+
     def process_frame(self, image):
         """Process a single frame to detect and blur PII."""
         try:
             # image is a PIL Image
-            text, text_bounding_box = self.detect_text_from_image(image)
-            entities = self.detect_pii_from_text(text)
-            for entity in entities:
-                target_text = text[entity['BeginOffset']:entity['EndOffset']]
-                if target_text in text_bounding_box:
-                    box = text_bounding_box[target_text]
-                    image = self._blur_mask(image, box)
-            return image
+            return self._blur_boxes(image, self.detect_pii_boxes(image))
         except Exception as e:
             raise Exception(f"Frame processing failed: {str(e)}")
 
-    def process_video(self, input_path, output_path, progress_callback=None):
+    def process_video(self, input_path, output_path, progress_callback=None, checkpoint=None):
+        """Process video to blur PII information, keeping the original audio.
+
+        With a FrameCheckpoint the output is written in segments and the pass resumes
+        from the checkpoint's next frame. Unless change detection is off, only frames
+        that differ from the last analyzed one are sent to AWS, and only their changed
+        regions; unchanged frames reuse the previous frame's blur boxes.
+        """
+        # moviepy is slow to import, so it is only loaded once a video is processed
+        from moviepy.editor import VideoFileClip
         try:
-            video = VideoFileClip(input_path)
-            audio = video.audio
+            with self.events.span('aws_pii_video', component='aws'):
+                video = VideoFileClip(input_path)
+                total_frames = int(video.duration * video.fps)
+                segment_dir = checkpoint.segment_dir if checkpoint else output_path + ".segments"
+                writer = SegmentedVideoWriter(
+                    segment_dir, video.fps, tuple(video.size),
+                    segment_frames=checkpoint.segment_frames if checkpoint else None,
+                    checkpoint=checkpoint,
+                    rgb=True
+                )
+                # Continue after the frames already written by a previous run
+                current_frame = writer.frame_index
+                clip = video.subclip(current_frame / video.fps) if current_frame else video
+                frames = read_ahead(clip.iter_frames(), self.config.pii_read_ahead_frames)
 
-            total_frames = int(video.duration * video.fps)
-            current_frame = 0
+                for image, boxes in self.iter_pii_boxes(frames, self._change_detector()):
+                    # Blur the PII boxes and convert the PIL Image back to a numpy array
+                    writer.write(np.array(self._blur_boxes(image, boxes)))
+                    current_frame += 1
+                    self.events.count('frames', component='aws')
+                    if progress_callback:
+                        progress = int((current_frame / total_frames) * 100)
+                        progress_callback(f"Processing frame {current_frame}/{total_frames}", progress)
 
-            def process_frame(frame):
-                nonlocal current_frame
-                # Convert frame to PIL Image
-                image = Image.fromarray(frame)
-                # Process the image (blur PII)
-                processed_image = self.process_frame(image)
-                # Convert back to numpy array
-                result_frame = np.array(processed_image)
-                current_frame += 1
-                if progress_callback:
-                    progress = int((current_frame / total_frames) * 100)
-                    progress_callback(f"Processing frame {current_frame}/{total_frames}", progress)
-                return result_frame
-
-            # Apply frame processing
-            processed_video = video.fl_image(process_frame)
-
-            # Set audio
-            processed_video = processed_video.set_audio(audio)
-
-            # Write the processed video to output file
-            processed_video.write_videofile(output_path, audio_codec='aac')
+                video.close()
+                # Join the segments and put the original audio back
+                concat_segments(writer.close(), output_path, audio_source=input_path)
+                if not checkpoint:
+                    shutil.rmtree(segment_dir, ignore_errors=True)
 
         except Exception as e:
             raise Exception(f"Video processing failed: {str(e)}")
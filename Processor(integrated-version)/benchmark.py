@@ -0,0 +1,1263 @@
+# benchmark.py
+
+import os
+os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
+import argparse
+import io
+import json
+import math
+import multiprocessing
+import platform
+import queue
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+import zipfile
+
+import cv2
+import numpy as np
+
+from config import Config
+from events import EventBus, EventAggregator
+from video_io import get_ffmpeg_exe
+
+SCENARIOS = ('form', 'scroll', 'typing')
+STAGES = ('extract', 'convert_audio', 'transcribe', 'pii_aws', 'pii_paddleocr', 'encode')
+
+FORM_FIELDS = [
+    ("Full name", "John Citizen"),
+    ("Email", "john.citizen@example.com"),
+    ("Phone", "0412345678"),
+    ("Date of birth", "12 March 1985"),
+    ("Card number", "4111 1111 1111 1111"),
+    ("myGov username", "AB12CD34")
+]
+
+PAGE_TEXT = [
+    "Welcome back. Please review your personal details below before continuing.",
+    "Your Medicare card number is 2123 45670 1 and expires 03/2027.",
+    "Contact us on 0298765432 or write to support@example.gov.au",
+    "Account BSB 062-000 Account number 1234567",
+    "Individual Healthcare Identifier 8003608166690503",
+    "Terms and conditions apply. Read the privacy notice for more information."
+]
+
+
+# Synthetic recordings
+
+def _draw_browser_chrome(canvas, title):
+    """Draw a simple browser window frame with an address bar."""
+    height, width = canvas.shape[:2]
+    cv2.rectangle(canvas, (0, 0), (width, 40), (225, 225, 225), -1)
+    cv2.rectangle(canvas, (120, 8), (width - 20, 32), (255, 255, 255), -1)
+    cv2.putText(canvas, f"https://my.example.gov.au/{title}", (130, 26),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (60, 60, 60), 1, cv2.LINE_AA)
+
+
+def _render_form(width, height, progress, typed_only=False):
+    """Render a form whose field values are being typed in as progress goes 0 -> 1."""
+    canvas = np.full((height, width, 3), 255, np.uint8)
+    _draw_browser_chrome(canvas, "details")
+    scale = max(width / 1280, 0.4)
+    total_chars = sum(len(value) for _, value in FORM_FIELDS)
+    typed = int(total_chars * progress)
+    y = int(90 * scale)
+    for label, value in FORM_FIELDS:
+        shown = value[:max(0, min(len(value), typed))]
+        typed -= len(value)
+        if typed_only and not shown:
+            continue
+        cv2.putText(canvas, label, (int(40 * scale), y), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.7 * scale, (30, 30, 30), max(1, int(2 * scale)), cv2.LINE_AA)
+        top_left = (int(300 * scale), y - int(28 * scale))
+        bottom_right = (int(900 * scale), y + int(12 * scale))
+        cv2.rectangle(canvas, top_left, bottom_right, (150, 150, 150), 1)
+        cv2.putText(canvas, shown, (int(310 * scale), y), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.7 * scale, (0, 0, 0), max(1, int(2 * scale)), cv2.LINE_AA)
+        y += int(70 * scale)
+    return canvas
+
+
+def _render_scroll_page(width, height, repeat=8):
+    """Render a tall page of paragraphs that is scrolled through."""
+    scale = max(width / 1280, 0.4)
+    line_height = int(36 * scale)
+    lines = PAGE_TEXT * repeat
+    page = np.full((line_height * len(lines) + height, width, 3), 255, np.uint8)
+    for index, line in enumerate(lines):
+        cv2.putText(page, line, (int(40 * scale), (index + 1) * line_height), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.6 * scale, (20, 20, 20), 1, cv2.LINE_AA)
+    return page
+
+
+def _write_speech_like_audio(path, duration, sample_rate=16000):
+    """Write a mono WAV of short tonal bursts separated by silence, like think-aloud speech."""
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    envelope = ((t % 4.0) < 1.5).astype(np.float32) * (0.5 + 0.5 * np.sin(2 * math.pi * 3 * t))
+    signal = 0.3 * envelope * np.sin(2 * math.pi * (180 + 40 * np.sin(2 * math.pi * 0.5 * t)) * t)
+    pcm = (signal * 32767).astype(np.int16)
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+
+
+def recording_frames(scenario='form', duration=10.0, width=1280, height=720, fps=10):
+    """Yield the BGR frames of a synthetic screen recording of a text-heavy page.
+
+    Scenarios: 'form' (a form being filled in), 'scroll' (a long page scrolling past)
+    and 'typing' (PII fields appearing one after another as they are typed).
+    """
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Unknown scenario '{scenario}'.")
+    frame_count = max(1, int(duration * fps))
+    page = _render_scroll_page(width, height) if scenario == 'scroll' else None
+    for index in range(frame_count):
+        progress = index / max(frame_count - 1, 1)
+        if scenario == 'scroll':
+            offset = int((page.shape[0] - height) * progress)
+            frame = page[offset:offset + height].copy()
+            _draw_browser_chrome(frame, "summary")
+        else:
+            frame = _render_form(width, height, progress, typed_only=scenario == 'typing')
+        # Blinking caret so that consecutive frames are never byte-identical
+        if (index // max(fps // 2, 1)) % 2 == 0:
+            cv2.line(frame, (width - 30, height - 60), (width - 30, height - 30), (0, 0, 0), 2)
+        yield frame
+
+
+def generate_recording(output_path, scenario='form', duration=10.0, width=1280, height=720, fps=10):
+    """Generate a synthetic screen recording (H.264 + AAC) of a text-heavy page (see recording_frames)."""
+    work_dir = tempfile.mkdtemp()
+    try:
+        silent_path = os.path.join(work_dir, "video.avi")
+        audio_path = os.path.join(work_dir, "audio.wav")
+        frames = recording_frames(scenario, duration, width, height, fps)
+        writer = cv2.VideoWriter(silent_path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+        for frame in frames:
+            writer.write(frame)
+        writer.release()
+
+        _write_speech_like_audio(audio_path, duration)
+        command = [
+            get_ffmpeg_exe(), '-y', '-loglevel', 'error', '-i', silent_path, '-i', audio_path,
+            '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p', '-c:a', 'aac', '-shortest',
+            output_path
+        ]
+        subprocess.run(command, check=True)
+        return output_path
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def build_fixture(work_dir, scenario, duration, width, height, fps):
+    """Generate the recording and the ZIP upload the stages run on."""
+    video_path = os.path.join(work_dir, "final_output.mp4")
+    generate_recording(video_path, scenario, duration, width, height, fps)
+    zip_path = os.path.join(work_dir, "upload.zip")
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        zip_ref.write(video_path, "final_output.mp4")
+        zip_ref.writestr("comment1.txt", "Synthetic benchmark recording")
+    return {
+        'work_dir': work_dir,
+        'video_path': video_path,
+        'zip_path': zip_path,
+        'frames': max(1, int(duration * fps)),
+        'duration': duration
+    }
+
+
+# Stage runners (each runs in a fresh process so its peak RSS is its own)
+
+def _bench_config(model):
+    config = Config()
+    config.whisper_model = model
+    return config
+
+
+def _run_extract(fixture, options, events):
+    output_dir = tempfile.mkdtemp(dir=fixture['work_dir'])
+    with events.span('benchmark', component='benchmark'):
+        with zipfile.ZipFile(fixture['zip_path'], 'r') as zip_ref:
+            zip_ref.extract("final_output.mp4", output_dir)
+        events.count('bytes_written', os.path.getsize(os.path.join(output_dir, "final_output.mp4")))
+
+
+def _run_convert_audio(fixture, options, events):
+    from audio_processor import AudioProcessor
+    processor = AudioProcessor(_bench_config(options['whisper_model']), events=events)
+    audio_path = os.path.join(tempfile.mkdtemp(dir=fixture['work_dir']), "audio.f32")
+    with events.span('benchmark', component='benchmark'):
+        processor.load_audio(fixture['video_path'], audio_path)
+
+
+def _run_transcribe(fixture, options, events):
+    from audio_processor import AudioProcessor
+    processor = AudioProcessor(_bench_config(options['whisper_model']), events=events)
+    audio = processor.load_audio(fixture['video_path'])
+    with events.span('benchmark', component='benchmark'):
+        processor.transcribe_audio(audio)
+
+
+def _run_pii_aws(fixture, options, events):
+    from aws_pii_processor import AWSPIIProcessor
+    from fakes import FakeRekognitionClient, FakeComprehendClient
+    processor = AWSPIIProcessor(Config(), events=events)
+    # Cloud calls are stubbed so the benchmark measures local work plus simulated latency
+    processor.aws_client = FakeRekognitionClient(latency=options['api_latency'])
+    processor.comp_detect = FakeComprehendClient(latency=options['api_latency'])
+    output_path = os.path.join(tempfile.mkdtemp(dir=fixture['work_dir']), "pii.mp4")
+    with events.span('benchmark', component='benchmark'):
+        processor.process_video(fixture['video_path'], output_path)
+
+
+def _run_pii_paddleocr(fixture, options, events):
+    from paddleocr_pii_processor import PaddleOCRPIIProcessor
+    processor = PaddleOCRPIIProcessor(Config(), events=events)
+    output_path = os.path.join(tempfile.mkdtemp(dir=fixture['work_dir']), "pii.mp4")
+    with events.span('benchmark', component='benchmark'):
+        processor.process_video(fixture['video_path'], output_path)
+
+
+def _run_encode(fixture, options, events):
+    from video_io import SegmentedVideoWriter, concat_segments
+    cap = cv2.VideoCapture(fixture['video_path'])
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    output_dir = tempfile.mkdtemp(dir=fixture['work_dir'])
+    with events.span('benchmark', component='benchmark'):
+        writer = SegmentedVideoWriter(os.path.join(output_dir, "segments"), fps, size)
+        for frame in frames:
+            writer.write(frame)
+        events.count('frames', len(frames))
+        concat_segments(writer.close(), os.path.join(output_dir, "encoded.mp4"))
+
+
+STAGE_RUNNERS = {
+    'extract': _run_extract,
+    'convert_audio': _run_convert_audio,
+    'transcribe': _run_transcribe,
+    'pii_aws': _run_pii_aws,
+    'pii_paddleocr': _run_pii_paddleocr,
+    'encode': _run_encode
+}
+
+
+def peak_rss_mb():
+    """Return this process's peak resident set size in MiB, or None if unavailable."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in KiB on Linux and in bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except (ImportError, AttributeError):
+            return None
+
+
+def _stage_worker(stage, fixture, options, results):
+    """Run one stage in this (child) process and report its measurements."""
+    aggregator = EventAggregator()
+    events = EventBus([aggregator])
+    try:
+        STAGE_RUNNERS[stage](fixture, options, events)
+    except Exception as e:
+        results.put({'stage': stage, 'status': 'error', 'error': str(e)})
+        return
+    summary = aggregator.summary()
+    timing = summary['stages'].get('benchmark', {})
+    counters = {}
+    for stage_counters in summary['counters'].values():
+        for name, value in stage_counters.items():
+            counters[name] = counters.get(name, 0) + value
+    frames = counters.get('frames', 0)
+    wall_time = timing.get('wall_time', 0.0)
+    results.put({
+        'stage': stage,
+        'status': 'ok',
+        'wall_time': wall_time,
+        'cpu_time': timing.get('process_cpu_time', 0.0),
+        'frames': frames,
+        'fps': frames / wall_time if frames and wall_time else None,
+        'realtime_factor': wall_time / fixture['duration'] if fixture['duration'] else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'counters': counters
+    })
+
+
+def _run_in_child(target, args, timeout, failure):
+    """Run target(*args, results) in a fresh spawned process and return what it puts on results."""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=target, args=args + (results,))
+    process.start()
+    deadline = time.time() + timeout
+    while True:
+        try:
+            result = results.get(timeout=1)
+            break
+        except queue.Empty:
+            if process.is_alive() and time.time() < deadline:
+                continue
+            try:
+                result = results.get(timeout=1)
+            except queue.Empty:
+                process.terminate()
+                result = dict(failure, status='error', error='timed out or crashed')
+            break
+    process.join()
+    return result
+
+
+def run_stage(stage, fixture, options):
+    """Run one stage in a fresh spawned process and return its measurements."""
+    return _run_in_child(_stage_worker, (stage, fixture, options), options['timeout'], {'stage': stage})
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return a list of stages whose wall time regressed by more than tolerance."""
+    regressions = []
+    for stage, current in results['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if not previous or current.get('status') != 'ok' or previous.get('status') != 'ok':
+            continue
+        if current['wall_time'] > previous['wall_time'] * (1 + tolerance):
+            regressions.append(
+                f"{stage}: {previous['wall_time']:.2f}s -> {current['wall_time']:.2f}s "
+                f"(+{(current['wall_time'] / previous['wall_time'] - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def run_stages(args):
+    """Benchmark the FileProcessor stages on a synthetic recording."""
+    width, height = (int(value) for value in args.resolution.lower().split('x'))
+    stages = args.stages.split(',') if args.stages else list(STAGES)
+    for stage in stages:
+        if stage not in STAGE_RUNNERS:
+            raise SystemExit(f"Unknown stage '{stage}'. Choose from: {', '.join(STAGES)}")
+
+    work_dir = tempfile.mkdtemp(prefix="benchmark-")
+    try:
+        print(f"Generating {args.duration:.0f}s {args.scenario} recording at {width}x{height}@{args.fps}fps...")
+        fixture = build_fixture(work_dir, args.scenario, args.duration, width, height, args.fps)
+        options = {
+            'whisper_model': args.whisper_model,
+            'api_latency': args.api_latency,
+            'timeout': args.timeout
+        }
+        results = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'params': {
+                'scenario': args.scenario, 'duration': args.duration, 'width': width, 'height': height,
+                'fps': args.fps, 'whisper_model': args.whisper_model, 'api_latency': args.api_latency
+            },
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count()
+            },
+            'stages': {}
+        }
+        for stage in stages:
+            result = run_stage(stage, fixture, options)
+            results['stages'][stage] = result
+            if result['status'] == 'ok':
+                fps = f"{result['fps']:.1f} fps" if result['fps'] else "-"
+                rss = f"{result['peak_rss_mb']:.0f} MiB" if result['peak_rss_mb'] else "-"
+                print(f"{stage:>14}: {result['wall_time']:8.2f}s  {fps:>12}  peak RSS {rss}")
+            else:
+                print(f"{stage:>14}: skipped ({result['error']})")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+# Speech recognition backends
+
+# 26 s clip of synthesized (espeak-ng) speech of a user narrating a sign-in problem, and its transcript
+ASR_CLIP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "asr_clip.ogg")
+ASR_REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "asr_clip.txt")
+
+def _normalize_words(text):
+    """Lowercase text and split it into words, ignoring punctuation."""
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """Word error rate of hypothesis against reference: (substitutions + insertions + deletions) / words."""
+    reference_words = _normalize_words(reference)
+    hypothesis_words = _normalize_words(hypothesis)
+    if not reference_words:
+        return 0.0 if not hypothesis_words else 1.0
+    previous = list(range(len(hypothesis_words) + 1))
+    for i, reference_word in enumerate(reference_words, 1):
+        current = [i]
+        for j, hypothesis_word in enumerate(hypothesis_words, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (reference_word != hypothesis_word)
+            ))
+        previous = current
+    return previous[-1] / len(reference_words)
+
+
+def _asr_worker(backend, model, audio_path, reference, options, results):
+    """Load one ASR backend/model in this (child) process and transcribe the clip with it."""
+    from audio_processor import AudioProcessor, SAMPLE_RATE
+    config = Config()
+    config.asr_backend = backend
+    config.whisper_model = model
+    config.vad_enabled = options['vad']
+    config.transcribe_workers = 1
+    try:
+        started = time.perf_counter()
+        processor = AudioProcessor(config)
+        with processor.model():
+            # Models load on first use; load it here so it is not timed as transcription
+            load_time = time.perf_counter() - started
+        audio = processor.load_audio(audio_path)
+        started = time.perf_counter()
+        result = processor.transcribe_audio(audio)
+        wall_time = time.perf_counter() - started
+    except Exception as e:
+        results.put({'backend': backend, 'model': model, 'status': 'error', 'error': str(e)})
+        return
+    audio_seconds = len(audio) / SAMPLE_RATE
+    results.put({
+        'backend': backend,
+        'model': processor.model_name,
+        'status': 'ok',
+        'load_time': load_time,
+        'wall_time': wall_time,
+        'audio_seconds': audio_seconds,
+        'realtime_factor': wall_time / audio_seconds if audio_seconds else None,
+        'wer': word_error_rate(reference, result['text']),
+        'peak_rss_mb': peak_rss_mb()
+    })
+
+
+def run_asr(args):
+    """Compare real-time factor and word error rate of the ASR backends on a clip."""
+    from asr_backends import ASR_BACKENDS, pick_model_size
+    backends = args.backends.split(',')
+    for backend in backends:
+        if backend not in ASR_BACKENDS:
+            raise SystemExit(f"Unknown backend '{backend}'. Choose from: {', '.join(ASR_BACKENDS)}")
+    with open(args.reference, 'r', encoding='utf-8') as f:
+        reference = f.read()
+
+    options = {'vad': not args.no_vad}
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'params': {'audio': os.path.basename(args.audio), 'vad': options['vad'], 'rtf_budget': args.rtf_budget},
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'runs': []
+    }
+    for backend in backends:
+        print(f"{backend}: auto model for RTF budget {args.rtf_budget} -> {pick_model_size(backend, args.rtf_budget)}")
+        for model in args.models.split(','):
+            result = _run_in_child(_asr_worker, (backend, model, args.audio, reference, options), args.timeout,
+                                   {'backend': backend, 'model': model})
+            results['runs'].append(result)
+            if result['status'] == 'ok':
+                print(f"{backend:>15} {result['model']:>9}: RTF {result['realtime_factor']:.3f}  "
+                      f"WER {result['wer'] * 100:5.1f}%  load {result['load_time']:.1f}s  "
+                      f"peak RSS {result['peak_rss_mb'] or 0:.0f} MiB")
+            else:
+                print(f"{backend:>15} {model:>9}: skipped ({result['error']})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+# Friction pre-filter
+
+FRICTION_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "friction_transcript.json")
+
+
+def evaluate_prefilter(segments, prefilter):
+    """Compare the pre-filtered transcript with the full one on hand-labelled segments.
+
+    Returns the prompt tokens of both transcripts, the token reduction, and the recall
+    of labelled friction segments among the segments forwarded to the LLM.
+    """
+    from gpt_analyzer import count_tokens
+
+    def transcript(selected):
+        return "\n".join(f"[{segment['start']:.2f} --> {segment['end']:.2f}] {segment['text'].strip()}"
+                         for segment in selected)
+
+    kept = prefilter.select(segments)
+    kept_ids = {id(segment) for segment in kept}
+    labelled = [segment for segment in segments if segment.get('friction')]
+    full_tokens = count_tokens(transcript(segments))
+    kept_tokens = count_tokens(transcript(kept))
+    return {
+        'segments': len(segments),
+        'segments_kept': len(kept),
+        'tokens': full_tokens,
+        'tokens_kept': kept_tokens,
+        'token_reduction': 1 - kept_tokens / full_tokens if full_tokens else 0.0,
+        'recall': sum(id(segment) in kept_ids for segment in labelled) / len(labelled) if labelled else None,
+        'missed': [segment['text'].strip() for segment in labelled if id(segment) not in kept_ids]
+    }
+
+
+def run_prefilter(args):
+    """Report token reduction and recall of the friction pre-filter on a labelled transcript."""
+    from friction_filter import FrictionPrefilter
+    with open(args.fixture, 'r', encoding='utf-8') as f:
+        segments = json.load(f)['segments']
+    results = {'fixture': os.path.basename(args.fixture), 'runs': []}
+    for threshold in (float(value) for value in args.thresholds.split(',')):
+        prefilter = FrictionPrefilter(threshold, args.context, args.pause)
+        result = dict(evaluate_prefilter(segments, prefilter), threshold=threshold, context_seconds=args.context)
+        results['runs'].append(result)
+        print(f"threshold {threshold:4.2f}: kept {result['segments_kept']:>3}/{result['segments']} segments, "
+              f"tokens {result['tokens_kept']}/{result['tokens']} (-{result['token_reduction'] * 100:.0f}%), "
+              f"recall {result['recall'] * 100:.0f}%")
+        for text in result['missed']:
+            print(f"{'':>18}missed: {text}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+# Prompt compaction
+
+def evaluate_prompt(segments, compiler, overhead_tokens=0):
+    """Compare the compiled prompt windows with the verbose VTT-style transcript.
+
+    Besides token counts, every line start and end is written the way the prompt shows
+    it and mapped back, to check that reported times land on the exact segment times.
+    """
+    from gpt_analyzer import count_tokens, format_time
+    from prompt_compiler import format_offset
+
+    verbose = "\n".join(f"[{format_time(segment['start'])} --> {format_time(segment['end'])}] {segment['text'].strip()}"
+                        for segment in segments if segment['text'].strip())
+    windows = compiler.compile(segments, overhead_tokens=overhead_tokens)
+    errors = [
+        abs(window.to_absolute(float(format_offset(time - window.origin)), edge) - time)
+        for window in windows for line in window.lines
+        for edge, times in (('start', line.starts), ('end', line.ends)) for time in times
+    ]
+    verbose_tokens = count_tokens(verbose)
+    compact_tokens = sum(count_tokens(window.text) for window in windows)
+    return {
+        'segments': len(segments),
+        'lines': sum(len(window.lines) for window in windows),
+        'windows': len(windows),
+        'tokens': verbose_tokens,
+        'tokens_compact': compact_tokens,
+        'token_reduction': 1 - compact_tokens / verbose_tokens if verbose_tokens else 0.0,
+        'max_window_tokens': max((window.tokens + overhead_tokens for window in windows), default=0),
+        'max_time_error': max(errors, default=0.0)
+    }
+
+
+def run_prompt(args):
+    """Report the token savings and timestamp round-trip error of the prompt compiler."""
+    from prompt_compiler import PromptCompiler
+    config = Config()
+    with open(args.fixture, 'r', encoding='utf-8') as f:
+        segments = json.load(f)['segments']
+    results = {'fixture': os.path.basename(args.fixture), 'runs': []}
+    for budget in (int(value) for value in args.budgets.split(',')):
+        compiler = PromptCompiler(budget, config.gpt_window_seconds, config.gpt_window_overlap_seconds,
+                                  config.prompt_merge_gap_seconds, config.prompt_max_line_seconds,
+                                  config.prompt_drop_fillers)
+        result = dict(evaluate_prompt(segments, compiler, args.overhead), token_budget=budget)
+        results['runs'].append(result)
+        print(f"budget {budget:>6}: {result['segments']} segments -> {result['lines']} lines in "
+              f"{result['windows']} windows (largest {result['max_window_tokens']} tokens), "
+              f"tokens {result['tokens_compact']}/{result['tokens']} ({-result['token_reduction'] * 100:+.0f}%), "
+              f"max time error {result['max_time_error'] * 1000:.0f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+# LLM backends
+
+# Simulated backends: first-token latency (s), delay between streamed chunks (s) and
+# concurrency limit. "openai" stands for a WAN round trip to a hosted model, "local"
+# for an on-prem llama.cpp/vLLM server on the same network.
+LLM_PROFILES = "openai=0.8/0.02/4,local=0.05/0.01/8"
+
+
+def parse_llm_profiles(spec):
+    """Parse "name=latency/chunk_delay/concurrency,..." into (name, latency, chunk_delay, concurrency) tuples."""
+    profiles = []
+    for entry in spec.split(','):
+        name, values = entry.split('=')
+        latency, chunk_delay, concurrency = values.split('/')
+        profiles.append((name.strip(), float(latency), float(chunk_delay), int(concurrency)))
+    return profiles
+
+
+def repeat_segments(segments, minutes):
+    """Repeat a transcript's segments back to back to make a transcript of about minutes minutes."""
+    length = segments[-1]['end'] + 5.0
+    repeated = []
+    offset = 0.0
+    while offset < minutes * 60:
+        repeated.extend(dict(segment, start=segment['start'] + offset, end=segment['end'] + offset)
+                        for segment in segments if segment['start'] + offset < minutes * 60)
+        offset += length
+    return repeated
+
+
+def benchmark_llm_backend(segments, name, latency, chunk_delay, concurrency, token_budget):
+    """Analyze segments against a FakeOpenAIServer playing one backend and time it."""
+    from events import EventAggregator
+    from fakes import FakeOpenAIServer, fake_friction_analysis
+    from gpt_analyzer import GPTAnalyzer
+    from llm_backends import LLMBackend
+
+    config = Config()
+    config.gpt_cache_enabled = False
+    config.gpt_prompt_token_budget = token_budget
+    with FakeOpenAIServer(latency=latency, chunk_delay=chunk_delay) as server:
+        backend = LLMBackend(f"bench-{name}", server.base_url, 'bench-model', max_concurrency=concurrency)
+        analyzer = GPTAnalyzer(config, backend=backend)
+        aggregator = EventAggregator()
+        descriptions = []
+        first_point = None
+        with analyzer.events.subscribed(aggregator):
+            started = time.perf_counter()
+            for point in analyzer.stream_friction_points(segments):
+                descriptions.append(point['description'])
+                if first_point is None:
+                    first_point = time.perf_counter() - started
+            elapsed = time.perf_counter() - started
+        requests = aggregator.summary()['stages'].get('gpt_request', {})
+        # The stub's descriptions contain non-ASCII quotes; each must arrive intact
+        sent = {
+            point['description']
+            for request in server.requests
+            for point in json.loads(fake_friction_analysis(request['messages'][-1]['content']))['friction_points']
+        }
+        minutes = (segments[-1]['end'] - segments[0]['start']) / 60
+        return {
+            'backend': name,
+            'latency': latency,
+            'chunk_delay': chunk_delay,
+            'concurrency': concurrency,
+            'transcript_minutes': minutes,
+            'requests': len(server.requests),
+            'peak_concurrency': server.max_active,
+            'connections': len(server.connections),
+            'points': len(descriptions),
+            'garbled_points': sum(description not in sent for description in descriptions),
+            'time_to_first_point': first_point,
+            'mean_request_time': requests['wall_time'] / requests['count'] if requests.get('count') else None,
+            'wall_time': elapsed,
+            'seconds_per_transcript_minute': elapsed / minutes if minutes else None,
+            'transcript_minutes_per_second': minutes / elapsed if elapsed else None
+        }
+
+
+def run_llm(args):
+    """Compare latency and throughput of LLM backends, simulated by local stub servers."""
+    with open(args.fixture, 'r', encoding='utf-8') as f:
+        segments = repeat_segments(json.load(f)['segments'], args.minutes)
+    results = {'fixture': os.path.basename(args.fixture), 'runs': []}
+    for name, latency, chunk_delay, concurrency in parse_llm_profiles(args.profiles):
+        result = benchmark_llm_backend(segments, name, latency, chunk_delay, concurrency, args.token_budget)
+        results['runs'].append(result)
+        first = result['time_to_first_point']
+        print(f"{name:>10}: {result['requests']} requests (peak {result['peak_concurrency']} concurrent, "
+              f"{result['connections']} connections), mean request {result['mean_request_time']:.2f}s, "
+              f"first point {first or 0:.2f}s, total {result['wall_time']:.2f}s for "
+              f"{result['transcript_minutes']:.1f} min ({result['seconds_per_transcript_minute']:.2f}s "
+              f"per transcript minute)")
+        if result['garbled_points']:
+            print(f"GARBLED {name}: {result['garbled_points']} streamed descriptions differ from the ones sent")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 1 if any(result['garbled_points'] for result in results['runs']) else 0
+
+
+# AWS PII request volume
+
+# Settings of the AWS PII pass compared by the pii benchmark, each run adding one optimization
+PII_RUNS = (
+    ('per-frame', {'pii_diff_enabled': False, 'comprehend_batch_frames': 1, 'pii_mosaic_enabled': False}),
+    ('change-detection', {'comprehend_batch_frames': 1, 'pii_mosaic_enabled': False}),
+    ('comprehend-batching', {'pii_mosaic_enabled': False}),
+    ('mosaic', {})
+)
+
+
+def screen_vocabulary():
+    """Every word drawn on the synthetic screens, for the fake Rekognition client to read."""
+    words = set()
+    for label, value in FORM_FIELDS:
+        words.update(f"{label} {value}".split())
+    for line in PAGE_TEXT:
+        words.update(line.split())
+    words.update(f"https://my.example.gov.au/{title}" for title in ('details', 'summary'))
+    return sorted(words)
+
+
+def _box_iou(a, b):
+    left, top = max(a['Left'], b['Left']), max(a['Top'], b['Top'])
+    right = min(a['Left'] + a['Width'], b['Left'] + b['Width'])
+    bottom = min(a['Top'] + a['Height'], b['Top'] + b['Height'])
+    overlap = max(0.0, right - left) * max(0.0, bottom - top)
+    union = a['Width'] * a['Height'] + b['Width'] * b['Height'] - overlap
+    return overlap / union if union else 0.0
+
+
+def box_agreement(reference, boxes, threshold=0.5):
+    """Return (recall, precision) of per-frame blur boxes against reference boxes, matching at IoU >= threshold."""
+    matched = found = 0
+    for expected, actual in zip(reference, boxes):
+        matched += sum(1 for box in expected if any(_box_iou(box, other) >= threshold for other in actual))
+        found += sum(1 for box in actual if any(_box_iou(box, other) >= threshold for other in expected))
+    expected_total = sum(len(frame) for frame in reference)
+    actual_total = sum(len(frame) for frame in boxes)
+    return (matched / expected_total if expected_total else 1.0, found / actual_total if actual_total else 1.0)
+
+
+def benchmark_pii_requests(frames, fps, settings, latency=0.0, vocabulary=None):
+    """Run the AWS PII pass over BGR frames against the fakes with the given Config settings.
+
+    Returns the requests sent and bytes uploaded per minute of video, and the blur
+    boxes of every frame.
+    """
+    from aws_pii_processor import AWSPIIProcessor
+    from fakes import FakeRekognitionClient, FakeComprehendClient
+
+    config = Config()
+    # The fakes have no rate limits, and request counts are what is measured
+    config.rekognition_requests_per_second = None
+    config.comprehend_requests_per_second = None
+    for name, value in settings.items():
+        setattr(config, name, value)
+    processor = AWSPIIProcessor(config)
+    processor.aws_client = FakeRekognitionClient(latency=latency, vocabulary=vocabulary or screen_vocabulary())
+    processor.comp_detect = FakeComprehendClient(latency=latency)
+    rgb_frames = (cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames)
+    boxes = []
+    started = time.perf_counter()
+    for _, frame_boxes in processor.iter_pii_boxes(rgb_frames, processor._change_detector()):
+        boxes.append(frame_boxes)
+    elapsed = time.perf_counter() - started
+    minutes = len(boxes) / fps / 60
+    rekognition = processor.aws_client
+    comprehend = processor.comp_detect
+    return {
+        'frames': len(boxes),
+        'video_minutes': minutes,
+        'rekognition_requests': rekognition.calls,
+        'comprehend_requests': comprehend.calls,
+        'rekognition_per_minute': rekognition.calls / minutes,
+        'comprehend_per_minute': comprehend.calls / minutes,
+        'upload_mb_per_minute': (rekognition.bytes_received + comprehend.bytes_received) / 1024 ** 2 / minutes,
+        'pii_boxes': sum(len(frame) for frame in boxes),
+        'wall_time': elapsed
+    }, boxes
+
+
+def run_pii(args):
+    """Compare the AWS requests per minute of video of the PII pass with each optimization."""
+    width, height = (int(value) for value in args.resolution.lower().split('x'))
+    vocabulary = screen_vocabulary()
+    results = {'resolution': args.resolution, 'fps': args.fps, 'duration': args.duration, 'runs': []}
+    for scenario in args.scenarios.split(','):
+        reference = None
+        for name, settings in PII_RUNS:
+            frames = recording_frames(scenario, args.duration, width, height, args.fps)
+            result, boxes = benchmark_pii_requests(frames, args.fps, settings, args.api_latency, vocabulary)
+            if reference is None:
+                reference = boxes
+            result['box_recall'], result['box_precision'] = box_agreement(reference, boxes)
+            result.update(scenario=scenario, run=name)
+            results['runs'].append(result)
+            print(f"{scenario:>7} {name:>20}: {result['rekognition_per_minute']:7.1f} Rekognition + "
+                  f"{result['comprehend_per_minute']:7.1f} Comprehend requests/min, "
+                  f"{result['upload_mb_per_minute']:7.1f} MB/min uploaded, "
+                  f"boxes vs per-frame {result['box_recall']:.1%} recall / {result['box_precision']:.1%} precision, "
+                  f"{result['wall_time']:.1f}s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+# Rekognition payload encoding
+
+PAYLOAD_ENCODERS = "png,jpeg95,jpeg90,jpeg75,jpeg90-1280,jpeg90-grey,jpeg90-1280-grey,jpeg75-960-grey"
+
+
+def parse_payload_encoder(spec):
+    """Parse "png" or "jpeg<quality>[-<max long edge>][-grey]" into a RekognitionImageEncoder."""
+    from aws_pii_processor import RekognitionImageEncoder
+    match = re.fullmatch(r"(png|jpeg)(\d+)?((?:-\d+)?)(-grey)?", spec.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid payload encoder '{spec}'.")
+    return RekognitionImageEncoder(
+        format=match.group(1).upper(),
+        quality=int(match.group(2) or 90),
+        max_long_edge=int(match.group(3)[1:]) if match.group(3) else None,
+        grayscale=bool(match.group(4))
+    )
+
+
+def sample_screens(scenario, width, height, count):
+    """Return count RGB frames spread over a synthetic recording of the scenario.
+
+    The recording is encoded to H.264 and decoded again, so the screens carry the
+    compression noise of the frames the PII pass really uploads.
+    """
+    work_dir = tempfile.mkdtemp()
+    try:
+        video_path = generate_recording(os.path.join(work_dir, "screens.mp4"), scenario, count, width, height, fps=1)
+        cap = cv2.VideoCapture(video_path)
+        screens = []
+        while len(screens) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            screens.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        cap.release()
+        return screens
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def benchmark_payload_encoder(screens, encoder, reference=None, vocabulary=None, threshold=0.5):
+    """Encode screens with encoder, read them with the fake Rekognition client and time it.
+
+    Words are read through AWSPIIProcessor.detect_text_from_image, so their boxes
+    are normalized exactly as the pipeline uses them. With reference (the words
+    read from lossless PNG), recall counts the reference words read again with the
+    same text and a box of IoU >= threshold on the full-resolution frame.
+    """
+    from PIL import Image
+    from aws_pii_processor import AWSPIIProcessor
+    from fakes import FakeRekognitionClient
+
+    config = Config()
+    config.rekognition_requests_per_second = None
+    processor = AWSPIIProcessor(config)
+    processor.image_encoder = encoder
+    processor.aws_client = FakeRekognitionClient(vocabulary=vocabulary or screen_vocabulary())
+    images = [Image.fromarray(screen) for screen in screens]
+    encode_time = 0.0
+    for image in images:
+        started = time.perf_counter()
+        encoder.encode(image)
+        encode_time += time.perf_counter() - started
+    words = [processor.detect_text_from_image(image) for image in images]
+    result = {
+        'encoder': encoder.fingerprint(),
+        'encode_ms': encode_time / len(images) * 1000,
+        'kb_per_image': processor.aws_client.bytes_received / len(images) / 1024,
+        'words': sum(len(frame) for frame in words)
+    }
+    if reference is not None:
+        expected = matched = 0
+        for expected_words, actual_words in zip(reference, words):
+            expected += len(expected_words)
+            matched += sum(1 for text, box in expected_words if any(
+                text == other and _box_iou(box, other_box) >= threshold for other, other_box in actual_words))
+        result['recall'] = matched / expected if expected else 1.0
+    return result, words
+
+
+def run_payload(args):
+    """Compare encode time, upload size and OCR recall of Rekognition payload encoders against PNG."""
+    vocabulary = screen_vocabulary()
+    results = {'runs': []}
+    for resolution in args.resolutions.split(','):
+        width, height = (int(value) for value in resolution.lower().split('x'))
+        for scenario in args.scenarios.split(','):
+            screens = sample_screens(scenario, width, height, args.screens)
+            reference = None
+            for spec in ['png'] + [spec for spec in args.encoders.split(',') if spec.strip().lower() != 'png']:
+                result, words = benchmark_payload_encoder(
+                    screens, parse_payload_encoder(spec), reference, vocabulary)
+                if reference is None:
+                    reference = words
+                    result['recall'] = 1.0
+                result.update(resolution=resolution, scenario=scenario, spec=spec)
+                results['runs'].append(result)
+                print(f"{resolution:>9} {scenario:>7} {spec:>18}: {result['encode_ms']:6.1f} ms, "
+                      f"{result['kb_per_image']:7.1f} KB per image, OCR recall vs PNG {result['recall']:.1%}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+# S3 range reads
+
+def build_s3_upload(member_sizes, seed=0):
+    """Build a ZIP upload of stored (uncompressed) members of random bytes, in the given order."""
+    random = np.random.default_rng(seed)
+    members = {name: random.integers(0, 256, size, dtype=np.uint8).tobytes() for name, size in member_sizes}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zip_ref:
+        for name, data in members.items():
+            zip_ref.writestr(name, data)
+    return buffer.getvalue(), members
+
+
+def benchmark_s3_extract(upload, members, member, block_size, cache_blocks, readahead):
+    """Extract one member of an upload through S3Handler.open_zip from a FakeS3Client and check the reads.
+
+    Checks that every range fetched after the ZIP tail falls within the member, that
+    no block is fetched twice, that the block cache stays within cache_blocks, that
+    the member is extracted intact, and that a read after the object is overwritten
+    (its ETag changes) fails instead of mixing two versions.
+    """
+    from fakes import FakeS3Client
+    from s3_handler import S3Handler
+
+    config = Config()
+    config.bucket_name = 'bench'
+    config.s3_block_size = block_size
+    config.s3_cache_blocks = cache_blocks
+    config.s3_readahead_blocks = readahead
+    handler = S3Handler(config)
+    client = handler.s3_client = FakeS3Client()
+    client.put_object(Bucket='bench', Key='upload.zip', Body=upload)
+
+    failures = []
+    output_dir = tempfile.mkdtemp()
+    try:
+        with handler.open_zip('upload.zip') as zip_ref:
+            tail_requests = client.requests
+            offsets = sorted(info.header_offset for info in zip_ref.infolist()) + [zip_ref.start_dir]
+            start = zip_ref.getinfo(member).header_offset
+            end = offsets[offsets.index(start) + 1]
+            max_cached = 0
+            with zip_ref.open(member) as source, open(os.path.join(output_dir, member), 'wb') as target:
+                while True:
+                    chunk = source.read(64 * 1024)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    max_cached = max(max_cached, len(zip_ref.fp._blocks))
+        member_ranges = client.ranges[tail_requests:]
+        outside = [(first, last) for first, last in member_ranges
+                   if last <= start - start % block_size or first >= end]
+        if outside:
+            failures.append(f"fetched {len(outside)} blocks outside {member}")
+        if len(set(member_ranges)) != len(member_ranges):
+            failures.append("fetched a block more than once")
+        if max_cached > max(cache_blocks, readahead + 1):
+            failures.append(f"cached {max_cached} blocks, over the {cache_blocks} block limit")
+        with open(os.path.join(output_dir, member), 'rb') as f:
+            if f.read() != members[member]:
+                failures.append(f"{member} was not extracted intact")
+        result = {
+            'member': member,
+            'member_bytes': len(members[member]),
+            'object_bytes': len(upload),
+            'block_size': block_size,
+            'cache_blocks': cache_blocks,
+            'readahead': readahead,
+            'requests': client.requests,
+            'bytes_fetched': client.bytes_sent,
+            'max_cached_blocks': max_cached
+        }
+
+        # Overwrite the object between opening it and reading the member
+        try:
+            with handler.open_zip('upload.zip') as zip_ref:
+                client.put_object(Bucket='bench', Key='upload.zip', Body=upload[::-1])
+                zip_ref.extract(member, output_dir)
+            failures.append("read of an overwritten object did not fail")
+        except Exception as e:
+            if 'PreconditionFailed' not in str(e):
+                failures.append(f"read of an overwritten object was not stopped by its ETag: {e}")
+        result['failures'] = failures
+        return result
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def run_s3(args):
+    """Check that ZIP members are extracted from S3 with range reads of only their own blocks."""
+    upload, members = build_s3_upload([
+        ('camera.mp4', int(args.member_mb * 1024 * 1024)),
+        ('final_output.mp4', int(args.member_mb * 1024 * 1024)),
+        ('merged_audio.mp4', int(args.member_mb * 1024 * 1024) // 4),
+        ('comment1.txt', 64)
+    ])
+    block_size = int(args.block_kb * 1024)
+    results = {'runs': []}
+    failures = []
+    for member in ('final_output.mp4', 'merged_audio.mp4'):
+        result = benchmark_s3_extract(upload, members, member, block_size, args.cache_blocks, args.readahead)
+        results['runs'].append(result)
+        print(f"{member:>17}: {result['member_bytes'] / 1024 ** 2:.1f} of {result['object_bytes'] / 1024 ** 2:.1f} MB, "
+              f"fetched {result['bytes_fetched'] / 1024 ** 2:.1f} MB in {result['requests']} requests, "
+              f"at most {result['max_cached_blocks']} blocks cached")
+        failures.extend(f"{member}: {failure}" for failure in result['failures'])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    for failure in failures:
+        print(f"FAILED {failure}")
+    return 1 if failures else 0
+
+
+# Cold start
+
+# Modules that take seconds to import and must stay off the startup path
+HEAVY_MODULES = ('torch', 'whisper', 'faster_whisper', 'paddle', 'paddleocr', 'moviepy', 'cv2', 'tensorflow')
+
+
+def import_time_report(module):
+    """Import module in a fresh interpreter with -X importtime and summarize the report.
+
+    Returns the module's cumulative import time, its direct imports with their
+    cumulative times, and which HEAVY_MODULES were imported.
+    """
+    env = dict(os.environ, KMP_DUPLICATE_LIB_OK="TRUE")
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    entries = []
+    errors = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            errors.append(line)
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # column header
+        name = fields[2].rstrip()
+        entries.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip())) // 2,
+            'self': int(fields[0]) / 1e6,
+            'cumulative': int(fields[1]) / 1e6
+        })
+    if result.returncode != 0:
+        return {'module': module, 'status': 'error', 'error': "\n".join(errors[-3:]).strip()}
+
+    # Entries are listed children first: the module's subtree is everything between
+    # the previous top-level entry (interpreter startup imports) and the module itself
+    end = max(index for index, entry in enumerate(entries) if entry['module'] == module)
+    start = end
+    while start > 0 and entries[start - 1]['depth'] > 0:
+        start -= 1
+    subtree = entries[start:end]
+    imported = {entry['module'].split('.')[0] for entry in subtree}
+    return {
+        'module': module,
+        'status': 'ok',
+        'import_time': entries[end]['cumulative'],
+        'imports': sorted(
+            ({'module': entry['module'], 'cumulative': entry['cumulative']}
+             for entry in subtree if entry['depth'] == 1),
+            key=lambda entry: entry['cumulative'], reverse=True
+        ),
+        'heavy_modules': [name for name in HEAVY_MODULES if name in imported]
+    }
+
+
+def run_startup(args):
+    """Check the import time of the entry points against a budget."""
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'params': {'budget': args.budget},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform()},
+        'modules': {}
+    }
+    failures = []
+    for module in args.modules.split(','):
+        report = import_time_report(module)
+        results['modules'][module] = report
+        if report['status'] != 'ok':
+            print(f"{module:>15}: failed to import ({report['error']})")
+            failures.append(f"{module}: import failed")
+            continue
+        heavy = ", ".join(report['heavy_modules']) or "none"
+        print(f"{module:>15}: {report['import_time']:6.3f}s  heavy modules: {heavy}")
+        for entry in report['imports'][:args.top]:
+            print(f"{'':>17}{entry['cumulative']:6.3f}s  {entry['module']}")
+        if report['import_time'] > args.budget:
+            failures.append(f"{module}: {report['import_time']:.3f}s > {args.budget:.3f}s budget")
+        if report['heavy_modules']:
+            failures.append(f"{module}: imports {heavy} at startup")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    for failure in failures:
+        print(f"OVER BUDGET {failure}")
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the video processing pipeline.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    stages_parser = subparsers.add_parser('stages', help="time each FileProcessor stage on a synthetic recording")
+    stages_parser.add_argument('--scenario', choices=SCENARIOS, default='form')
+    stages_parser.add_argument('--duration', type=float, default=20.0, help="recording length in seconds")
+    stages_parser.add_argument('--resolution', default='1280x720', help="WIDTHxHEIGHT")
+    stages_parser.add_argument('--fps', type=int, default=10)
+    stages_parser.add_argument('--stages', help=f"comma-separated subset of: {', '.join(STAGES)}")
+    stages_parser.add_argument('--whisper-model', default='tiny')
+    stages_parser.add_argument('--api-latency', type=float, default=0.0,
+                               help="simulated latency of each stubbed cloud call, in seconds")
+    stages_parser.add_argument('--timeout', type=float, default=3600, help="per-stage timeout in seconds")
+    stages_parser.add_argument('--output', help="write results as JSON to this file")
+    stages_parser.add_argument('--baseline', help="previous results JSON to check for regressions")
+    stages_parser.add_argument('--tolerance', type=float, default=0.15,
+                               help="allowed wall-time slowdown against the baseline (default: %(default)s)")
+    stages_parser.set_defaults(func=run_stages)
+
+    asr_parser = subparsers.add_parser('asr', help="compare RTF and WER of the speech recognition backends")
+    asr_parser.add_argument('--audio', default=ASR_CLIP, help="audio or video clip with speech (default: %(default)s)")
+    asr_parser.add_argument('--reference', default=ASR_REFERENCE,
+                            help="text file with the reference transcript of the clip (default: %(default)s)")
+    asr_parser.add_argument('--backends', default='whisper,whisper-int8,faster-whisper',
+                            help="comma-separated backends (default: %(default)s)")
+    asr_parser.add_argument('--models', default='tiny,base,small', help="comma-separated model sizes, or auto")
+    asr_parser.add_argument('--rtf-budget', type=float, default=Config().asr_rtf_budget,
+                            help="real-time factor budget used to report the auto model choice")
+    asr_parser.add_argument('--no-vad', action='store_true', help="transcribe the whole clip without VAD")
+    asr_parser.add_argument('--timeout', type=float, default=3600, help="per-run timeout in seconds")
+    asr_parser.add_argument('--output', help="write results as JSON to this file")
+    asr_parser.set_defaults(func=run_asr)
+
+    prefilter_parser = subparsers.add_parser('prefilter', help="token reduction and recall of the friction pre-filter")
+    prefilter_parser.add_argument('--fixture', default=FRICTION_FIXTURE,
+                                  help="JSON transcript with segments labelled 'friction' (default: the bundled fixture)")
+    prefilter_parser.add_argument('--thresholds', default='0.5,1.0,1.5', help="comma-separated score thresholds")
+    prefilter_parser.add_argument('--context', type=float, default=Config().friction_prefilter_context_seconds,
+                                  help="seconds of context kept around each candidate")
+    prefilter_parser.add_argument('--pause', type=float, default=Config().friction_prefilter_pause_seconds,
+                                  help="pause before a segment that counts as a cue, in seconds")
+    prefilter_parser.add_argument('--output', help="write results as JSON to this file")
+    prefilter_parser.set_defaults(func=run_prefilter)
+
+    prompt_parser = subparsers.add_parser('prompt', help="token savings and timestamp accuracy of prompt compaction")
+    prompt_parser.add_argument('--fixture', default=FRICTION_FIXTURE,
+                               help="JSON transcript with Whisper segments (default: the bundled fixture)")
+    prompt_parser.add_argument('--budgets', default=str(Config().gpt_prompt_token_budget),
+                               help="comma-separated prompt token budgets")
+    prompt_parser.add_argument('--overhead', type=int, default=500,
+                               help="tokens reserved for the instructions in every request")
+    prompt_parser.add_argument('--output', help="write results as JSON to this file")
+    prompt_parser.set_defaults(func=run_prompt)
+
+    llm_parser = subparsers.add_parser('llm', help="latency and throughput of LLM backends against local stubs")
+    llm_parser.add_argument('--profiles', default=LLM_PROFILES,
+                            help="comma-separated name=latency/chunk_delay/concurrency (default: %(default)s)")
+    llm_parser.add_argument('--minutes', type=float, default=30.0,
+                            help="transcript length, built by repeating the fixture (default: %(default)s)")
+    llm_parser.add_argument('--token-budget', type=int, default=1500, help="prompt token budget per request")
+    llm_parser.add_argument('--fixture', default=FRICTION_FIXTURE, help="JSON transcript with Whisper segments")
+    llm_parser.add_argument('--output', help="write results as JSON to this file")
+    llm_parser.set_defaults(func=run_llm)
+
+    pii_parser = subparsers.add_parser('pii', help="AWS requests per minute of video of the PII pass optimizations")
+    pii_parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="comma-separated scenarios")
+    pii_parser.add_argument('--duration', type=float, default=30.0, help="recording length in seconds")
+    pii_parser.add_argument('--resolution', default='1280x720', help="WIDTHxHEIGHT")
+    pii_parser.add_argument('--fps', type=int, default=10)
+    pii_parser.add_argument('--api-latency', type=float, default=0.0,
+                            help="simulated latency of each stubbed cloud call, in seconds")
+    pii_parser.add_argument('--output', help="write results as JSON to this file")
+    pii_parser.set_defaults(func=run_pii)
+
+    payload_parser = subparsers.add_parser('payload', help="encode time, size and OCR recall of Rekognition payloads")
+    payload_parser.add_argument('--encoders', default=PAYLOAD_ENCODERS,
+                                help="comma-separated png or jpeg<quality>[-<max long edge>][-grey] "
+                                     "(default: %(default)s)")
+    payload_parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="comma-separated scenarios")
+    payload_parser.add_argument('--resolutions', default='1280x720,1920x1080', help="comma-separated WIDTHxHEIGHT")
+    payload_parser.add_argument('--screens', type=int, default=8, help="screens sampled per scenario")
+    payload_parser.add_argument('--output', help="write results as JSON to this file")
+    payload_parser.set_defaults(func=run_payload)
+
+    s3_parser = subparsers.add_parser('s3', help="check that ZIP members are extracted with range reads of their blocks")
+    s3_parser.add_argument('--member-mb', type=float, default=8.0, help="size of the video members in MB")
+    s3_parser.add_argument('--block-kb', type=float, default=256, help="range read block size in KB")
+    s3_parser.add_argument('--cache-blocks', type=int, default=8)
+    s3_parser.add_argument('--readahead', type=int, default=4)
+    s3_parser.add_argument('--output', help="write results as JSON to this file")
+    s3_parser.set_defaults(func=run_s3)
+
+    startup_parser = subparsers.add_parser('startup', help="check entry point import times (-X importtime)")
+    startup_parser.add_argument('--modules', default='config,gui,worker',
+                                help="comma-separated modules to import (default: %(default)s)")
+    startup_parser.add_argument('--budget', type=float, default=1.0, help="allowed import time per module in seconds")
+    startup_parser.add_argument('--top', type=int, default=5, help="number of slowest direct imports to list")
+    startup_parser.add_argument('--output', help="write results as JSON to this file")
+    startup_parser.set_defaults(func=run_startup)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,30 @@
 # config.py
 
 import os
-import torch
+from functools import lru_cache
 
-# Detect GPU availability
-GPU_AVAILABLE = torch.cuda.is_available()
+
+@lru_cache(maxsize=None)
+def gpu_available():
+    """Detect GPU availability; imports torch, so it is only called once a model needs a device.
+
+    Installs without torch (e.g. faster-whisper only) ask CTranslate2 instead.
+    """
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        pass
+    try:
+        import ctranslate2
+        return ctranslate2.get_cuda_device_count() > 0
+    except ImportError:
+        return False
+
+
+# PII reduction model choices
+PII_MODEL_AWS = "Sensitive text detection (Based on AWS)"
+PII_MODEL_PADDLEOCR = "Sensitive text detection (Based on PaddleOCR)"
 
 class Config:
     """Configuration class for storing all constants and settings."""
@@ -17,13 +37,149 @@ class Config:
 
         # OpenAI configuration
         self.openai_api_key = 'openai key'
+        self.gpt_model = "gpt-4"
+        self.openai_base_url = "https://api.openai.com/v1"
+        self.gpt_request_timeout = 300
+        self.gpt_stream = True  # read completions as server-sent events, point by point
+
+        # LLM backend used for the friction analysis: "openai" (the settings above) or
+        # one of llm_backends, any OpenAI-compatible server such as llama.cpp or vLLM.
+        # Entries may set base_url, model, api_key, max_concurrency, requests_per_second,
+        # tokens_per_minute, json_mode and timeout
+        self.llm_backend = "openai"
+        self.llm_backends = {
+            'local': {
+                'base_url': "http://127.0.0.1:8080/v1",
+                'model': "llama-3.1-8b-instruct",
+                'max_concurrency': 8,
+                'json_mode': True
+            }
+        }
+
+        # Long transcripts are analyzed in overlapping time windows, concurrently; each
+        # request (instructions plus transcript) is kept within gpt_prompt_token_budget
+        self.gpt_window_seconds = 600
+        self.gpt_window_overlap_seconds = 60
+        self.gpt_max_concurrency = 4
+        self.gpt_prompt_token_budget = 6000
+
+        # Prompt compaction: adjacent segments less than prompt_merge_gap_seconds apart
+        # are merged into lines of up to prompt_max_line_seconds; filler-only segments
+        # ("um", "uh") are dropped
+        self.prompt_merge_gap_seconds = 1.0
+        self.prompt_max_line_seconds = 20.0
+        self.prompt_drop_fillers = True
+
+        # Local friction-candidate pre-filter: only segments scoring at least the
+        # threshold, plus the context around them, are sent to the LLM
+        self.friction_prefilter_enabled = True
+        self.friction_prefilter_threshold = 1.0
+        self.friction_prefilter_context_seconds = 15.0
+        self.friction_prefilter_pause_seconds = 3.0
+
+        # LLM response cache (identical prompts are answered from disk)
+        self.gpt_cache_enabled = True
+        self.gpt_cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "s3_file_processor", "llm")
+        self.gpt_cache_ttl = 30 * 24 * 3600
+        self.gpt_cache_max_bytes = 256 * 1024 ** 2
+
+        # Friction points are returned as JSON (see gpt_analyzer.FRICTION_SCHEMA);
+        # gpt_json_mode also sets response_format, for models that support it
+        self.gpt_json_mode = False
+        # SQLite index of the friction points of every processed session
+        self.friction_index_enabled = True
+        self.friction_index_path = os.path.join(
+            os.path.expanduser("~"), ".cache", "s3_file_processor", "friction_index.sqlite3")
+
+        # Outbound API rate limits, shared by every processor in the process. Calls are
+        # throttled to these rates and throttled/failed requests are retried with
+        # jittered exponential backoff (honouring Retry-After). worker.py divides them
+        # evenly between its worker processes
+        self.gpt_requests_per_second = 3.0
+        self.gpt_tokens_per_minute = 40000
+        self.rekognition_requests_per_second = 5.0
+        self.comprehend_requests_per_second = 20.0
+        self.aws_max_concurrency = 8
+        self.api_max_retries = 5
+        self.api_backoff_base = 0.5
+        self.api_backoff_max = 30.0
+
+        # AWS PII pass: each frame is compared with the last analyzed one on a grid of
+        # pii_diff_cell pixel cells; unchanged frames reuse its blur boxes and changed
+        # frames only send their changed regions (or the whole frame when more than
+        # pii_diff_full_frame_ratio of it changed)
+        self.pii_diff_enabled = True
+        self.pii_diff_cell = 16
+        self.pii_diff_threshold = 8.0  # mean grey-level change (0-255) that marks a cell as changed
+        self.pii_diff_max_regions = 3  # more changed regions than this are sent as their union
+        self.pii_diff_full_frame_ratio = 0.5
+        # Frames whose AWS requests may be in flight at once (results are written in
+        # order, so this bounds the frames held in memory), and frames decoded ahead
+        self.pii_pipeline_window = 32
+        self.pii_read_ahead_frames = 8
+        # The OCR text of up to comprehend_batch_frames analyzed frames is sent to
+        # Comprehend in one detect_pii_entities request of at most comprehend_batch_bytes
+        # (the API accepts up to 100 KB)
+        self.comprehend_batch_frames = 25
+        self.comprehend_batch_bytes = 50000
+        # The changed crops of several frames are tiled into one detect_text mosaic of
+        # at most pii_mosaic_max_side pixels per side and pii_mosaic_max_crops crops
+        self.pii_mosaic_enabled = True
+        self.pii_mosaic_max_side = 2048
+        self.pii_mosaic_max_crops = 16
+        # Images sent to Rekognition: lossless "PNG" or "JPEG" (at rekognition_jpeg_quality),
+        # downscaled to rekognition_max_long_edge pixels (None: full resolution). JPEG,
+        # downscaling and grayscale send fewer bytes but trade away redaction recall: a
+        # word Rekognition no longer reads is not blurred. Grayscale JPEG at quality 90
+        # kept 97% of the words against PNG in `benchmark.py payload`, which reads them
+        # with a local stand-in OCR; measure it against Rekognition before opting in
+        self.rekognition_image_format = "PNG"
+        self.rekognition_jpeg_quality = 90
+        self.rekognition_max_long_edge = None
+        self.rekognition_grayscale = False
 
         # Model settings
         self.friction_detection_model = "Semantic analysis by LLM (Based on GPT-4)"
-        self.pii_reduction_model = "Sensitive text detection (Based on AWS)"  # or "Sensitive text detection (Based on PaddleOCR)"
+        self.pii_reduction_model = PII_MODEL_AWS  # or PII_MODEL_PADDLEOCR
+        self.whisper_model = "medium"  # or "auto" to pick the largest size within asr_rtf_budget
+
+        # Speech recognition engine: "whisper" (openai-whisper), "whisper-int8" (torch
+        # dynamic int8 quantization, CPU) or "faster-whisper" (CTranslate2, int8 on CPU)
+        self.asr_backend = "whisper"
+        self.asr_rtf_budget = 0.5  # seconds of processing per second of speech
+
+        # Loaded models (Whisper, PaddleOCR) are shared per process and loaded on first
+        # use; models not in use are evicted when loading another would exceed this
+        self.model_memory_budget = 4 * 1024 ** 3
+
+        # Transcription: skip silence with voice activity detection and transcribe the
+        # speech in chunks of up to transcribe_chunk_seconds, in parallel on CPU
+        self.vad_enabled = True
+        self.transcribe_chunk_seconds = 30.0
+        self.transcribe_workers = None  # None: 1 on GPU, one per 4 cores (up to 4) on CPU; capped by the memory budget
+
+        # Device settings (resolved on first use, see the device property)
+        self._device = None
+
+        # S3 ranged-read settings (used to read single members out of uploaded ZIPs)
+        self.s3_block_size = 1024 * 1024
+        self.s3_cache_blocks = 32
+        self.s3_readahead_blocks = 8
+        self.s3_max_workers = 8
+        self.s3_zip_tail_size = 256 * 1024
 
-        # Device settings
-        self.device = torch.device("cuda" if GPU_AVAILABLE else "cpu")
+        # Stage result cache (artifacts are reused when the upload and settings are unchanged)
+        self.cache_enabled = True
+        self.cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "s3_file_processor", "results")
+        self.cache_max_bytes = 20 * 1024 ** 3
+
+        # Crash-safe job state (resumable jobs keep their working files here)
+        self.jobs_dir = os.path.join(os.path.expanduser("~"), ".cache", "s3_file_processor", "jobs")
+        self.pii_checkpoint_frames = 900  # flush a checkpoint every 900 frames (30 s at 30 fps)
+
+        # Headless worker settings
+        self.worker_concurrency = max(1, (os.cpu_count() or 2) // 2)
+        self.output_prefix = "processed/"
 
         # Window sizes
         self.main_window_width = 400
@@ -32,3 +188,18 @@ class Config:
         self.file_list_height = 400
         self.settings_width = 500  # Increased width to accommodate new options
         self.settings_height = 400  # Increased height to accommodate new options
+
+    @property
+    def device(self):
+        """Device name for the models, "cuda" or "cpu", detected on first access so importing config stays cheap.
+
+        Detection does not need torch: without it the device is "cpu".
+        """
+        if self._device is None:
+            self._device = "cuda" if gpu_available() else "cpu"
+        return self._device
+
+    @device.setter
+    def device(self, value):
+        # Accepts a torch.device too
+        self._device = str(value)
@@ -0,0 +1,183 @@
+# events.py
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Span:
+    """Timing and counters of one stage, filled in while the stage runs."""
+    def __init__(self, name, component):
+        self.name = name
+        self.component = component
+        self.counters = {}
+
+    def add(self, counter, value=1):
+        """Add to one of the span's counters (bytes_read, frames, api_calls, ...)."""
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+
+class EventBus:
+    """Fan out structured pipeline events to sinks.
+
+    Events are plain JSON-serializable dicts with at least ``type`` and ``time``:
+
+    - ``stage_start`` / ``stage_end``: emitted by ``span``; the end event carries
+      ``wall_time``, ``cpu_time`` (CPU of the stage's thread), ``process_cpu_time``,
+      ``status`` and the span's counters.
+    - ``counter``: an increment of a named counter (``frames``, ``api_calls``,
+      ``bytes_read``, ...), attributed to the innermost span on the emitting thread.
+    - ``progress``: a human-readable message and overall percentage for progress bars.
+
+    Sinks are callables taking one event. They are called on the emitting thread while
+    the bus lock is held, so a sink sees one event at a time.
+    """
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    def subscribe(self, sink):
+        with self._lock:
+            self.sinks.append(sink)
+
+    def unsubscribe(self, sink):
+        with self._lock:
+            if sink in self.sinks:
+                self.sinks.remove(sink)
+
+    @contextmanager
+    def subscribed(self, *sinks):
+        """Attach sinks for the duration of a with-block."""
+        for sink in sinks:
+            self.subscribe(sink)
+        try:
+            yield self
+        finally:
+            for sink in sinks:
+                self.unsubscribe(sink)
+
+    def emit(self, event_type, **fields):
+        event = {'type': event_type, 'time': time.time()}
+        event.update(fields)
+        with self._lock:
+            for sink in list(self.sinks):
+                sink(event)
+
+    def current_span(self):
+        """Return the innermost span running on this thread, or None."""
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name, component=None, **fields):
+        """Time a stage and emit its start and end events."""
+        span = Span(name, component)
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        self.emit('stage_start', stage=name, component=component, **fields)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        process_cpu_start = time.process_time()
+        stack.append(span)
+        status = 'ok'
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            status = 'error'
+            error = str(e)
+            raise
+        finally:
+            stack.pop()
+            self.emit(
+                'stage_end',
+                stage=name,
+                component=component,
+                status=status,
+                error=error,
+                wall_time=time.perf_counter() - wall_start,
+                cpu_time=time.thread_time() - cpu_start,
+                process_cpu_time=time.process_time() - process_cpu_start,
+                counters=dict(span.counters),
+                **fields
+            )
+
+    def count(self, counter, value=1, component=None, **fields):
+        """Increment a counter on the current span and emit a counter event."""
+        span = self.current_span()
+        if span is not None:
+            span.add(counter, value)
+        self.emit('counter', name=counter, value=value, component=component,
+                  stage=span.name if span else None, **fields)
+
+    def progress(self, message, percent, **fields):
+        """Emit a progress update for progress bars and log lines."""
+        self.emit('progress', message=message, percent=percent, **fields)
+
+
+class JsonLinesSink:
+    """Append every event as one JSON line to a file."""
+    def __init__(self, path, include_counters=False):
+        self.path = path
+        self.include_counters = include_counters
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def __call__(self, event):
+        # Individual counter increments can number in the hundreds of thousands per job;
+        # their totals are already part of each stage_end event
+        if event['type'] == 'counter' and not self.include_counters:
+            return
+        with self._lock:
+            self._file.write(json.dumps(event, default=str) + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class EventAggregator:
+    """Keep running totals of stage timings and counters in memory."""
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.last_progress = None
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            if event['type'] == 'stage_end':
+                totals = self.stages.setdefault(event['stage'], {
+                    'count': 0, 'errors': 0, 'wall_time': 0.0, 'cpu_time': 0.0, 'process_cpu_time': 0.0
+                })
+                totals['count'] += 1
+                totals['errors'] += event['status'] != 'ok'
+                for field in ('wall_time', 'cpu_time', 'process_cpu_time'):
+                    totals[field] += event[field]
+            elif event['type'] == 'counter':
+                stage_counters = self.counters.setdefault(event['stage'] or 'job', {})
+                stage_counters[event['name']] = stage_counters.get(event['name'], 0) + event['value']
+            elif event['type'] == 'progress':
+                self.last_progress = (event['message'], event['percent'])
+
+    def summary(self):
+        """Return {'stages': {...}, 'counters': {...}} with totals per stage."""
+        with self._lock:
+            return {
+                'stages': {name: dict(totals) for name, totals in self.stages.items()},
+                'counters': {name: dict(values) for name, values in self.counters.items()}
+            }
+
+
+def progress_sink(progress_callback):
+    """Adapt a legacy progress_callback(message, percent) into an event sink."""
+    def sink(event):
+        if event['type'] == 'progress':
+            progress_callback(event['message'], event['percent'])
+    return sink
@@ -0,0 +1,455 @@
+# fakes.py
+
+import hashlib
+import io
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import cv2
+
+# Words the fake Rekognition client "detects" on every image, with normalized boxes
+DEFAULT_WORDS = [
+    ("Name", 0.05, 0.20), ("John", 0.25, 0.20), ("Citizen", 0.35, 0.20),
+    ("Email", 0.05, 0.30), ("john.citizen@example.com", 0.25, 0.30),
+    ("Phone", 0.05, 0.40), ("0412345678", 0.25, 0.40),
+    ("Card", 0.05, 0.50), ("4111111111111111", 0.25, 0.50),
+    ("Submit", 0.05, 0.70)
+]
+
+PII_PATTERNS = {
+    'EMAIL': r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}",
+    'PHONE': r"\b0\d{9}\b",
+    'CREDIT_DEBIT_NUMBER': r"\b\d{16}\b"
+}
+
+TEXT_FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def draw_words(frame, words, color=(20, 20, 20)):
+    """Draw (text, left, top, scale) words onto an RGB frame, dark on light.
+
+    Returns the (text, (left, top, right, bottom)) pixel box of every word, for
+    screens read back by FakeRekognitionClient(vocabulary=...).
+    """
+    boxes = []
+    for text, left, top, scale in words:
+        thickness = max(1, int(round(2 * scale)))
+        (width, height), baseline = cv2.getTextSize(text, TEXT_FONT, scale, thickness)
+        cv2.putText(frame, text, (left, top + height), TEXT_FONT, scale, color, thickness, cv2.LINE_AA)
+        boxes.append((text, (left, top, left + width, top + height + baseline)))
+    return boxes
+
+
+class WordReader:
+    """Tiny OCR for screens made with draw_words: finds dark word blobs and matches them against the vocabulary.
+
+    Letters are grouped into words when the gap between them is small relative to
+    their height; a word is recognized when its shape, scaled to a vocabulary
+    word's rendering, matches it closely enough. Blurry, tiny or heavily compressed
+    text stops matching, like real OCR.
+    """
+    def __init__(self, vocabulary, min_score=0.6):
+        self.min_score = min_score
+        self.templates = []
+        for text in set(vocabulary):
+            # Text is drawn at different scales and stroke widths, so keep a template per stroke width
+            for thickness in (1, 2, 3):
+                canvas = np.full((120, 40 * len(text) + 40, 3), 255, np.uint8)
+                cv2.putText(canvas, text, (10, 60), TEXT_FONT, 1.0, (0, 0, 0), thickness, cv2.LINE_AA)
+                ink = self._ink(canvas)
+                ys, xs = np.nonzero(ink)
+                template = ink[ys.min():ys.max() + 1, xs.min():xs.max() + 1].astype(np.float32)
+                self.templates.append((text, template, template.shape[1] / template.shape[0], float(template.sum())))
+
+    @staticmethod
+    def _ink(image):
+        grey = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY) if image.ndim == 3 else image
+        return (grey < 128).astype(np.uint8)
+
+    def read(self, image):
+        """Return (text, (left, top, right, bottom)) for every recognized word of a grey or RGB image."""
+        ink = self._ink(image)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        # Group letters into words, left to right
+        letters = sorted(([int(value) for value in stat[:4]] for stat in stats[1:count]), key=lambda stat: stat[0])
+        tallest = max((h for _, _, _, h in letters), default=0)
+        words = []
+        # Words that letters further right may still join
+        open_words = []
+        for x, y, w, h in letters:
+            open_words = [word for word in open_words if x - (word[0] + word[2]) < 0.3 * max(tallest, word[3])]
+            for word in open_words:
+                gap = x - (word[0] + word[2])
+                overlap = min(y + h, word[1] + word[3]) - max(y, word[1])
+                if gap < 0.3 * max(h, word[3]) and overlap > 0:
+                    right, bottom = max(word[0] + word[2], x + w), max(word[1] + word[3], y + h)
+                    word[1] = min(word[1], y)
+                    word[2], word[3] = right - word[0], bottom - word[1]
+                    break
+            else:
+                words.append([x, y, w, h])
+                open_words.append(words[-1])
+        found = []
+        for x, y, w, h in words:
+            blob = ink[y:y + h, x:x + w].astype(np.float32)
+            best, best_score = None, self.min_score
+            for text, template, aspect, template_sum in self.templates:
+                if abs(w / h - aspect) > 0.15 * aspect:
+                    continue
+                scaled = cv2.resize(blob, (template.shape[1], template.shape[0]), interpolation=cv2.INTER_AREA)
+                score = 2 * float(np.minimum(scaled, template).sum()) / (float(scaled.sum()) + template_sum)
+                if score > best_score:
+                    best, best_score = text, score
+            if best:
+                found.append((best, (x, y, x + w, y + h)))
+        return found
+
+
+class FakeRekognitionClient:
+    """Local stand-in for the boto3 Rekognition client used by AWSPIIProcessor.
+
+    ``detect_text`` returns a fixed set of WORD detections (plus one LINE) after an
+    optional simulated round-trip latency, and counts calls, uploaded bytes and the
+    most requests served at once. With a vocabulary it instead reads the words of
+    that vocabulary drawn on the image by draw_words, returning at most max_words
+    of them like the real API.
+    """
+    def __init__(self, words=None, latency=0.0, vocabulary=None, max_words=100):
+        self.words = words or DEFAULT_WORDS
+        self.latency = latency
+        self.reader = WordReader(vocabulary) if vocabulary else None
+        self.max_words = max_words
+        self.calls = 0
+        self.bytes_received = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def detect_text(self, Image):
+        with self._lock:
+            self.calls += 1
+            self.bytes_received += len(Image['Bytes'])
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if self.reader:
+                return {'TextDetections': self._read(Image['Bytes'])}
+            return self._fixed_detections()
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def _read(self, image_bytes):
+        image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+        height, width = image.shape
+        return [{
+            'DetectedText': text,
+            'Type': 'WORD',
+            'Geometry': {'BoundingBox': {
+                'Left': left / width, 'Top': top / height,
+                'Width': (right - left) / width, 'Height': (bottom - top) / height
+            }}
+        } for text, (left, top, right, bottom) in self.reader.read(image)[:self.max_words]]
+
+    def _fixed_detections(self):
+        detections = [{
+            'DetectedText': " ".join(word for word, _, _ in self.words),
+            'Type': 'LINE',
+            'Geometry': {'BoundingBox': {'Left': 0.05, 'Top': 0.2, 'Width': 0.9, 'Height': 0.5}}
+        }]
+        for word, left, top in self.words:
+            detections.append({
+                'DetectedText': word,
+                'Type': 'WORD',
+                'Geometry': {'BoundingBox': {
+                    'Left': left, 'Top': top, 'Width': 0.012 * len(word), 'Height': 0.04
+                }}
+            })
+        return {'TextDetections': detections}
+
+
+class FakeComprehendClient:
+    """Local stand-in for the boto3 Comprehend client: regex-based detect_pii_entities."""
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self.bytes_received = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def detect_pii_entities(self, Text, LanguageCode):
+        with self._lock:
+            self.calls += 1
+            self.bytes_received += len(Text.encode('utf-8'))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.active -= 1
+        entities = []
+        for entity_type, pattern in PII_PATTERNS.items():
+            for match in re.finditer(pattern, Text):
+                entities.append({
+                    'Score': 0.99,
+                    'Type': entity_type,
+                    'BeginOffset': match.start(),
+                    'EndOffset': match.end()
+                })
+        entities.sort(key=lambda entity: entity['BeginOffset'])
+        return {'Entities': entities}
+
+
+class FakeS3Client:
+    """Local stand-in for the boto3 S3 client used by S3RangeFile: in-memory objects.
+
+    ``get_object`` honours ``Range`` ("bytes=start-end") and ``IfMatch`` (failing with
+    PreconditionFailed, like S3, once the object was overwritten), and every range
+    served is recorded in ranges along with the request and byte counts.
+    """
+    def __init__(self):
+        self.objects = {}
+        self.requests = 0
+        self.bytes_sent = 0
+        self.ranges = []
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body):
+        body = bytes(Body)
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        with self._lock:
+            self.objects[(Bucket, Key)] = (body, etag)
+        return {'ETag': etag}
+
+    def head_object(self, Bucket, Key):
+        body, etag = self._object(Bucket, Key, 'HeadObject')
+        return {'ContentLength': len(body), 'ETag': etag}
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        body, etag = self._object(Bucket, Key, 'GetObject')
+        if IfMatch is not None and IfMatch != etag:
+            raise _client_error('PreconditionFailed', 412, 'GetObject')
+        start, end = 0, len(body) - 1
+        if Range:
+            first, last = Range[len('bytes='):].split('-')
+            start, end = int(first), min(int(last), len(body) - 1)
+        data = body[start:end + 1]
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += len(data)
+            self.ranges.append((start, end + 1))
+        return {'Body': io.BytesIO(data), 'ContentLength': len(data), 'ETag': etag}
+
+    def _object(self, bucket, key, operation):
+        with self._lock:
+            found = self.objects.get((bucket, key))
+        if found is None:
+            raise _client_error('NoSuchKey', 404, operation)
+        return found
+
+
+def _client_error(code, status, operation):
+    from botocore.exceptions import ClientError
+    return ClientError({'Error': {'Code': code, 'Message': code},
+                        'ResponseMetadata': {'HTTPStatusCode': status}}, operation)
+
+
+# Transcript lines the fake chat model reports as friction points, with the category
+# and severity it gives them (the first matching cue wins)
+FRICTION_CUES = [
+    (r"\b(?:error|doesn't work|not working)\b", 'error', 'high'),
+    (r"\b(?:where is|can't|cannot|stuck)\b", 'navigation', 'medium'),
+    (r"\b(?:confus\w*|why)\b", 'comprehension', 'low')
+]
+# "[12.5-15] text" lines written by prompt_compiler.PromptCompiler
+TRANSCRIPT_LINE = re.compile(r"^\[(\d+(?:\.\d+)?)-(\d+(?:\.\d+)?)\] (.*)$", re.M)
+
+
+def fake_friction_analysis(prompt):
+    """Answer a friction analysis prompt with the requested JSON, using keyword cues."""
+    points = []
+    for match in TRANSCRIPT_LINE.finditer(prompt):
+        for cue, category, severity in FRICTION_CUES:
+            if re.search(cue, match.group(3), re.I):
+                points.append({
+                    'start': float(match.group(1)),
+                    'end': float(match.group(2)),
+                    'category': category,
+                    'severity': severity,
+                    'description': f"The user had difficulty: “{match.group(3).strip()}”"
+                })
+                break
+    return json.dumps({'friction_points': points}, ensure_ascii=False)
+
+
+class _ChatCompletionsHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so clients can reuse one connection for many requests
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        fake = self.server.fake
+        with fake.lock:
+            fake.connections.add(self.client_address)
+        if not self.path.endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        with fake.lock:
+            if fake.rate_limit and fake.active >= fake.rate_limit:
+                fake.throttled += 1
+                throttle = True
+            else:
+                throttle = False
+                fake.requests.append(request)
+                fake.active += 1
+                fake.max_active = max(fake.max_active, fake.active)
+        if throttle:
+            body = json.dumps({'error': {'message': 'Rate limit reached', 'type': 'requests'}}).encode('utf-8')
+            self.send_response(429)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Retry-After', str(fake.retry_after))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        try:
+            if fake.latency:
+                time.sleep(fake.latency)
+            prompt = request['messages'][-1]['content']
+            content = fake.responder(prompt)
+            if request.get('stream'):
+                self._stream(request, content)
+                return
+            body = json.dumps({
+                'id': f"chatcmpl-fake-{len(fake.requests)}",
+                'object': 'chat.completion',
+                'model': request.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                             'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(content) // 4,
+                          'total_tokens': (len(prompt) + len(content)) // 4}
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with fake.lock:
+                fake.active -= 1
+
+    def _stream(self, request, content):
+        """Send content as chat.completion.chunk server-sent events, chunk_chars at a time.
+
+        Like llama.cpp, the events carry raw UTF-8 text under a text/event-stream
+        content type without a charset.
+        """
+        fake = self.server.fake
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def send_event(payload):
+            data = f"data: {payload}\n\n".encode('utf-8')
+            self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+
+        with fake.lock:
+            drop = fake.dropped < fake.drop_streams
+            if drop:
+                fake.dropped += 1
+        chunk_id = f"chatcmpl-fake-{len(fake.requests)}"
+        offsets = range(0, len(content), fake.chunk_chars)
+        for offset in offsets:
+            if drop and offset >= offsets[len(offsets) // 2]:
+                # Close the connection without ending the chunked body
+                self.close_connection = True
+                return
+            if offset and fake.chunk_delay:
+                time.sleep(fake.chunk_delay)
+            send_event(json.dumps({
+                'id': chunk_id,
+                'object': 'chat.completion.chunk',
+                'model': request.get('model'),
+                'choices': [{'index': 0, 'delta': {'content': content[offset:offset + fake.chunk_chars]},
+                             'finish_reason': None}]
+            }, ensure_ascii=False))
+        send_event(json.dumps({
+            'id': chunk_id,
+            'object': 'chat.completion.chunk',
+            'model': request.get('model'),
+            'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]
+        }))
+        send_event('[DONE]')
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeOpenAIServer:
+    """Local OpenAI-compatible chat completions server for tests and benchmarks.
+
+    Serves ``POST {base_url}/chat/completions`` on 127.0.0.1 from a background thread.
+    Each request is answered by responder(prompt) (by default a keyword-based friction
+    analysis) after latency seconds. Requests with "stream": true are answered with
+    server-sent events carrying chunk_chars characters each, chunk_delay seconds
+    apart. Received requests, the client connections they arrived on and the highest
+    number of concurrent requests are recorded. With rate_limit set, requests
+    arriving while rate_limit others are in flight are answered 429 with a
+    Retry-After of retry_after seconds and counted in throttled. The first
+    drop_streams streamed responses are cut off halfway, as by a lost connection,
+    and counted in dropped.
+    """
+    def __init__(self, latency=0.0, responder=None, rate_limit=None, retry_after=1,
+                 chunk_chars=16, chunk_delay=0.0, drop_streams=0):
+        self.latency = latency
+        self.responder = responder or fake_friction_analysis
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.drop_streams = drop_streams
+        self.requests = []
+        self.connections = set()
+        self.throttled = 0
+        self.dropped = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _ChatCompletionsHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -1,124 +1,515 @@
 # file_processor.py
 
 import os
+import re
+import json
+import hashlib
+import queue
 import shutil
 import tempfile
-import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from s3_handler import S3Handler
 from audio_processor import AudioProcessor
-from gpt_analyzer import GPTAnalyzer
-from aws_pii_processor import AWSPIIProcessor
-from paddleocr_pii_processor import PaddleOCRPIIProcessor
+from gpt_analyzer import GPTAnalyzer, format_friction_point, format_friction_points, merge_friction_points
+from friction_filter import FrictionPrefilter
+from friction_index import FrictionIndex
+from result_cache import ResultCache
+from rate_limiter import scheduler_metrics
+from job_manifest import JobManifest, FrameCheckpoint
+from events import EventBus, EventAggregator, JsonLinesSink, progress_sink
+from config import PII_MODEL_AWS
+
+# Bump when the on-disk format of the cached decoded-audio artifact changes
+AUDIO_ARTIFACT_VERSION = 2
+
+# Recorder upload members that are not the screen recording
+AUDIO_MEMBER = "merged_audio.mp4"
+CAMERA_MEMBER = "merged_camera.mp4"
+
+class StageError(Exception):
+    """Raised when a pipeline stage fails; keeps the stage name and the original error.
+
+    job_dir is the working directory of the failed job once process_file raises it,
+    for the caller to remove or keep for a resumed run.
+    """
+    def __init__(self, stage, error):
+        super().__init__(f"Processing failed in stage '{stage}': {str(error)}")
+        self.stage = stage
+        self.error = error
+        self.job_dir = None
+
+
+class StageCancelled(Exception):
+    """Raised inside a running stage once another stage of the graph has failed."""
+
+
+class Stage:
+    """A named unit of work in a StageGraph."""
+    def __init__(self, name, func, deps=(), weight=1):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.weight = weight
+
+
+class StageGraph:
+    """Run pipeline stages concurrently as soon as their dependencies have finished.
+
+    Each stage function is called as ``func(deps, report)`` on a worker thread, where
+    ``deps`` maps dependency names to their results and ``report(message, percent)``
+    reports the stage's own progress (0-100). Every stage runs inside an event span, and
+    progress from all stages is merged into a single weighted percentage that is emitted
+    as ``progress`` events on the thread that called ``run``, so GUI sinks never run off
+    the main thread.
+    """
+    def __init__(self, events=None, max_workers=None, poll_interval=0.1):
+        self.events = events or EventBus()
+        self.stages = {}
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+
+    def add_stage(self, name, func, deps=(), weight=1):
+        """Register a stage; dependencies must already be registered."""
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' is already registered.")
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'.")
+        self.stages[name] = Stage(name, func, deps, weight)
+
+    def run(self, start=0, end=100):
+        """Run all stages and return a dict of their results.
+
+        If any stage raises, the remaining stages are not started, running stages are
+        cancelled at their next progress report, and the first error is raised as a
+        StageError.
+        """
+        results = {}
+        fractions = {name: 0.0 for name in self.stages}
+        total_weight = sum(stage.weight for stage in self.stages.values()) or 1
+        reports = queue.Queue()
+        failed = threading.Event()
+
+        def make_report(name):
+            def report(message, percent):
+                if failed.is_set():
+                    raise StageCancelled(f"Stage '{name}' cancelled.")
+                reports.put((name, message, percent))
+            return report
+
+        def drain():
+            while True:
+                try:
+                    name, message, percent = reports.get_nowait()
+                except queue.Empty:
+                    return
+                fractions[name] = min(max(percent, 0), 100) / 100.0
+                done = sum(self.stages[n].weight * f for n, f in fractions.items())
+                self.events.progress(message, start + int((end - start) * done / total_weight),
+                                     stage=name, stage_percent=percent)
+
+        def run_stage(stage, deps):
+            with self.events.span(stage.name, component='pipeline'):
+                return stage.func(deps, make_report(stage.name))
+
+        pending = dict(self.stages)
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers or max(len(self.stages), 1))
+        try:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if all(dep in results for dep in stage.deps):
+                        deps = {dep: results[dep] for dep in stage.deps}
+                        running[executor.submit(run_stage, stage, deps)] = name
+                        del pending[name]
+
+                done, _ = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                drain()
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        raise StageError(name, e) from e
+                    reports.put((name, f"Finished {name}.", 100))
+                drain()
+            return results
+        except BaseException:
+            failed.set()
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
 
 class FileProcessor:
     """Class for handling file processing operations."""
-    def __init__(self, config):
+    def __init__(self, config, temp_root=None, s3_handler=None):
         self.temp_dir = None
+        self.temp_root = temp_root
         self.config = config
-        self.s3_handler = S3Handler(config)
-        self.audio_processor = AudioProcessor(config)
-        self.gpt_analyzer = GPTAnalyzer(config)
-        
-        # Initialize PII processor based on configuration
-        if self.config.pii_reduction_model == "Sensitive text detection (Based on AWS)":
-            self.pii_processor = AWSPIIProcessor(config)
-        else:
-            self.pii_processor = PaddleOCRPIIProcessor(config)
+        self.events = EventBus()
+        self.s3_handler = s3_handler or S3Handler(config)
+        self.audio_processor = AudioProcessor(config, events=self.events)
+        self.gpt_analyzer = GPTAnalyzer(config, events=self.events)
+        self.friction_filter = FrictionPrefilter(
+            config.friction_prefilter_threshold,
+            config.friction_prefilter_context_seconds,
+            config.friction_prefilter_pause_seconds
+        ) if config.friction_prefilter_enabled else None
+        self.result_cache = ResultCache(config.cache_dir, config.cache_max_bytes) if config.cache_enabled else None
+        self.friction_index = FrictionIndex(config.friction_index_path) if config.friction_index_enabled else None
+        self._pii_processor = None
+        self._pii_model = None
+
+    @property
+    def pii_processor(self):
+        """The PII processor for the configured PII reduction model, rebuilt when the setting changes."""
+        if self._pii_processor is None or self._pii_model != self.config.pii_reduction_model:
+            self._pii_model = self.config.pii_reduction_model
+            # Only the selected backend is imported; PaddleOCR pulls in paddle, which is slow to import
+            if self._pii_model == PII_MODEL_AWS:
+                from aws_pii_processor import AWSPIIProcessor
+                self._pii_processor = AWSPIIProcessor(self.config, events=self.events)
+            else:
+                from paddleocr_pii_processor import PaddleOCRPIIProcessor
+                self._pii_processor = PaddleOCRPIIProcessor(self.config, events=self.events)
+        return self._pii_processor
+
+    def warmup(self):
+        """Load the models the next job will need, so the first job does not wait for them."""
+        self.audio_processor.warmup()
+        if hasattr(self.pii_processor, 'warmup'):
+            self.pii_processor.warmup()
 
     def create_temp_dir(self):
-        """Create a temporary directory."""
+        """Create the temporary directory owned by this processor."""
         if self.temp_dir is None or not os.path.exists(self.temp_dir):
-            self.temp_dir = tempfile.mkdtemp()
+            self.temp_dir = tempfile.mkdtemp(dir=self.temp_root)
         return self.temp_dir
 
-    def process_file(self, file_name, progress_callback=None):
-        temp_dir = self.create_temp_dir()
-
+    def create_job_dir(self, file_name=None, resume=False):
+        """Create the working directory for a single job.
+
+        Resumable jobs live in a stable directory under config.jobs_dir derived from the
+        S3 key, so a restarted process finds the previous run's manifest and artifacts.
+        Other jobs get a fresh directory inside the temp directory.
+        """
+        if not resume:
+            return tempfile.mkdtemp(prefix="job-", dir=self.create_temp_dir())
+        safe_name = re.sub(r'[^A-Za-z0-9._-]+', '_', file_name)[-80:]
+        digest = hashlib.sha1(file_name.encode('utf-8')).hexdigest()[:10]
+        job_dir = os.path.join(self.config.jobs_dir, f"{safe_name}-{digest}")
+        os.makedirs(job_dir, exist_ok=True)
+        return job_dir
+
+    def cleanup_job(self, result):
+        """Remove the working directory of a job returned by process_file."""
+        job_dir = result.get('job_dir') if result else None
+        if job_dir and os.path.exists(job_dir):
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+    def process_file(self, file_name, progress_callback=None, resume=False, event_sinks=()):
+        """Run the whole pipeline for one uploaded ZIP and return the paths of the results.
+
+        Structured events (see events.EventBus) go to event_sinks and to events.jsonl in
+        the job directory; progress_callback(message, percent) is still supported and is
+        fed from the progress events. With resume=True the job reuses its stable job
+        directory: stages recorded as completed in the manifest are skipped and an
+        interrupted PII pass continues from its last checkpointed segment.
+        """
         try:
-            # Step 1: Download and extract the video file
-            if progress_callback:
-                progress_callback("Downloading file...", 0)
-            zip_path = os.path.join(temp_dir, file_name)
-            self.s3_handler.download_file(file_name, zip_path)
-
-            if progress_callback:
-                progress_callback("Extracting files...", 10)
-
-            # Extract video file
-            video_path = None
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                video_files = [f for f in zip_ref.namelist() if f.endswith(('.mp4', '.mov', '.avi'))]
-                if not video_files:
-                    raise Exception("No video file found in the ZIP archive.")
-                video_file_name = video_files[0]
-                zip_ref.extract(video_file_name, temp_dir)
-                video_path = os.path.join(temp_dir, video_file_name)
-
-            if not os.path.exists(video_path):
-                raise Exception("Failed to extract video file.")
-
-            # Step 2: Convert the original video to WAV (extract audio)
-            if progress_callback:
-                progress_callback("Converting video to audio...", 20)
-
-            wav_path = os.path.join(temp_dir, "audio.wav")
-            self.audio_processor.convert_to_wav(video_path, wav_path)
-
-            # Step 3: Transcribe audio
-            if progress_callback:
-                progress_callback("Transcribing audio...", 30)
-
-            transcription_result = self.audio_processor.transcribe_audio(wav_path)
+            temp_dir = self.create_job_dir(file_name, resume)
+        except Exception as e:
+            raise StageError('prepare', e) from e
 
-            # Save VTT and transcript files
-            if progress_callback:
-                progress_callback("Saving transcription...", 50)
+        aggregator = EventAggregator()
+        events_path = os.path.join(temp_dir, "events.jsonl")
+        json_sink = JsonLinesSink(events_path)
+        sinks = [json_sink, aggregator] + list(event_sinks)
+        if progress_callback:
+            sinks.append(progress_sink(progress_callback))
 
+        try:
+            with self.events.subscribed(*sinks), self.events.span('job', component='pipeline', file_name=file_name):
+                result = self._run_job(file_name, temp_dir)
+            result['events_path'] = events_path
+            result['event_summary'] = aggregator.summary()
+            result['rate_limits'] = scheduler_metrics()
+            return result
+        except StageError as e:
+            e.job_dir = temp_dir
+            raise
+        finally:
+            json_sink.close()
+
+    def _run_job(self, file_name, temp_dir):
+        """Run the stages of one job inside its job directory."""
+        try:
             vtt_path = os.path.join(temp_dir, "transcription.vtt")
             transcript_path = os.path.join(temp_dir, "transcript.txt")
-
-            self._save_vtt(transcription_result, vtt_path)
-            self._convert_vtt_to_transcript(vtt_path, transcript_path)
-
-            # Step 4: Analyze friction points
-            if progress_callback:
-                progress_callback("Analyzing friction points...", 60)
-
-            with open(transcript_path, 'r', encoding='utf-8') as f:
-                transcript_text = f.read()
-
-            analysis_result = self.gpt_analyzer.analyze_friction_points(transcript_text)
+            segments_path = os.path.join(temp_dir, "segments.json")
             analysis_path = os.path.join(temp_dir, "friction_points_analysis.txt")
-
-            with open(analysis_path, 'w', encoding='utf-8') as f:
-                f.write(analysis_result)
-
-            # Step 5: Perform PII Reduction on the original video
-            if progress_callback:
-                progress_callback("Processing video for PII...", 80)
-
+            friction_points_path = os.path.join(temp_dir, "friction_points.json")
+            audio_path = os.path.join(temp_dir, "audio.f32")
             pii_processed_path = os.path.join(temp_dir, "pii_processed_video.mp4")
-            self.pii_processor.process_video(
-                video_path,
-                pii_processed_path,
-                lambda msg, prog: progress_callback(msg, 80 + int(prog * 0.2))
-            )
+            artifacts = {
+                'convert_audio': {'audio.f32': audio_path},
+                'transcribe': {
+                    'segments.json': segments_path,
+                    'transcription.vtt': vtt_path,
+                    'transcript.txt': transcript_path
+                },
+                'analyze': {
+                    'friction_points.json': friction_points_path,
+                    'friction_points_analysis.txt': analysis_path
+                },
+                'pii': {'pii_processed_video.mp4': pii_processed_path}
+            }
 
-            if progress_callback:
-                progress_callback("Processing complete!", 100)
+            # Step 1: Skip every stage that a previous run of this job already finished,
+            # or whose inputs and settings are unchanged in the result cache
+            self.events.progress("Checking previous results...", 0)
+            source = self.s3_handler.head_file(file_name)
+            keys = self._stage_keys(source)
+            manifest = JobManifest(temp_dir)
+            if not manifest.matches_source(source):
+                manifest.reset(source)
+            done = {stage for stage, files in artifacts.items()
+                    if stage != 'convert_audio' and self._restore_stage(manifest, keys, stage, files)}
+            need_transcription = 'transcribe' not in done
+            need_audio = need_transcription and not self._restore_stage(
+                manifest, keys, 'convert_audio', artifacts['convert_audio'])
+            need_video = 'pii' not in done
+
+            # Step 2: Extract only the ZIP members the remaining stages need, straight from
+            # S3; range reads fetch just the central directory and those members
+            video_path, audio_source = None, None
+            if need_video or need_audio:
+                self.events.progress("Extracting files...", 5)
+                video_path, audio_source = self._extract_inputs(
+                    file_name, temp_dir, manifest, keys, need_video, need_audio)
+
+            # Step 3: The audio branch (decode -> transcription -> friction analysis) and the
+            # PII branch share nothing but the upload, so run them concurrently.
+            graph = StageGraph(self.events)
+            if need_audio:
+                graph.add_stage(
+                    'convert_audio',
+                    lambda deps, report: self._convert_audio_stage(audio_source, audio_path, report, manifest, keys),
+                    weight=1
+                )
+            if need_transcription:
+                graph.add_stage(
+                    'transcribe',
+                    lambda deps, report: self._transcribe_stage(
+                        audio_path, artifacts['transcribe'], report, manifest, keys),
+                    deps=('convert_audio',) if need_audio else (),
+                    weight=3
+                )
+            if 'analyze' not in done:
+                graph.add_stage(
+                    'analyze',
+                    lambda deps, report: self._analyze_stage(segments_path, artifacts['analyze'], report, manifest, keys),
+                    deps=('transcribe',) if need_transcription else (),
+                    weight=2
+                )
+            if 'pii' not in done:
+                graph.add_stage(
+                    'pii',
+                    lambda deps, report: self._pii_stage(video_path, pii_processed_path, report, manifest, keys),
+                    weight=4
+                )
+            graph.run(start=10, end=100)
+
+            # Step 4: Record the friction points in the cross-job index (also when the
+            # analysis was reused, so the index follows the latest run of every file)
+            if self.friction_index:
+                with self.events.span('index', component='pipeline'):
+                    with open(friction_points_path, 'r', encoding='utf-8') as f:
+                        points = json.load(f)['friction_points']
+                    self.friction_index.record(file_name, points, model=self.gpt_analyzer.model)
+
+            self.events.progress("Processing complete!", 100)
 
             # Return paths to all processed files, including the processed video
             return {
                 'vtt_path': vtt_path,
                 'transcript_path': transcript_path,
+                'segments_path': segments_path,
                 'analysis_path': analysis_path,
-                'processed_video_path': pii_processed_path
+                'friction_points_path': friction_points_path,
+                'processed_video_path': pii_processed_path,
+                'job_dir': temp_dir
             }
 
+        except StageError:
+            raise
         except Exception as e:
-            raise Exception(f"Processing failed: {str(e)}")
-
+            raise StageError('prepare', e) from e
+
+    def _extract_inputs(self, file_name, temp_dir, manifest, keys, need_video, need_audio):
+        """Extract only the ZIP members the remaining stages need into temp_dir.
+
+        The audio branch reads the recorder's small merged_audio.mp4 when the upload has
+        one, instead of demuxing the screen recording. Returns (video path, audio source
+        path); an entry that is not needed is None.
+        """
+        wanted = [member for member, needed in (('video', need_video), ('audio', need_audio)) if needed]
+        paths = {}
+        for member in wanted:
+            extracted = manifest.completed(f'extract_{member}', keys['source'])
+            if extracted:
+                paths[member] = extracted[member]
+        missing = [member for member in wanted if member not in paths]
+        if not missing:
+            return paths.get('video'), paths.get('audio')
+
+        with self.events.span('extract', component='s3'), self.s3_handler.open_zip(file_name) as zip_ref:
+            names = zip_ref.namelist()
+            video_files = [f for f in names if f.endswith(('.mp4', '.mov', '.avi'))]
+            # Prefer the screen recording over the recorder's separate audio/camera tracks
+            video_files.sort(key=lambda f: os.path.basename(f) in (AUDIO_MEMBER, CAMERA_MEMBER))
+            if not video_files:
+                raise Exception("No video file found in the ZIP archive.")
+            audio_files = [f for f in names if os.path.basename(f) == AUDIO_MEMBER]
+            member_names = {'video': video_files[0], 'audio': audio_files[0] if audio_files else video_files[0]}
+
+            for member in missing:
+                path = os.path.join(temp_dir, member_names[member])
+                if path not in paths.values():
+                    zip_ref.extract(member_names[member], temp_dir)
+                    if not os.path.exists(path):
+                        raise Exception(f"Failed to extract {member_names[member]}.")
+                    self.events.count('bytes_written', os.path.getsize(path), component='s3')
+                paths[member] = path
+                manifest.mark_completed(f'extract_{member}', keys['source'], {member: path})
+            self.events.count('bytes_read', zip_ref.fp.bytes_fetched, component='s3')
+            self.events.count('api_calls', zip_ref.fp.requests_made, component='s3', service='s3')
+
+        return paths.get('video'), paths.get('audio')
+
+    def _stage_keys(self, source):
+        """Build the key of every stage from the upload's identity and the settings it depends on."""
+        source_key = ResultCache.make_key('source', source)
+        audio_key = ResultCache.make_key('convert_audio', source, AUDIO_ARTIFACT_VERSION)
+        transcribe_key = ResultCache.make_key('transcribe', audio_key, self.audio_processor.fingerprint())
+        return {
+            'source': source_key,
+            'convert_audio': audio_key,
+            'transcribe': transcribe_key,
+            'analyze': ResultCache.make_key(
+                'analyze', transcribe_key, self.gpt_analyzer.fingerprint(),
+                self.friction_filter.fingerprint() if self.friction_filter else None
+            ),
+            'pii': ResultCache.make_key('pii', source, self.pii_processor.fingerprint())
+        }
+
+    def _restore_stage(self, manifest, keys, stage, files):
+        """Reuse a stage finished by a previous run or restore it from the cache; return True on a hit."""
+        if manifest.completed(stage, keys[stage]):
+            return True
+        if self.result_cache and self.result_cache.fetch(keys[stage], files):
+            manifest.mark_completed(stage, keys[stage], files)
+            return True
+        return False
+
+    def _discard_outputs(self, files):
+        """Remove stale artifacts before a stage rewrites them.
+
+        Restored artifacts may be hard links into the cache, so they must be unlinked
+        rather than overwritten in place.
+        """
+        for path in files.values():
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _finish_stage(self, manifest, keys, stage, files):
+        """Record a finished stage in the manifest and publish its artifacts to the cache."""
+        manifest.mark_completed(stage, keys[stage], files)
+        if self.result_cache:
+            try:
+                self.result_cache.put(keys[stage], files)
+            except OSError as e:
+                # A full or read-only cache must never fail the job
+                print(f"Failed to cache {stage} results: {e}")
+
+    def _convert_audio_stage(self, audio_source, audio_path, report, manifest, keys):
+        """Decode the audio track to 16 kHz mono float32 samples for Whisper."""
+        report("Decoding audio...", 0)
+        self._discard_outputs({'audio.f32': audio_path})
+        self.audio_processor.load_audio(audio_source, audio_path)
+        self._finish_stage(manifest, keys, 'convert_audio', {'audio.f32': audio_path})
+        return audio_path
+
+    def _transcribe_stage(self, audio_path, files, report, manifest, keys):
+        """Transcribe the audio and save the segments, VTT and transcript files."""
+        report("Transcribing audio...", 0)
+        self._discard_outputs(files)
+        # Per-chunk progress also lets the graph cancel a long transcription between chunks
+        transcription_result = self.audio_processor.transcribe_audio(
+            self.audio_processor.open_audio(audio_path),
+            progress=lambda message, percent: report(message, percent * 80 // 100))
+        report("Saving transcription...", 80)
+        with open(files['segments.json'], 'w', encoding='utf-8') as f:
+            json.dump(transcription_result, f)
+        self._save_vtt(transcription_result, files['transcription.vtt'])
+        self._convert_vtt_to_transcript(files['transcription.vtt'], files['transcript.txt'])
+        self._finish_stage(manifest, keys, 'transcribe', files)
+        return files['transcript.txt']
+
+    def _analyze_stage(self, segments_path, files, report, manifest, keys):
+        """Run the friction point analysis on the Whisper segments.
+
+        Friction points are appended to friction_points_analysis.txt as soon as the
+        model reports them; once the analysis is complete the merged points are saved
+        as friction_points.json and the report is rewritten from them. With the
+        pre-filter enabled only the friction candidates (plus their context) are sent
+        to the LLM.
+        """
+        report("Analyzing friction points...", 0)
+        self._discard_outputs(files)
+        with open(segments_path, 'r', encoding='utf-8') as f:
+            segments = json.load(f)['segments']
+        if self.friction_filter:
+            with self.events.span('prefilter', component='pipeline'):
+                kept = self.friction_filter.select(segments)
+                self.events.count('segments', len(segments), component='pipeline')
+                self.events.count('segments_kept', len(kept), component='pipeline')
+            segments = kept
+
+        segments = [segment for segment in segments if segment['text'].strip()]
+        points = []
+        if segments:
+            duration = max(segments[-1]['end'], 1.0)
+            covered = 0.0
+            with open(files['friction_points_analysis.txt'], 'w', encoding='utf-8') as f:
+                for point in self.gpt_analyzer.stream_friction_points(segments):
+                    points.append(point)
+                    f.write(("\n\n" if len(points) > 1 else "") + format_friction_point(point, len(points)))
+                    f.flush()
+                    covered = max(covered, point['end'])
+                    report(f"Analyzing friction points... {len(points)} found", min(95, 100 * covered / duration))
+            points = merge_friction_points(points)
+        with open(files['friction_points.json'], 'w', encoding='utf-8') as f:
+            json.dump({'friction_points': points}, f, indent=2)
+        with open(files['friction_points_analysis.txt'], 'w', encoding='utf-8') as f:
+            f.write(format_friction_points(points))
+        self._finish_stage(manifest, keys, 'analyze', files)
+        return files['friction_points.json']
+
+    def _pii_stage(self, video_path, pii_processed_path, report, manifest, keys):
+        """Perform PII reduction on the original video, checkpointing finished segments."""
+        report("Processing video for PII...", 0)
+        self._discard_outputs({'pii_processed_video.mp4': pii_processed_path})
+        segment_dir = os.path.join(manifest.job_dir, "pii_segments")
+        checkpoint = FrameCheckpoint(manifest, 'pii', keys['pii'], segment_dir, self.config.pii_checkpoint_frames)
+        self.pii_processor.process_video(video_path, pii_processed_path, report, checkpoint=checkpoint)
+        self.events.count('bytes_written', os.path.getsize(pii_processed_path), component='pipeline')
+        self._finish_stage(manifest, keys, 'pii', {'pii_processed_video.mp4': pii_processed_path})
+        shutil.rmtree(segment_dir, ignore_errors=True)
+        return pii_processed_path
 
     def _save_vtt(self, result, vtt_path):
         """Save transcription result as VTT file."""
@@ -160,6 +551,7 @@ class FileProcessor:
         return f"{int(hours):02}:{int(minutes):02}:{seconds:02}.{milliseconds:03}"
 
     def cleanup(self):
-        """Clean up temporary files."""
+        """Shut down the transcription pool and clean up temporary files."""
+        self.audio_processor.close()
         if self.temp_dir and os.path.exists(self.temp_dir):
             shutil.rmtree(self.temp_dir, ignore_errors=True)
@@ -0,0 +1,130 @@
+# frame_diff.py
+
+import numpy as np
+import cv2
+
+
+class FrameChangeDetector:
+    """Find the regions of a screen-recording frame that changed since the last analyzed frame.
+
+    Frames are compared on a grid of cell x cell pixel cells: each frame is converted
+    to grey and downscaled so every cell becomes one pixel, and a cell counts as
+    changed when its mean grey level moved by more than threshold. Changed cells are
+    grown by padding cells and over the whole block of content (cells whose grey
+    levels vary by more than content_threshold, i.e. text, joined across one-cell
+    gaps) they touch, so a word whose last letter was typed is read whole. They are
+    then grouped into rectangles and returned in full-resolution pixels. More than
+    max_regions rectangles are merged into their union, and a change covering more
+    than full_frame_ratio of the frame is reported as the whole frame.
+
+    ``changes`` makes the frame it was given the new reference whenever it reports a
+    change, since the caller then analyzes that frame.
+    """
+    def __init__(self, cell=16, threshold=8.0, padding=1, max_regions=3, full_frame_ratio=0.5, min_region=80,
+                 content_threshold=12.0):
+        self.cell = cell
+        self.threshold = threshold
+        self.padding = padding
+        self.max_regions = max_regions
+        self.full_frame_ratio = full_frame_ratio
+        self.min_region = min_region
+        self.content_threshold = content_threshold
+        self._reference = None
+        self._content = None
+
+    def fingerprint(self):
+        """Describe everything that affects which frames are analyzed, for result caching."""
+        return {
+            'cell': self.cell,
+            'threshold': self.threshold,
+            'padding': self.padding,
+            'max_regions': self.max_regions,
+            'full_frame_ratio': self.full_frame_ratio,
+            'min_region': self.min_region,
+            'content_threshold': self.content_threshold
+        }
+
+    def reset(self):
+        """Forget the reference frame, so the next frame is analyzed whole."""
+        self._reference = None
+
+    def changes(self, frame):
+        """Return the changed (left, top, right, bottom) pixel rectangles of an RGB frame.
+
+        An empty list means the frame matches the last analyzed one.
+        """
+        height, width = frame.shape[:2]
+        grey = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY) if frame.ndim == 3 else frame
+        grid = (-(-width // self.cell), -(-height // self.cell))
+        small = cv2.resize(grey, grid, interpolation=cv2.INTER_AREA)
+        reference, self._reference = self._reference, small
+        self._content = None
+        if reference is None or reference.shape != small.shape:
+            return [(0, 0, width, height)]
+
+        changed = (cv2.absdiff(small, reference) > self.threshold).astype(np.uint8)
+        if not changed.any():
+            # Nothing changed: keep comparing against the frame that was analyzed
+            self._reference = reference
+            return []
+        if self.padding:
+            changed = cv2.dilate(changed, np.ones((3, 3), np.uint8), iterations=self.padding)
+        # Grow the changed cells over the blocks of content they touch
+        self._content = self._content_cells(grey, grid)
+        blocks = cv2.morphologyEx(self._content, cv2.MORPH_CLOSE, np.ones((1, 3), np.uint8))
+        _, labels = cv2.connectedComponents(blocks, connectivity=8)
+        touched = np.unique(labels[(changed > 0) & (blocks > 0)])
+        changed |= np.isin(labels, touched[touched > 0]).astype(np.uint8)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(changed, connectivity=8)
+        regions = [
+            (x * self.cell, y * self.cell, min(width, (x + w) * self.cell), min(height, (y + h) * self.cell))
+            for x, y, w, h, _ in stats[1:count]
+        ]
+        if len(regions) > self.max_regions:
+            regions = [(min(r[0] for r in regions), min(r[1] for r in regions),
+                        max(r[2] for r in regions), max(r[3] for r in regions))]
+        regions = [self._at_least_min_size(region, width, height) for region in regions]
+        area = sum((right - left) * (bottom - top) for left, top, right, bottom in regions)
+        if area > self.full_frame_ratio * width * height:
+            return [(0, 0, width, height)]
+        return regions
+
+    def has_content(self, region):
+        """Tell whether a region returned by the last ``changes`` call holds any content (text) now.
+
+        A region that only changed to blank needs no OCR: it has no words left.
+        """
+        if self._content is None:
+            return True
+        left, top, right, bottom = region
+        return bool(self._content[top // self.cell:-(-bottom // self.cell), left // self.cell:-(-right // self.cell)].any())
+
+    def _content_cells(self, grey, grid):
+        """Return the cells whose grey levels vary by more than content_threshold, as a 0/1 grid."""
+        pixels = grey.astype(np.float32)
+        mean = cv2.resize(pixels, grid, interpolation=cv2.INTER_AREA)
+        mean_square = cv2.resize(pixels * pixels, grid, interpolation=cv2.INTER_AREA)
+        variance = np.maximum(mean_square - mean * mean, 0)
+        return (variance > self.content_threshold ** 2).astype(np.uint8)
+
+    def _at_least_min_size(self, region, width, height):
+        """Grow a rectangle around its centre to min_region pixels per side, within the frame."""
+        left, top, right, bottom = region
+        if right - left < self.min_region:
+            left = max(0, min(width - self.min_region, (left + right - self.min_region) // 2))
+            right = min(width, left + self.min_region)
+        if bottom - top < self.min_region:
+            top = max(0, min(height - self.min_region, (top + bottom - self.min_region) // 2))
+            bottom = min(height, top + self.min_region)
+        return (left, top, right, bottom)
+
+
+def box_to_pixels(box, width, height):
+    """Convert a normalized Rekognition BoundingBox into a (left, top, right, bottom) pixel rectangle."""
+    left = box['Left'] * width
+    top = box['Top'] * height
+    return (left, top, left + box['Width'] * width, top + box['Height'] * height)
+
+
+def rects_intersect(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
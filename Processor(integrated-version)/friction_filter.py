@@ -0,0 +1,92 @@
+# friction_filter.py
+
+import re
+import statistics
+
+# Phrases that usually mean the user is stuck, confused or annoyed, with their weight
+LEXICAL_CUES = [
+    (r"\bwhere (?:is|are|do|did|can)\b", 1.0),
+    (r"\b(?:can't|cannot|can not|couldn't|won't|doesn't|didn't|isn't) (?:\w+ )?(?:work|find|see|get|load|let|go|click|submit|accept)", 1.0),
+    (r"\b(?:can't|cannot|couldn't)\b", 0.5),
+    (r"\b(?:error|errors|invalid|failed|fail|wrong|broken|crash\w*)\b", 1.0),
+    (r"\b(?:confus\w*|stuck|lost|unclear|frustrat\w*|annoy\w*|weird|strange)\b", 1.0),
+    (r"\b(?:not sure|no idea|don't know|don't understand|doesn't make sense|what does|what is this)\b", 1.0),
+    (r"\bhow (?:do|can|should) i\b", 1.0),
+    (r"\b(?:why|again|still|nothing (?:is )?happen\w*|taking (?:so )?long|loading|should i|worried)\b", 0.5),
+    (r"\b(?:expected|hidden|hard to find|supposed to)\b", 0.5),
+    (r"\b(?:oh no|ugh|argh|come on|seriously)\b", 1.0),
+    (r"[\[(*](?:sighs?|sighing|groans?|groaning)[\])*]", 1.0)
+]
+
+# Hesitation fillers as Whisper writes them
+FILLER_CUES = r"\b(?:um+|uh+|erm+|hmm+|mm+)\b"
+
+
+class FrictionPrefilter:
+    """Cheap local scoring of Whisper segments to pick the parts worth sending to the LLM.
+
+    Each segment is scored from lexical cues ("where is", "can't", "error", sighs,
+    ...), hesitation fillers, a long pause before it and a sudden change of speech
+    rate. Segments scoring at least threshold are kept together with the
+    segments within context_seconds around them, so the model still sees what led
+    up to each candidate.
+    """
+    def __init__(self, threshold=1.0, context_seconds=15.0, pause_seconds=3.0):
+        self.threshold = threshold
+        self.context_seconds = context_seconds
+        self.pause_seconds = pause_seconds
+        self._cues = [(re.compile(pattern, re.I), weight) for pattern, weight in LEXICAL_CUES]
+        self._fillers = re.compile(FILLER_CUES, re.I)
+
+    def fingerprint(self):
+        """Describe everything that affects which segments are kept, for result caching."""
+        return {
+            'threshold': self.threshold,
+            'context_seconds': self.context_seconds,
+            'pause_seconds': self.pause_seconds,
+            'cues': LEXICAL_CUES,
+            'fillers': FILLER_CUES
+        }
+
+    def score(self, segments):
+        """Return a friction score for every segment."""
+        rates = [self._speech_rate(segment) for segment in segments]
+        typical_rate = statistics.median([rate for rate in rates if rate]) if any(rates) else None
+        scores = []
+        for index, segment in enumerate(segments):
+            text = segment['text']
+            score = min(sum(weight for cue, weight in self._cues if cue.search(text)), 2.0)
+            score += min(0.25 * len(self._fillers.findall(text)), 0.5)
+            if index and segment['start'] - segments[index - 1]['end'] >= self.pause_seconds:
+                score += 0.5
+            if typical_rate and rates[index] and (
+                    rates[index] > 1.7 * typical_rate or rates[index] < 0.5 * typical_rate):
+                score += 0.5
+            scores.append(score)
+        return scores
+
+    def select(self, segments):
+        """Return the candidate segments and their context, in order."""
+        scores = self.score(segments)
+        candidates = [segment for segment, score in zip(segments, scores) if score >= self.threshold]
+        windows = []
+        for segment in candidates:
+            start = segment['start'] - self.context_seconds
+            end = segment['end'] + self.context_seconds
+            if windows and start <= windows[-1][1]:
+                windows[-1][1] = max(windows[-1][1], end)
+            else:
+                windows.append([start, end])
+        return [
+            segment for segment in segments
+            if any(segment['end'] > start and segment['start'] < end for start, end in windows)
+        ]
+
+    @staticmethod
+    def _speech_rate(segment):
+        """Words per second of a segment, or None when it is too short to tell."""
+        duration = segment['end'] - segment['start']
+        words = len(segment['text'].split())
+        if duration < 1.0 or words < 3:
+            return None
+        return words / duration
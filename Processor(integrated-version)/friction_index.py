@@ -0,0 +1,144 @@
+# friction_index.py
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import closing
+
+from gpt_analyzer import SEVERITIES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    file_name TEXT NOT NULL UNIQUE,
+    processed_at REAL NOT NULL,
+    model TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_processed_at ON sessions (processed_at);
+CREATE TABLE IF NOT EXISTS friction_points (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    start_time REAL NOT NULL,
+    end_time REAL NOT NULL,
+    category TEXT NOT NULL,
+    severity INTEGER NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS friction_points_session ON friction_points (session_id, start_time);
+CREATE INDEX IF NOT EXISTS friction_points_severity ON friction_points (severity, session_id);
+"""
+
+
+class FrictionIndex:
+    """SQLite index of the friction points of every processed session.
+
+    Each session (one uploaded file) is stored once; processing the file again
+    replaces its points. Severities are stored as their rank in SEVERITIES so
+    "at least medium" is a range scan on an index. Every call opens its own
+    connection, so the index can be shared by threads and worker processes.
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as connection:
+            # WAL lets worker processes query while another one is writing
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA foreign_keys=ON")
+        return connection
+
+    def record(self, file_name, points, model=None, processed_at=None):
+        """Store (or replace) the friction points of one session; returns its id."""
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT INTO sessions (file_name, processed_at, model) VALUES (?, ?, ?) "
+                "ON CONFLICT (file_name) DO UPDATE SET processed_at = excluded.processed_at, model = excluded.model",
+                (file_name, processed_at or time.time(), model)
+            )
+            session_id = connection.execute(
+                "SELECT id FROM sessions WHERE file_name = ?", (file_name,)).fetchone()[0]
+            connection.execute("DELETE FROM friction_points WHERE session_id = ?", (session_id,))
+            connection.executemany(
+                "INSERT INTO friction_points (session_id, start_time, end_time, category, severity, description) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(session_id, point['start'], point['end'], point['category'],
+                  SEVERITIES.index(point['severity']), point['description']) for point in points]
+            )
+            return session_id
+
+    def query(self, min_severity=None, category=None, last_sessions=None, since=None, file_name=None, limit=None):
+        """Return friction points, newest session first, as dicts including file_name and processed_at.
+
+        min_severity keeps points at least that severe, last_sessions restricts the
+        search to the most recently processed sessions and since to sessions
+        processed after that Unix time.
+        """
+        conditions, parameters = [], []
+        if min_severity is not None:
+            conditions.append("p.severity >= ?")
+            parameters.append(SEVERITIES.index(min_severity))
+        if category is not None:
+            conditions.append("p.category = ?")
+            parameters.append(category)
+        if last_sessions is not None:
+            conditions.append("p.session_id IN (SELECT id FROM sessions ORDER BY processed_at DESC LIMIT ?)")
+            parameters.append(last_sessions)
+        if since is not None:
+            conditions.append("s.processed_at >= ?")
+            parameters.append(since)
+        if file_name is not None:
+            conditions.append("s.file_name = ?")
+            parameters.append(file_name)
+        sql = ("SELECT s.file_name, s.processed_at, p.start_time AS start, p.end_time AS end, "
+               "p.category, p.severity, p.description "
+               "FROM friction_points p JOIN sessions s ON s.id = p.session_id")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY s.processed_at DESC, p.start_time"
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        with closing(self._connect()) as connection:
+            rows = connection.execute(sql, parameters).fetchall()
+        return [dict(row, severity=SEVERITIES[row['severity']]) for row in rows]
+
+    def stats(self):
+        """Return the number of sessions and friction points in the index."""
+        with closing(self._connect()) as connection:
+            return {
+                'sessions': connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0],
+                'friction_points': connection.execute("SELECT COUNT(*) FROM friction_points").fetchone()[0]
+            }
+
+
+def main(argv=None):
+    """Print the friction points matching the filters as JSON lines."""
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Query the friction point index of processed sessions.")
+    parser.add_argument('--index', default=Config().friction_index_path, help="path of the SQLite index")
+    parser.add_argument('--severity', choices=SEVERITIES, help="minimum severity")
+    parser.add_argument('--category', help="only this category")
+    parser.add_argument('--last', type=int, help="only the most recently processed N sessions")
+    parser.add_argument('--file', help="only this uploaded file")
+    parser.add_argument('--limit', type=int, help="maximum number of points to print")
+    args = parser.parse_args(argv)
+
+    index = FrictionIndex(args.index)
+    started = time.perf_counter()
+    points = index.query(min_severity=args.severity, category=args.category, last_sessions=args.last,
+                         file_name=args.file, limit=args.limit)
+    elapsed = time.perf_counter() - started
+    for point in points:
+        print(json.dumps(point))
+    print(f"{len(points)} friction points in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,64 +1,620 @@
 # gpt_analyzer.py
 
 import os
-import openai
+import re
+import time
+import hashlib
+import tempfile
+import threading
+import queue
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
-class GPTAnalyzer:
-    """Class for handling GPT analysis."""
-    def __init__(self, config):
-        self.api_key = config.openai_api_key
-        if not self.api_key:
-            raise Exception("OpenAI API key is not set. Please set the OPENAI_API_KEY environment variable.")
-        openai.api_key = self.api_key
-
-    def analyze_friction_points(self, transcript_text):
-        """Analyze friction points using GPT-4."""
-        try:
-            api_url = 'https://api.openai.com/v1/chat/completions'
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            prompt = self._create_prompt(transcript_text)
-            data = {
-                "model": "gpt-4",
-                "messages": [
-                    {"role": "system", "content": "You are a helpful assistant that analyzes user interactions."},
-                    {"role": "user", "content": prompt}
-                ]
+from events import EventBus
+from llm_backends import create_llm_backend
+from prompt_compiler import PromptCompiler, count_tokens
+from rate_limiter import RetryableError, get_scheduler, parse_retry_after
+
+SYSTEM_MESSAGE = "You are a helpful assistant that analyzes user interactions."
+
+# "[00:01:02.500 --> 00:01:04.000] text" lines written by FileProcessor._convert_vtt_to_transcript
+TRANSCRIPT_LINE = re.compile(r"^\[(\d+:\d{2}:\d{2}(?:\.\d+)?) --> (\d+:\d{2}:\d{2}(?:\.\d+)?)\]")
+
+# Allowed values of the structured friction point fields; severities are ordered
+FRICTION_CATEGORIES = ('navigation', 'comprehension', 'error', 'performance', 'input', 'other')
+SEVERITIES = ('low', 'medium', 'high')
+
+# JSON schema of the analysis the model is asked to return
+FRICTION_SCHEMA = {
+    'type': 'object',
+    'required': ['friction_points'],
+    'properties': {
+        'friction_points': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'required': ['start', 'end', 'category', 'severity', 'description'],
+                'properties': {
+                    'start': {'type': 'number', 'minimum': 0},
+                    'end': {'type': 'number', 'minimum': 0},
+                    'category': {'enum': list(FRICTION_CATEGORIES)},
+                    'severity': {'enum': list(SEVERITIES)},
+                    'description': {'type': 'string', 'minLength': 1}
+                }
             }
-            response = requests.post(api_url, headers=headers, data=json.dumps(data))
-            if response.status_code == 200:
-                result = response.json()
-                return result['choices'][0]['message']['content']
+        }
+    }
+}
+
+
+def parse_time(text):
+    """Parse HH:MM:SS(.mmm) or MM:SS(.mmm) into seconds."""
+    seconds = 0.0
+    for part in text.split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def format_time(seconds):
+    """Format seconds as an HH:MM:SS.mmm transcript timestamp."""
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600 * 1000)
+    minutes, milliseconds = divmod(milliseconds, 60 * 1000)
+    return f"{hours:02}:{minutes:02}:{milliseconds // 1000:02}.{milliseconds % 1000:03}"
+
+
+def parse_transcript(transcript_text):
+    """Turn "[start --> end] text" transcript lines into segment dicts.
+
+    Lines without a timestamp are appended to the text of the line before them.
+    """
+    segments = []
+    for line in transcript_text.splitlines():
+        match = TRANSCRIPT_LINE.match(line)
+        if match:
+            segments.append({
+                'start': parse_time(match.group(1)),
+                'end': parse_time(match.group(2)),
+                'text': line[match.end():].strip()
+            })
+        elif segments and line.strip():
+            segments[-1]['text'] += " " + line.strip()
+    return segments
+
+
+def validate_friction_point(item):
+    """Check one friction point against FRICTION_SCHEMA and return it normalized.
+
+    Times given as "HH:MM:SS" strings are converted to seconds and the enum fields are
+    lower-cased; anything else that does not match the schema raises ValueError.
+    """
+    if not isinstance(item, dict):
+        raise ValueError(f"friction point is not an object: {item!r}")
+    missing = [field for field in FRICTION_SCHEMA['properties']['friction_points']['items']['required']
+               if field not in item]
+    if missing:
+        raise ValueError(f"friction point is missing {', '.join(missing)}")
+    point = {}
+    for field in ('start', 'end'):
+        value = item[field]
+        if isinstance(value, str):
+            try:
+                value = parse_time(value.strip())
+            except ValueError:
+                raise ValueError(f"friction point {field} is not a time: {value!r}")
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f"friction point {field} is not a non-negative number: {value!r}")
+        point[field] = float(value)
+    if point['end'] < point['start']:
+        raise ValueError(f"friction point ends before it starts: {point['start']} > {point['end']}")
+    for field, allowed in (('category', FRICTION_CATEGORIES), ('severity', SEVERITIES)):
+        value = str(item[field]).strip().lower()
+        if value not in allowed:
+            raise ValueError(f"friction point {field} must be one of {', '.join(allowed)}: {item[field]!r}")
+        point[field] = value
+    description = " ".join(str(item['description']).split())
+    if not description:
+        raise ValueError("friction point has an empty description")
+    point['description'] = description
+    return point
+
+
+def parse_friction_json(content):
+    """Parse a JSON analysis response into validated friction points.
+
+    Returns (points, rejected): the points matching the schema and the number of
+    entries that did not. A response that is not a JSON analysis at all raises
+    ValueError.
+    """
+    text = content.strip()
+    if text.startswith('```'):
+        # Some models wrap JSON in a Markdown code fence despite being asked not to
+        text = text.split('\n', 1)[-1].rsplit('```', 1)[0]
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Response is not valid JSON: {e}")
+    if isinstance(data, dict):
+        data = data.get('friction_points')
+    if not isinstance(data, list):
+        raise ValueError("Response has no friction_points array")
+    points, rejected = [], 0
+    for item in data:
+        try:
+            points.append(validate_friction_point(item))
+        except ValueError:
+            rejected += 1
+    return points, rejected
+
+
+class FrictionPointStream:
+    """Incremental parser that picks complete friction point objects out of a streamed JSON response.
+
+    feed() takes the response text as it arrives and returns the validated points
+    whose objects were completed by it; objects that fail validation are counted in
+    rejected. Works for {"friction_points": [...]} as well as a bare array.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Start over, for a response that is being generated again."""
+        self.rejected = 0
+        self._buffer = ""
+        self._containers = []
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+
+    def feed(self, text):
+        points = []
+        offset = len(self._buffer)
+        self._buffer += text
+        for index in range(offset, len(self._buffer)):
+            char = self._buffer[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                # An object directly inside an array is one friction point
+                if char == '{' and self._containers[-1:] == ['[']:
+                    self._object_start = index
+                self._containers.append(char)
+            elif char in '}]' and self._containers:
+                self._containers.pop()
+                if char == '}' and self._object_start is not None and self._containers[-1:] == ['[']:
+                    try:
+                        points.append(validate_friction_point(json.loads(self._buffer[self._object_start:index + 1])))
+                    except ValueError:
+                        self.rejected += 1
+                    self._object_start = None
+        return points
+
+
+def is_duplicate_point(point, other, tolerance=10.0):
+    """Whether two friction points overlap in time and start within tolerance seconds of each other."""
+    return (point['start'] <= other['end'] + tolerance and other['start'] <= point['end'] + tolerance
+            and abs(point['start'] - other['start']) <= tolerance)
+
+
+def merge_friction_points(points, tolerance=10.0):
+    """Sort friction points by time and merge the duplicates reported by overlapping windows.
+
+    Two points are duplicates when their time ranges overlap and they start within
+    tolerance seconds of each other; the merged point spans both ranges and keeps
+    the more detailed description and the higher severity.
+    """
+    merged = []
+    for point in sorted(points, key=lambda point: (point['start'], point['end'])):
+        previous = merged[-1] if merged else None
+        if previous and is_duplicate_point(point, previous, tolerance):
+            previous['end'] = max(previous['end'], point['end'])
+            if len(point['description']) > len(previous['description']):
+                previous['description'] = point['description']
+                previous['category'] = point['category']
+            if SEVERITIES.index(point['severity']) > SEVERITIES.index(previous['severity']):
+                previous['severity'] = point['severity']
+        else:
+            merged.append(dict(point))
+    return merged
+
+
+def format_friction_point(point, index):
+    """Render one friction point as an entry of the friction_points_analysis.txt report."""
+    return (
+        f"- **Friction Point #{index}**:\n"
+        f"   - **Timestamp**: {format_time(point['start'])} - {format_time(point['end'])}\n"
+        f"   - **Category**: {point['category']} ({point['severity']} severity)\n"
+        f"   - **Description**: {point['description']}"
+    )
+
+
+def format_friction_points(points):
+    """Render friction points as the human-readable friction_points_analysis.txt report."""
+    if not points:
+        return "No friction points were identified in the transcript."
+    return "\n\n".join(format_friction_point(point, index) for index, point in enumerate(points, 1))
+
+
+class ResponseCache:
+    """Disk-backed cache of LLM responses keyed by model, system message, prompt hash and response format.
+
+    Each response is one small JSON file, written atomically. Entries older than
+    ttl seconds count as misses and are removed; once the cache exceeds max_bytes the
+    least recently used entries (by file mtime, refreshed on every hit) are evicted.
+    hits and misses count lookups since the cache was created.
+    """
+    def __init__(self, cache_dir, ttl=None, max_bytes=None):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(model, system_message, prompt, response_format=None):
+        """Build the cache key of one chat completion request."""
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        # Requests without a response_format keep the keys they had before it was part of them
+        fields = [model, system_message, prompt_hash] + ([response_format] if response_format else [])
+        payload = json.dumps(fields, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached {'content', 'usage', 'created'} for a key, or None on a miss."""
+        path = self._path(key)
+        entry = None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if self.ttl is not None and time.time() - entry['created'] > self.ttl:
+                os.remove(path)
+                entry = None
             else:
-                raise Exception(f"API Error: {response.status_code} - {response.text}")
+                os.utime(path)
+        except (OSError, ValueError, KeyError):
+            entry = None
+        with self._lock:
+            if entry:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry
+
+    def put(self, key, content, usage=None):
+        """Store a response and evict old entries if the cache is over its size limit."""
+        entry = {'created': time.time(), 'content': content, 'usage': usage or {}}
+        fd, temp_path = tempfile.mkstemp(prefix=".entry-", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, self._path(key))
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.evict()
+
+    def delete(self, key):
+        """Remove the entry of a key, if there is one."""
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def evict(self):
+        """Remove expired entries, then least recently used ones until under max_bytes."""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            entries.sort()
+            now = time.time()
+            total = sum(size for _, size, _ in entries)
+            for mtime, size, path in entries:
+                expired = self.ttl is not None and now - mtime > self.ttl
+                if not expired and (self.max_bytes is None or total <= self.max_bytes):
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    def stats(self):
+        """Return {'hits', 'misses'} counted since the cache was created."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+class GPTAnalyzer:
+    """Class for handling GPT analysis.
+
+    Requests go to an LLMBackend (by default the one named by config.llm_backend):
+    the OpenAI API or any OpenAI-compatible server.
+    """
+    def __init__(self, config, events=None, backend=None):
+        self.events = events or EventBus()
+        self.backend = backend or create_llm_backend(config)
+        self.model = self.backend.model
+        self.api_url = self.backend.chat_url
+        self.compiler = PromptCompiler(
+            token_budget=config.gpt_prompt_token_budget,
+            window_seconds=config.gpt_window_seconds,
+            overlap_seconds=config.gpt_window_overlap_seconds,
+            merge_gap=config.prompt_merge_gap_seconds,
+            max_line_seconds=config.prompt_max_line_seconds,
+            drop_fillers=config.prompt_drop_fillers
+        )
+        self.max_concurrency = self.backend.max_concurrency
+        self.timeout = self.backend.timeout
+        self.json_mode = self.backend.json_mode
+        self.stream = config.gpt_stream
+        self.cache = ResponseCache(
+            config.gpt_cache_dir, config.gpt_cache_ttl, config.gpt_cache_max_bytes
+        ) if config.gpt_cache_enabled else None
+
+        # One scheduler per backend, so each has its own concurrency and rate limits
+        self.scheduler = get_scheduler(
+            self.backend.name,
+            requests_per_second=self.backend.requests_per_second,
+            tokens_per_minute=self.backend.tokens_per_minute,
+            max_concurrency=self.max_concurrency,
+            max_retries=config.api_max_retries,
+            base_delay=config.api_backoff_base,
+            max_delay=config.api_backoff_max
+        )
+        # One keep-alive connection per concurrent window request
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=self.max_concurrency))
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=self.max_concurrency))
+        self.session.headers.update(self.backend.headers())
+
+    def fingerprint(self):
+        """Describe everything that affects the analysis output, for result caching."""
+        prompt_template = self._create_prompt("")
+        return {
+            'llm': self.backend.fingerprint(),
+            'system': SYSTEM_MESSAGE,
+            'prompt': hashlib.sha256(prompt_template.encode('utf-8')).hexdigest(),
+            'compiler': self.compiler.fingerprint()
+        }
+
+    def analyze_friction_points(self, transcript):
+        """Analyze friction points using GPT-4 and return them as validated dicts.
+
+        transcript is a list of Whisper segments or "[start --> end] text" transcript
+        text. Each point has start and end (seconds), category, severity and
+        description, see FRICTION_SCHEMA. The friction points of all windows are
+        merged, deduplicated and sorted; see stream_friction_points.
+        """
+        return merge_friction_points(list(self.stream_friction_points(transcript)))
+
+    def stream_friction_points(self, transcript):
+        """Yield friction points as soon as the model has generated each one.
+
+        The transcript is compiled into compact windows that fit the prompt token
+        budget (see PromptCompiler) and the windows are analyzed concurrently (at most
+        max_concurrency requests at a time). With streaming enabled every point is
+        yielded as soon as its JSON object is complete, otherwise when its window's
+        response arrives. Times are mapped back onto the recording. Overlapping
+        windows can report the same point twice; merge_friction_points on the yielded
+        points gives the final list.
+        """
+        try:
+            segments = parse_transcript(transcript) if isinstance(transcript, str) else transcript
+            overhead = count_tokens(SYSTEM_MESSAGE + self._create_prompt(""))
+            windows = self.compiler.compile(segments, overhead_tokens=overhead)
+            self.events.count('prompt_lines', sum(len(window.lines) for window in windows), component='gpt')
+            self.events.count('transcript_tokens', sum(window.tokens for window in windows), component='gpt')
+            if not windows:
+                return
+            with self.events.span('gpt_analyze', component='gpt', windows=len(windows), stream=self.stream):
+                found = queue.Queue()
+
+                def analyze(window):
+                    # Each window ends with None, or with the exception that stopped it
+                    try:
+                        self._analyze_window(window, found.put)
+                        found.put(None)
+                    except Exception as e:
+                        found.put(e)
+
+                executor = ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(windows)))
+                try:
+                    for window in windows:
+                        executor.submit(analyze, window)
+                    finished = 0
+                    while finished < len(windows):
+                        item = found.get()
+                        if item is None:
+                            finished += 1
+                        elif isinstance(item, Exception):
+                            raise item
+                        else:
+                            yield item
+                finally:
+                    executor.shutdown(wait=True, cancel_futures=True)
         except Exception as e:
             raise Exception(f"Analysis failed: {str(e)}")
 
+    def _analyze_window(self, window, emit):
+        """Analyze one compiled window, calling emit(point) for each friction point as it completes."""
+        parser = FrictionPointStream()
+
+        def on_text(text):
+            if text is None:
+                # The request is being retried; its points will be generated again
+                parser.reset()
+                return
+            for point in parser.feed(text):
+                point['start'] = window.to_absolute(point['start'], 'start')
+                point['end'] = max(window.to_absolute(point['end'], 'end'), point['start'])
+                emit(point)
+
+        # The complete response must still be a valid analysis as a whole
+        content = self._complete(self._create_prompt(window.text), on_text, validate=parse_friction_json)
+        _, rejected = parse_friction_json(content)
+        if rejected:
+            self.events.count('invalid_points', rejected, component='gpt')
+
+    def cache_stats(self):
+        """Return the response cache's {'hits', 'misses'} counters (zeros when caching is off)."""
+        return self.cache.stats() if self.cache else {'hits': 0, 'misses': 0}
+
+    def _complete(self, prompt, on_text=None, validate=None):
+        """Send one chat completion request and return the response text.
+
+        With streaming enabled the completion is read as server-sent events and each
+        piece of text is passed to on_text(text) as it arrives; on_text(None) means a
+        failed request is being retried from the start. Without streaming, on_text gets
+        the whole text at once. Identical requests are answered from the response cache
+        when it is enabled. validate(text), when given, must accept a response before it
+        is cached; a response it raises on is not cached, and a cached one is dropped.
+        """
+        on_text = on_text or (lambda text: None)
+        response_format = {"type": "json_object"} if self.json_mode else None
+        cache_key = ResponseCache.make_key(
+            f"{self.backend.base_url} {self.model}", SYSTEM_MESSAGE, prompt, response_format) if self.cache else None
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached and validate:
+                try:
+                    validate(cached['content'])
+                except ValueError:
+                    self.cache.delete(cache_key)
+                    cached = None
+            self.events.count('cache_hits' if cached else 'cache_misses', component='gpt')
+            if cached:
+                on_text(cached['content'])
+                return cached['content']
+
+        data = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_MESSAGE},
+                {"role": "user", "content": prompt}
+            ]
+        }
+        if response_format:
+            data["response_format"] = response_format
+        if self.stream:
+            data["stream"] = True
+        body = json.dumps(data)
+
+        def send():
+            on_text(None)
+            with self.events.span('gpt_request', component='gpt', model=self.model, stream=self.stream):
+                try:
+                    response = self.session.post(self.api_url, data=body, timeout=self.timeout, stream=self.stream)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    raise RetryableError(str(e), throttled=False)
+                self.events.count('api_calls', component='gpt', service=self.backend.name, status=response.status_code)
+                self.events.count('bytes_written', len(body), component='gpt')
+                if response.status_code in (429, 503):
+                    raise RetryableError(f"API Error: {response.status_code} - {response.text}",
+                                         retry_after=parse_retry_after(response.headers))
+                if response.status_code >= 500:
+                    raise RetryableError(f"API Error: {response.status_code} - {response.text}", throttled=False)
+                if response.status_code != 200:
+                    raise Exception(f"API Error: {response.status_code} - {response.text}")
+                if self.stream:
+                    return self._read_stream(response, on_text)
+                self.events.count('bytes_read', len(response.content), component='gpt')
+                result = response.json()
+                content = result['choices'][0]['message']['content']
+                on_text(content)
+                return content, result.get('usage') or {}
+
+        # The completion is budgeted at roughly the prompt size again
+        content, usage = self.scheduler.call(
+            send, tokens=2 * count_tokens(SYSTEM_MESSAGE + prompt), events=self.events)
+        self.events.count('prompt_tokens', usage.get('prompt_tokens', 0), component='gpt')
+        self.events.count('completion_tokens', usage.get('completion_tokens', 0), component='gpt')
+        if validate:
+            validate(content)
+        if self.cache:
+            try:
+                self.cache.put(cache_key, content, usage)
+            except OSError:
+                # A full or read-only cache must not fail the analysis
+                pass
+        return content
+
+    def _read_stream(self, response, on_text):
+        """Read a server-sent-events completion, passing each content delta to on_text.
+
+        Returns the whole text and the usage (only reported by servers that include
+        it in the last event). A connection lost mid-stream is retried.
+        """
+        pieces, usage, done = [], {}, False
+        try:
+            # Read to the end of the body even after [DONE], so the keep-alive
+            # connection goes back to the pool instead of being closed. Lines are
+            # decoded here: event streams are UTF-8, but requests falls back to
+            # ISO-8859-1 for a text/event-stream without a charset
+            for line in response.iter_lines():
+                if done or not line or not line.startswith(b'data:'):
+                    continue
+                self.events.count('bytes_read', len(line), component='gpt')
+                payload = line[len(b'data:'):].decode('utf-8').strip()
+                if payload == '[DONE]':
+                    done = True
+                    continue
+                event = json.loads(payload)
+                if 'error' in event:
+                    raise Exception(f"API Error: {event['error'].get('message', event['error'])}")
+                usage = event.get('usage') or usage
+                for choice in event.get('choices', []):
+                    text = (choice.get('delta') or {}).get('content')
+                    if text:
+                        pieces.append(text)
+                        on_text(text)
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            raise RetryableError(f"Stream interrupted: {e}", throttled=False)
+        finally:
+            response.close()
+        return "".join(pieces), usage
+
     def _create_prompt(self, transcript_text):
         """Create prompt for GPT analysis."""
         return f"""
 You are an expert in analyzing user interactions to identify friction points. A friction point is defined as any moment where the user encounters difficulties or inconveniences during an operation, such as confusion, frustration, delays, errors, or any form of discomfort.
 
-I will provide you with a transcript of a user interaction, where each line includes a timestamp and the corresponding dialogue or event. Your task is to:
+I will provide you with an excerpt of a transcript of a user interaction. Each line starts with [start-end], the time range in seconds from the start of the excerpt, followed by the corresponding dialogue or event. Your task is to:
 
 1. Identify all friction points: These could be moments where the user expresses confusion, encounters issues, asks for help, reports errors, or exhibits frustration.
 2. For each friction point, provide:
-   - The exact timestamp or time range where the friction point occurs.
-   - A clear description of the friction point (e.g., what issue the user encountered, what caused the inconvenience).
-   
-Please return the analysis in the following structured format:
-   
-- **Friction Point #1**:
-   - **Timestamp**: [start time] - [end time]
-   - **Description**: [Clear description of the friction point]
-
-- **Friction Point #2**:
-   - **Timestamp**: [start time] - [end time]
-   - **Description**: [Clear description of the friction point]
+   - start and end: the time range where the friction point occurs, in seconds on the same scale as the transcript timestamps.
+   - category: one of {', '.join(FRICTION_CATEGORIES)}.
+   - severity: one of {', '.join(SEVERITIES)} (high: the user could not continue or gave up; medium: the user was clearly slowed down; low: brief hesitation or minor annoyance).
+   - description: a clear description of the friction point (e.g., what issue the user encountered, what caused the inconvenience).
+
+Respond with a single JSON object and nothing else, matching this JSON schema:
+
+{json.dumps(FRICTION_SCHEMA)}
+
+If there are no friction points, respond with {{"friction_points": []}}.
 
 Here is the transcript:
 
@@ -2,33 +2,23 @@
 
 import os
 import shutil
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, Listbox, Toplevel, Label, Button
 
-from config import Config
-from file_processor import FileProcessor
+from config import Config, PII_MODEL_AWS, PII_MODEL_PADDLEOCR
+from s3_handler import S3Handler
 from loading_window import LoadingWindow
 
 class GUI:
     """Class for handling the graphical user interface."""
     def __init__(self):
         self.root = tk.Tk()
-        self.root.withdraw()  # Hide main window while loading
-
-        # Show loading window
-        loading_window = LoadingWindow(self.root)
-
-        # Initialize components
-        loading_window.update_text("Loading configuration...")
         self.config = Config()
+        self.s3_handler = S3Handler(self.config)
 
-        loading_window.update_text("Initializing processors...")
-        self.file_processor = FileProcessor(self.config)
-
-        # Close the loading window and show the main window
-        loading_window.close()
-        self.root.deiconify()
-
+        self.file_processor = None
+        self.startup_error = None
         self.selected_file = None
         self.download_path = None
         self.processed_files = None
@@ -36,6 +26,52 @@ class GUI:
         self.setup_main_window()
         self.create_widgets()
 
+        # The processors (torch, Whisper, OCR) load in the background so the window and
+        # the S3 file list are usable right away
+        self.progress_label.config(text="Loading models in the background...")
+        self.startup_thread = threading.Thread(target=self.load_processors, daemon=True)
+        self.startup_thread.start()
+        self.root.after(200, self.check_startup)
+
+    def load_processors(self):
+        """Build the FileProcessor and warm up its models (runs on a background thread)."""
+        try:
+            from file_processor import FileProcessor
+            self.file_processor = FileProcessor(self.config, s3_handler=self.s3_handler)
+        except Exception as e:
+            self.startup_error = str(e)
+            return
+        try:
+            self.file_processor.warmup()
+        except Exception as e:
+            # Not fatal: the models are loaded again when a job first needs them
+            self.startup_error = str(e)
+
+    def check_startup(self):
+        """Poll the background loader from the Tk thread and report when it is done."""
+        if self.startup_thread.is_alive():
+            self.root.after(200, self.check_startup)
+        elif self.file_processor is None:
+            self.progress_label.config(text="Initialization failed")
+        elif self.startup_error:
+            self.progress_label.config(text="Models will load when processing starts")
+        else:
+            self.progress_label.config(text="Waiting to start...")
+
+    def wait_for_processors(self):
+        """Block (keeping the UI responsive) until the background loader has finished."""
+        if self.startup_thread.is_alive():
+            loading_window = LoadingWindow(self.root)
+            loading_window.update_text("Loading models...\nThis may take a few minutes.")
+            while self.startup_thread.is_alive():
+                self.startup_thread.join(0.1)
+                loading_window.window.update()
+            loading_window.close()
+        if self.file_processor is None:
+            messagebox.showerror("Error", f"Failed to initialize processors: {self.startup_error}")
+            return False
+        return True
+
     def setup_main_window(self):
         """Set up the main window."""
         self.root.title("S3 File Processor")
@@ -82,7 +118,7 @@ class GUI:
         file_list.pack(pady=10)
 
         try:
-            files = self.file_processor.s3_handler.list_files()
+            files = self.s3_handler.list_files()
             for file in files:
                 file_list.insert(tk.END, file)
         except Exception as e:
@@ -144,8 +180,7 @@ class GUI:
         pii_var = tk.StringVar(value=self.config.pii_reduction_model)
         pii_combo = ttk.Combobox(model_frame,
                                  textvariable=pii_var,
-                                 values=["Sensitive text detection (Based on AWS)",
-                                         "Sensitive text detection (Based on PaddleOCR)"],
+                                 values=[PII_MODEL_AWS, PII_MODEL_PADDLEOCR],
                                  state="readonly")
         pii_combo.pack(pady=5)
 
@@ -167,16 +202,30 @@ class GUI:
         self.progress_bar['value'] = value
         self.root.update_idletasks()
 
+    def handle_event(self, event):
+        """Drive the progress bar from the pipeline's progress events."""
+        if event['type'] == 'progress':
+            self.update_progress(event['message'], event['percent'])
+
     def process_file(self):
         """Process the selected file."""
         if not self.selected_file:
             messagebox.showwarning("Warning", "No file selected for processing.")
             return
+        if not self.wait_for_processors():
+            return
+
+        # Drop the working files of the previous job before starting a new one
+        if self.processed_files:
+            self.file_processor.cleanup_job(self.processed_files)
+            self.processed_files = None
 
         try:
+            # Resume from the last checkpoint if a previous attempt on this file failed
             self.processed_files = self.file_processor.process_file(
                 self.selected_file,
-                progress_callback=self.update_progress
+                resume=True,
+                event_sinks=[self.handle_event]
             )
             messagebox.showinfo("Process Complete", "Transcription and friction point analysis completed.")
         except Exception as e:
@@ -215,6 +264,7 @@ class GUI:
                 'VTT File': ('transcription.vtt', self.processed_files['vtt_path']),
                 'Transcript': ('transcript.txt', self.processed_files['transcript_path']),
                 'Analysis': ('friction_points_analysis.txt', self.processed_files['analysis_path']),
+                'Friction Points (JSON)': ('friction_points.json', self.processed_files['friction_points_path']),
                 'Processed Video': ('pii_processed_video.mp4', self.processed_files['processed_video_path'])
             }
 
@@ -235,7 +285,10 @@ class GUI:
     def cleanup_and_close(self):
         """Clean up and close the application."""
         try:
-            self.file_processor.cleanup()
+            if self.file_processor:
+                if self.processed_files:
+                    self.file_processor.cleanup_job(self.processed_files)
+                self.file_processor.cleanup()
         except Exception as e:
             print(f"Cleanup error: {e}")
         self.root.destroy()
@@ -0,0 +1,121 @@
+# job_manifest.py
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class JobManifest:
+    """Crash-safe record of the stages a job has completed and the artifacts they produced.
+
+    The manifest lives next to the artifacts in the job directory and is rewritten
+    atomically (temp file + fsync + rename) after every change, so after a crash it
+    always describes a consistent set of finished artifacts. Stages are recorded with
+    their cache key, so a stage only counts as done for the same inputs and settings.
+    Artifact paths are stored relative to the job directory.
+    """
+    def __init__(self, job_dir):
+        self.job_dir = job_dir
+        self.path = os.path.join(job_dir, "manifest.json")
+        self._lock = threading.Lock()
+        self.data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'source': None, 'stages': {}, 'progress': {}}
+
+    def _save(self):
+        fd, temp_path = tempfile.mkstemp(prefix=".manifest-", dir=self.job_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def matches_source(self, source):
+        """Check whether the manifest was written for the same uploaded object."""
+        return self.data.get('source') == source
+
+    def reset(self, source):
+        """Forget all recorded progress and start a manifest for a new source object."""
+        with self._lock:
+            self.data = {'source': source, 'stages': {}, 'progress': {}}
+            self._save()
+
+    def completed(self, stage, key):
+        """Return {name: absolute path} of a stage completed with this key, or None."""
+        with self._lock:
+            entry = self.data['stages'].get(stage)
+        if not entry or entry.get('key') != key:
+            return None
+        artifacts = {name: os.path.join(self.job_dir, path) for name, path in entry['artifacts'].items()}
+        if not all(os.path.exists(path) for path in artifacts.values()):
+            return None
+        return artifacts
+
+    def mark_completed(self, stage, key, artifacts):
+        """Record a finished stage and its {name: path} artifacts."""
+        with self._lock:
+            self.data['stages'][stage] = {
+                'key': key,
+                'artifacts': {name: os.path.relpath(path, self.job_dir) for name, path in artifacts.items()},
+                'completed_at': time.time()
+            }
+            self.data['progress'].pop(stage, None)
+            self._save()
+
+    def progress(self, stage, key):
+        """Return the partial progress state saved for a stage with this key, or None."""
+        with self._lock:
+            state = self.data['progress'].get(stage)
+        if not state or state.get('key') != key:
+            return None
+        return state
+
+    def save_progress(self, stage, key, state):
+        """Atomically record partial progress of a running stage."""
+        with self._lock:
+            self.data['progress'][stage] = dict(state, key=key)
+            self._save()
+
+
+class FrameCheckpoint:
+    """Frame-level checkpoint for a video pass, backed by a JobManifest.
+
+    The video is written as a series of segment files; each time a segment is flushed
+    the list of finished segments and the index of the next frame to process are saved,
+    so a restarted pass continues from the last flushed segment instead of frame 0.
+    """
+    def __init__(self, manifest, stage, key, segment_dir, segment_frames):
+        self.manifest = manifest
+        self.stage = stage
+        self.key = key
+        self.segment_dir = segment_dir
+        self.segment_frames = segment_frames
+        state = manifest.progress(stage, key) or {}
+        segments = [os.path.join(manifest.job_dir, path) for path in state.get('segments', [])]
+        if all(os.path.exists(path) for path in segments):
+            self.segments = segments
+            self.next_frame = state.get('next_frame', 0)
+        else:
+            self.segments = []
+            self.next_frame = 0
+
+    def commit(self, segments, next_frame):
+        """Record the finished segments and the next frame to process."""
+        self.segments = list(segments)
+        self.next_frame = next_frame
+        self.manifest.save_progress(self.stage, self.key, {
+            'segments': [os.path.relpath(path, self.manifest.job_dir) for path in self.segments],
+            'next_frame': next_frame
+        })
@@ -0,0 +1,67 @@
+# llm_backends.py
+
+
+class LLMBackend:
+    """An OpenAI-compatible chat completions endpoint and the limits for calling it.
+
+    Any server that implements ``POST {base_url}/chat/completions`` works: the OpenAI
+    API, or an on-prem llama.cpp / vLLM server. Each backend gets its own
+    rate-limit scheduler, so max_concurrency, requests_per_second and
+    tokens_per_minute apply per backend.
+    """
+    def __init__(self, name, base_url, model, api_key=None, max_concurrency=4, requests_per_second=None,
+                 tokens_per_minute=None, json_mode=False, timeout=300):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.tokens_per_minute = tokens_per_minute
+        self.json_mode = json_mode
+        self.timeout = timeout
+
+    @property
+    def chat_url(self):
+        return f"{self.base_url}/chat/completions"
+
+    def headers(self):
+        """HTTP headers for every request; local servers usually need no key."""
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f'Bearer {self.api_key}'
+        return headers
+
+    def fingerprint(self):
+        """Describe everything that affects the completions, for result caching."""
+        return {'backend': self.name, 'base_url': self.base_url, 'model': self.model, 'json_mode': self.json_mode}
+
+
+def create_llm_backend(config, name=None):
+    """Build the named LLM backend (default: config.llm_backend).
+
+    "openai" is built from the openai_* / gpt_* settings; other names are looked up
+    in config.llm_backends, whose entries may set any LLMBackend argument and get
+    no API key or rate limits unless they set them.
+    """
+    name = name or config.llm_backend
+    if name == 'openai':
+        settings = {
+            'base_url': config.openai_base_url,
+            'model': config.gpt_model,
+            'api_key': config.openai_api_key,
+            'max_concurrency': config.gpt_max_concurrency,
+            'requests_per_second': config.gpt_requests_per_second,
+            'tokens_per_minute': config.gpt_tokens_per_minute,
+            'json_mode': config.gpt_json_mode
+        }
+    elif name in config.llm_backends:
+        settings = {'max_concurrency': config.gpt_max_concurrency}
+    else:
+        choices = ', '.join(['openai'] + sorted(config.llm_backends))
+        raise ValueError(f"Unknown LLM backend '{name}'. Choose from: {choices}")
+    settings['timeout'] = config.gpt_request_timeout
+    settings.update(config.llm_backends.get(name, {}))
+    if name == 'openai' and not settings['api_key']:
+        raise Exception("OpenAI API key is not set. Please set the OPENAI_API_KEY environment variable.")
+    return LLMBackend(name, **settings)
@@ -0,0 +1,158 @@
+# model_registry.py
+
+import gc
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class _Entry:
+    """A loaded model, its estimated resident size and how many callers are using it."""
+    def __init__(self, model, size):
+        self.model = model
+        self.size = size
+        self.users = 0
+        self.last_used = time.time()
+
+
+class ModelRegistry:
+    """Process-wide registry of loaded models.
+
+    Models are loaded on first use and shared by every processor in the process, keyed
+    by a tuple describing the model (engine, size, device, ...). Callers hold a model
+    with ``use`` for as long as they run it; models nobody is using are evicted least
+    recently used first whenever loading another one would exceed max_bytes. Models in
+    use are never evicted, so the budget can be exceeded while several run at once.
+    Evicted models that have a ``close`` method (such as process pools) are closed.
+    """
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Condition()
+
+    @contextmanager
+    def use(self, key, loader, size=0):
+        """Yield the model for key, loading it with loader() if needed, and pin it while in use.
+
+        size is the estimated resident size of the model in bytes, used for the budget.
+        """
+        model = self._acquire(key, loader, size)
+        try:
+            yield model
+        finally:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.users -= 1
+                    entry.last_used = time.time()
+                self._evict_over_budget()
+
+    def _acquire(self, key, loader, size):
+        with self._lock:
+            while True:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.users += 1
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.model
+                if key not in self._loading:
+                    break
+                # Another thread is loading the same model; wait for it instead of loading twice
+                self._lock.wait()
+            self._loading[key] = True
+            self._evict_over_budget(reserve=size)
+
+        try:
+            model = loader()
+        except BaseException:
+            with self._lock:
+                del self._loading[key]
+                self._lock.notify_all()
+            raise
+
+        with self._lock:
+            del self._loading[key]
+            entry = self._entries[key] = _Entry(model, size)
+            entry.users += 1
+            self.loads += 1
+            self._lock.notify_all()
+            return model
+
+    def _evict_over_budget(self, reserve=0):
+        """Drop unused models, least recently used first, until reserve more bytes fit the budget."""
+        if self.max_bytes is None:
+            return
+        evicted = []
+        for key in list(self._entries):
+            if self.resident_bytes() + reserve <= self.max_bytes:
+                break
+            if self._entries[key].users == 0:
+                evicted.append(self._entries.pop(key).model)
+                self.evictions += 1
+        if evicted:
+            _release_memory(evicted)
+
+    def resident_bytes(self):
+        """Estimated bytes held by the loaded models."""
+        return sum(entry.size for entry in self._entries.values())
+
+    def loaded(self):
+        """Return the keys of the models currently loaded, least recently used first."""
+        with self._lock:
+            return list(self._entries)
+
+    def evict(self, key):
+        """Drop a model that is not in use; returns whether it was dropped."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.users:
+                return False
+            del self._entries[key]
+            self.evictions += 1
+        _release_memory([entry.model])
+        return True
+
+    def clear(self):
+        """Drop every model that is not in use."""
+        with self._lock:
+            evicted = [self._entries.pop(key).model
+                       for key in [key for key, entry in self._entries.items() if not entry.users]]
+            self.evictions += len(evicted)
+        _release_memory(evicted)
+
+
+def _release_memory(models=()):
+    """Close dropped models and return their memory to the system (and the GPU allocator)."""
+    for model in models:
+        close = getattr(model, 'close', None)
+        if close is not None:
+            close()
+    gc.collect()
+    torch = sys.modules.get('torch')
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry(max_bytes=None):
+    """Return the process-wide ModelRegistry, creating it on first use.
+
+    A max_bytes passed here replaces the budget of the existing registry.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry(max_bytes)
+        elif max_bytes is not None:
+            _registry.max_bytes = max_bytes
+        return _registry
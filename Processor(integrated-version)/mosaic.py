@@ -0,0 +1,116 @@
+# mosaic.py
+
+from PIL import Image
+
+# Rekognition DetectText limits: image bytes per request, and words returned per image
+REKOGNITION_MAX_BYTES = 5 * 1024 * 1024
+REKOGNITION_MAX_WORDS = 100
+
+
+class Mosaic:
+    """Crops of several frames tiled onto one image, so one detect_text request reads them all.
+
+    Crops keep their scale and are placed on shelves, left to right and top to
+    bottom, within max_side x max_side pixels and separated by gutter pixels of
+    white so that words of neighbouring crops are not read as one line. A crop
+    larger than max_side is only accepted by an empty mosaic, and is then sent alone.
+    So is a whole frame, since a screen full of text can reach DetectText's word
+    limit on its own. Crops carry an estimate of the words they hold, and a mosaic
+    takes crops up to max_words estimated words, so dense crops are sent alone too.
+    """
+    def __init__(self, max_side=2048, max_crops=16, gutter=16, max_words=REKOGNITION_MAX_WORDS):
+        self.max_side = max_side
+        self.max_crops = max_crops
+        self.gutter = gutter
+        self.max_words = max_words
+        # (image, (left, top, right, bottom) region of the image, x, y in the mosaic)
+        self.placements = []
+        self.width = 0
+        self.height = 0
+        self._x = 0
+        self._y = 0
+        self._shelf_height = 0
+        self._alone = False
+        self.words = 0
+
+    def add(self, image, region, words=0):
+        """Place the region crop of a PIL image; returns its placement index, or None if it does not fit.
+
+        words is the estimated number of words in the crop.
+        """
+        if len(self.placements) >= self.max_crops or self._alone:
+            return None
+        left, top, right, bottom = region
+        alone = tuple(region) == (0, 0) + image.size or words >= self.max_words
+        if alone and self.placements:
+            return None
+        if self.placements and self.words + words >= self.max_words:
+            return None
+        width, height = right - left, bottom - top
+        x, y, shelf_height = self._x, self._y, self._shelf_height
+        if x and x + width > self.max_side:
+            x, y, shelf_height = 0, y + shelf_height + self.gutter, 0
+        if self.placements and (x + width > self.max_side or y + height > self.max_side):
+            return None
+        self.placements.append((image, region, x, y))
+        self._alone = alone
+        self.words += words
+        self._x, self._y = x + width + self.gutter, y
+        self._shelf_height = max(shelf_height, height)
+        self.width = max(self.width, x + width)
+        self.height = max(self.height, y + height)
+        return len(self.placements) - 1
+
+    def split(self):
+        """Return the crops repacked as two mosaics holding half of them each, in placement order."""
+        half = (len(self.placements) + 1) // 2
+        mosaics = []
+        for group in (self.placements[:half], self.placements[half:]):
+            mosaic = None
+            for image, region, _, _ in group:
+                if mosaic is None or mosaic.add(image, region) is None:
+                    mosaic = Mosaic(self.max_side, self.max_crops, self.gutter, self.max_words)
+                    mosaics.append(mosaic)
+                    mosaic.add(image, region)
+        return mosaics
+
+    def render(self):
+        """Return the mosaic as one RGB image (a lone whole-frame crop is returned as is)."""
+        if len(self.placements) == 1:
+            image, region, _, _ = self.placements[0]
+            return image if tuple(region) == (0, 0) + image.size else image.crop(region)
+        mosaic = Image.new('RGB', (self.width, self.height), (255, 255, 255))
+        for image, region, x, y in self.placements:
+            mosaic.paste(image.crop(region), (x, y))
+        return mosaic
+
+    def split_words(self, words):
+        """Map (word, box) pairs read on the mosaic back to the crops they were read on.
+
+        Boxes are normalized to the mosaic; each word goes to the crop holding its
+        centre, with its box clipped to the crop and normalized to that crop's frame.
+        Returns one list of (word, box) pairs per placement.
+        """
+        results = [[] for _ in self.placements]
+        for word, box in words:
+            left = box['Left'] * self.width
+            top = box['Top'] * self.height
+            right = left + box['Width'] * self.width
+            bottom = top + box['Height'] * self.height
+            centre_x, centre_y = (left + right) / 2, (top + bottom) / 2
+            for index, (image, region, x, y) in enumerate(self.placements):
+                crop_width, crop_height = region[2] - region[0], region[3] - region[1]
+                if x <= centre_x < x + crop_width and y <= centre_y < y + crop_height:
+                    img_width, img_height = image.size
+                    crop_left = min(max(left - x, 0), crop_width)
+                    crop_top = min(max(top - y, 0), crop_height)
+                    crop_right = min(max(right - x, 0), crop_width)
+                    crop_bottom = min(max(bottom - y, 0), crop_height)
+                    results[index].append((word, {
+                        'Left': (region[0] + crop_left) / img_width,
+                        'Top': (region[1] + crop_top) / img_height,
+                        'Width': (crop_right - crop_left) / img_width,
+                        'Height': (crop_bottom - crop_top) / img_height
+                    }))
+                    break
+        return results
@@ -1,26 +1,25 @@
 # paddleocr_pii_processor.py
 
 import re
+import shutil
 import cv2
 import numpy as np
-from paddleocr import PaddleOCR
+
+from video_io import SegmentedVideoWriter, concat_segments
+from events import EventBus
+from model_registry import get_registry
+
+# Approximate resident size of the PaddleOCR detection, angle and recognition models
+PADDLEOCR_MEMORY_ESTIMATE = 800 * 1024 ** 2
 
 class PaddleOCRPIIProcessor:
     """Class for handling PII detection and reduction using PaddleOCR."""
-    def __init__(self, config):
-        self.use_gpu = config.device.type == 'cuda'
+    def __init__(self, config, events=None):
+        self.events = events or EventBus()
+        self.use_gpu = config.device.startswith('cuda')
+        self.registry = get_registry(config.model_memory_budget)
+        self.registry_key = ('paddleocr', 'en', self.use_gpu)
         print(f"PaddleOCR using GPU: {self.use_gpu}")
-        self.ocr = PaddleOCR(
-            use_angle_cls=True,
-            lang='en',
-            use_gpu=self.use_gpu,
-            gpu_mem=500 if self.use_gpu else None,
-            enable_mkldnn=not self.use_gpu,
-            use_mp=True,
-            total_process_num=4,
-            use_tensorrt=False,  # Set to True if TensorRT is available
-            det_use_gpu=self.use_gpu
-        )
         self.patterns = {
             "myGov username": r"\b[A-Z0-9]{8}\b",
             "Date of birth": r"\b\d{1,2}\s(?:January|February|March|April|May|June|July|August|September|October|November|December)\s\d{4}\b",
@@ -33,10 +32,46 @@ class PaddleOCRPIIProcessor:
             'CVC': r'\b\d{3,4}\b'
         }
 
+    def fingerprint(self):
+        """Describe everything that affects the processed video, for result caching."""
+        import paddleocr
+        return {
+            'backend': 'paddleocr',
+            'version': getattr(paddleocr, '__version__', 'unknown'),
+            'patterns': self.patterns,
+            'blur_kernel': 51
+        }
+
+    def _load_ocr(self):
+        """Build the PaddleOCR engine (called by the model registry on first use)."""
+        from paddleocr import PaddleOCR
+        return PaddleOCR(
+            use_angle_cls=True,
+            lang='en',
+            use_gpu=self.use_gpu,
+            gpu_mem=500 if self.use_gpu else None,
+            enable_mkldnn=not self.use_gpu,
+            use_mp=True,
+            total_process_num=4,
+            use_tensorrt=False,  # Set to True if TensorRT is available
+            det_use_gpu=self.use_gpu
+        )
+
+    def warmup(self):
+        """Load the OCR engine into the model registry ahead of the first video."""
+        with self.ocr():
+            pass
+
+    def ocr(self):
+        """Hold the shared PaddleOCR engine, loading it on first use."""
+        return self.registry.use(self.registry_key, self._load_ocr, PADDLEOCR_MEMORY_ESTIMATE)
+
     def detect_text_from_frame(self, frame):
         """Detect text in a frame using PaddleOCR."""
         try:
-            result = self.ocr.ocr(frame)
+            with self.ocr() as ocr:
+                result = ocr.ocr(frame)
+            self.events.count('ocr_calls', component='paddleocr')
             if not result:
                 return [], {}
             text_data = []
@@ -88,28 +123,44 @@ class PaddleOCRPIIProcessor:
         except Exception as e:
             raise Exception(f"Frame processing failed: {str(e)}")
 
-    def process_video(self, input_path, output_path, progress_callback=None):
-        """Process video to blur PII information."""
+    def process_video(self, input_path, output_path, progress_callback=None, checkpoint=None):
+        """Process video to blur PII information.
+
+        With a FrameCheckpoint the output is written in segments and the pass resumes
+        from the checkpoint's next frame.
+        """
         try:
-            cap = cv2.VideoCapture(input_path)
-            frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
-            current_frame = 0
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                processed_frame = self.process_frame(frame)
-                out.write(processed_frame)
-                current_frame += 1
-                if progress_callback:
-                    progress = int((current_frame / frame_count) * 100)
-                    progress_callback(f"Processing frame {current_frame}/{frame_count}", progress)
-            cap.release()
-            out.release()
+            # Keep the OCR engine loaded (and exempt from eviction) for the whole pass
+            with self.events.span('paddleocr_pii_video', component='paddleocr'), self.ocr():
+                cap = cv2.VideoCapture(input_path)
+                frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                fps = cap.get(cv2.CAP_PROP_FPS)
+                frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+                segment_dir = checkpoint.segment_dir if checkpoint else output_path + ".segments"
+                writer = SegmentedVideoWriter(
+                    segment_dir, fps, (frame_width, frame_height),
+                    segment_frames=checkpoint.segment_frames if checkpoint else None,
+                    checkpoint=checkpoint
+                )
+                # Skip the frames already written by a previous run
+                current_frame = 0
+                while current_frame < writer.frame_index and cap.grab():
+                    current_frame += 1
+                while cap.isOpened():
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    processed_frame = self.process_frame(frame)
+                    writer.write(processed_frame)
+                    current_frame += 1
+                    self.events.count('frames', component='paddleocr')
+                    if progress_callback:
+                        progress = int((current_frame / frame_count) * 100)
+                        progress_callback(f"Processing frame {current_frame}/{frame_count}", progress)
+                cap.release()
+                concat_segments(writer.close(), output_path)
+                if not checkpoint:
+                    shutil.rmtree(segment_dir, ignore_errors=True)
         except Exception as e:
             raise Exception(f"Video processing failed: {str(e)}")
@@ -0,0 +1,154 @@
+# prompt_compiler.py
+
+import re
+from functools import lru_cache
+
+from friction_filter import FILLER_CUES
+
+# A segment is filler-only when nothing but hesitation fillers and punctuation remains
+FILLER_ONLY = re.compile(rf"^(?:{FILLER_CUES}|[\s.,!?…'\"-])*$", re.I)
+
+
+@lru_cache(maxsize=None)
+def _token_encoding():
+    """Return tiktoken's cl100k_base encoding, or None when it cannot be loaded."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Not installed, or installed without a cached encoding file and offline
+        return None
+
+
+def count_tokens(text):
+    """Count prompt tokens locally with tiktoken, or estimate them (~4 characters per token) without it."""
+    encoding = _token_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+class PromptLine:
+    """One transcript line of a prompt: adjacent Whisper segments merged together.
+
+    ``starts`` and ``ends`` keep the absolute times of the merged segments, so times
+    reported by the model can be snapped back onto real segment boundaries.
+    """
+    def __init__(self, segment):
+        self.start = float(segment['start'])
+        self.end = float(segment['end'])
+        self.text = segment['text'].strip()
+        self.starts = [self.start]
+        self.ends = [self.end]
+
+    def merge(self, segment):
+        self.end = float(segment['end'])
+        self.text = f"{self.text} {segment['text'].strip()}"
+        self.starts.append(float(segment['start']))
+        self.ends.append(self.end)
+
+
+class CompiledWindow:
+    """The transcript text of one request and the map from its relative times back to the recording."""
+    def __init__(self, lines, origin, text, tokens):
+        self.lines = lines
+        self.origin = origin
+        self.text = text
+        self.tokens = tokens
+
+    def to_absolute(self, t, edge='start', tolerance=0.5):
+        """Map a time relative to the window onto the recording.
+
+        The prompt shows times rounded to 0.1 s, so a time within tolerance seconds of
+        a segment boundary (a start for edge='start', an end for edge='end') is snapped
+        to that boundary's exact time.
+        """
+        absolute = self.origin + t
+        boundaries = [time for line in self.lines for time in (line.starts if edge == 'start' else line.ends)]
+        nearest = min(boundaries, key=lambda boundary: abs(boundary - absolute), default=None)
+        if nearest is not None and abs(nearest - absolute) <= tolerance:
+            return nearest
+        return max(0.0, absolute)
+
+
+def format_offset(seconds):
+    """Format a relative time compactly: 62.5 -> "62.5", 15.0 -> "15"."""
+    return f"{seconds:.1f}".rstrip('0').rstrip('.')
+
+
+class PromptCompiler:
+    """Turn Whisper segments into compact transcript windows that fit a token budget.
+
+    Filler-only segments ("um", "uh...") are dropped, adjacent segments less than
+    merge_gap seconds apart are merged into lines of up to max_line_seconds, and each
+    line is written as "[start-end] text" in seconds from the start of its window.
+    Windows hold at most token_budget tokens (counted locally, on top of
+    overhead_tokens for the instructions) and window_seconds of audio, and overlap by
+    overlap_seconds so a friction point at a boundary is seen whole by one window.
+    """
+    def __init__(self, token_budget=6000, window_seconds=600, overlap_seconds=60,
+                 merge_gap=1.0, max_line_seconds=20.0, drop_fillers=True):
+        self.token_budget = token_budget
+        self.window_seconds = window_seconds
+        self.overlap_seconds = overlap_seconds
+        self.merge_gap = merge_gap
+        self.max_line_seconds = max_line_seconds
+        self.drop_fillers = drop_fillers
+
+    def fingerprint(self):
+        """Describe everything that affects the compiled prompts, for result caching."""
+        return {
+            'token_budget': self.token_budget,
+            'window_seconds': self.window_seconds,
+            'overlap_seconds': self.overlap_seconds,
+            'merge_gap': self.merge_gap,
+            'max_line_seconds': self.max_line_seconds,
+            'drop_fillers': self.drop_fillers
+        }
+
+    def compact(self, segments):
+        """Drop filler-only segments and merge adjacent short ones into PromptLines."""
+        lines = []
+        for segment in segments:
+            text = segment['text'].strip()
+            if not text or (self.drop_fillers and FILLER_ONLY.match(text)):
+                continue
+            previous = lines[-1] if lines else None
+            if (previous and segment['start'] - previous.end <= self.merge_gap
+                    and segment['end'] - previous.start <= self.max_line_seconds):
+                previous.merge(segment)
+            else:
+                lines.append(PromptLine(segment))
+        return lines
+
+    def compile(self, segments, overhead_tokens=0):
+        """Return the CompiledWindows covering the segments, in order."""
+        lines = self.compact(segments)
+        budget = max(self.token_budget - overhead_tokens, 1)
+        windows = []
+        first = 0
+        while first < len(lines):
+            origin = lines[first].start
+            rendered, tokens = [], 0
+            last = first
+            while last < len(lines):
+                line = lines[last]
+                text = f"[{format_offset(line.start - origin)}-{format_offset(line.end - origin)}] {line.text}"
+                line_tokens = count_tokens(text) + 1
+                if last > first and (tokens + line_tokens > budget or line.end - origin > self.window_seconds):
+                    break
+                rendered.append(text)
+                tokens += line_tokens
+                last += 1
+            windows.append(CompiledWindow(lines[first:last], origin, "\n".join(rendered), tokens))
+            if last == len(lines):
+                break
+            # Start the next window overlap_seconds before this one ends, but never
+            # repeat more than half of a window that the token budget cut short
+            overlap_start = lines[last - 1].end - self.overlap_seconds
+            earliest = first + max(1, (last - first + 1) // 2)
+            next_first = last
+            while next_first - 1 >= earliest and lines[next_first - 1].start >= overlap_start:
+                next_first -= 1
+            first = next_first
+        return windows
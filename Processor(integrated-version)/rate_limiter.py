@@ -0,0 +1,224 @@
+# rate_limiter.py
+
+import email.utils
+import random
+import threading
+import time
+
+# botocore error codes that mean "slow down" rather than "this request is wrong"
+AWS_THROTTLING_CODES = {
+    'ThrottlingException', 'Throttling', 'TooManyRequestsException', 'RequestLimitExceeded',
+    'ProvisionedThroughputExceededException', 'LimitExceededException', 'SlowDown'
+}
+AWS_TRANSIENT_CODES = {'ServiceUnavailable', 'ServiceUnavailableException', 'InternalServerError',
+                       'InternalServerException', 'RequestTimeout', 'RequestTimeoutException'}
+
+
+class RetryableError(Exception):
+    """Raised by a scheduled call whose request may succeed if sent again later.
+
+    throttled marks provider rate limiting (429, ThrottlingException), which also
+    halves the scheduler's concurrency; retry_after is the delay the provider asked
+    for, in seconds.
+    """
+    def __init__(self, message, retry_after=None, throttled=True):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.throttled = throttled
+
+
+def parse_retry_after(headers):
+    """Return the delay in seconds requested by Retry-After / retry-after-ms headers, or None."""
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        # HTTP-date form
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def aws_retryable(error):
+    """Convert a throttling or transient botocore ClientError into a RetryableError, else None."""
+    response = getattr(error, 'response', None) or {}
+    code = response.get('Error', {}).get('Code')
+    if code in AWS_THROTTLING_CODES:
+        return RetryableError(str(error), throttled=True)
+    if code in AWS_TRANSIENT_CODES or response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0) >= 500:
+        return RetryableError(str(error), throttled=False)
+    return None
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate tokens/second, holding at most capacity."""
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        """Take amount tokens, sleeping until they are available; returns the time waited."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class RequestScheduler:
+    """Shared gate for the calls to one external API.
+
+    Every call waits for a concurrency slot and for the request-rate (requests/sec)
+    and token-rate (tokens/min) buckets. Calls that raise RetryableError are retried
+    with jittered exponential backoff, honouring the provider's Retry-After, which
+    also pauses every other call to the same API. Concurrency adapts AIMD-style: it
+    grows by one slot per window of successful calls and halves on throttling.
+    """
+    def __init__(self, name, requests_per_second=None, tokens_per_minute=None, max_concurrency=8,
+                 min_concurrency=1, max_retries=5, base_delay=0.5, max_delay=30.0):
+        self.name = name
+        self.request_bucket = TokenBucket(requests_per_second, max(1.0, requests_per_second)) \
+            if requests_per_second else None
+        self.token_bucket = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.concurrency_limit = float(max_concurrency)
+        self._active = 0
+        self._waiting = 0
+        self._resume_at = 0.0
+        self._condition = threading.Condition()
+        self._stats = {
+            'calls': 0, 'retries': 0, 'throttled': 0, 'failures': 0,
+            'wait_time': 0.0, 'max_wait_time': 0.0, 'max_queue_depth': 0
+        }
+
+    def call(self, func, tokens=0, events=None):
+        """Run func() under the limits and return its result, retrying RetryableErrors.
+
+        tokens is the estimated token cost of the request for the tokens/min bucket.
+        Waits, retries and throttling are counted on events when given.
+        """
+        attempt = 0
+        while True:
+            waited = self._enter(tokens)
+            if events is not None and waited:
+                events.count('rate_limit_wait', waited, component='scheduler', service=self.name)
+            try:
+                result = func()
+            except RetryableError as e:
+                self._exit(throttled=e.throttled)
+                attempt += 1
+                if attempt > self.max_retries:
+                    with self._condition:
+                        self._stats['failures'] += 1
+                    raise Exception(f"{self.name}: giving up after {self.max_retries} retries: {e}")
+                delay = self._backoff(attempt, e.retry_after)
+                with self._condition:
+                    self._stats['retries'] += 1
+                    if e.retry_after:
+                        self._resume_at = max(self._resume_at, time.monotonic() + e.retry_after)
+                if events is not None:
+                    events.count('retries', component='scheduler', service=self.name, throttled=e.throttled)
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self._exit()
+                with self._condition:
+                    self._stats['failures'] += 1
+                raise
+            self._exit(succeeded=True)
+            return result
+
+    def _enter(self, tokens):
+        """Wait for a concurrency slot, any Retry-After pause and the rate buckets."""
+        started = time.monotonic()
+        with self._condition:
+            self._waiting += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._waiting)
+            while self._active >= int(self.concurrency_limit):
+                self._condition.wait()
+            self._waiting -= 1
+            self._active += 1
+            pause = self._resume_at - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+        if self.request_bucket:
+            self.request_bucket.acquire(1)
+        if self.token_bucket and tokens:
+            self.token_bucket.acquire(tokens)
+        waited = time.monotonic() - started
+        with self._condition:
+            self._stats['calls'] += 1
+            self._stats['wait_time'] += waited
+            self._stats['max_wait_time'] = max(self._stats['max_wait_time'], waited)
+        return waited
+
+    def _exit(self, succeeded=False, throttled=False):
+        with self._condition:
+            self._active -= 1
+            if throttled:
+                self._stats['throttled'] += 1
+                self.concurrency_limit = max(float(self.min_concurrency), self.concurrency_limit / 2)
+            elif succeeded:
+                self.concurrency_limit = min(float(self.max_concurrency),
+                                             self.concurrency_limit + 1 / self.concurrency_limit)
+            self._condition.notify_all()
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, never shorter than the provider's Retry-After."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        return max(delay, retry_after or 0.0)
+
+    def metrics(self):
+        """Return queue depth, wait times, retries and the current concurrency limit."""
+        with self._condition:
+            return dict(
+                self._stats,
+                name=self.name,
+                queue_depth=self._waiting,
+                active=self._active,
+                concurrency_limit=int(self.concurrency_limit),
+                mean_wait_time=self._stats['wait_time'] / self._stats['calls'] if self._stats['calls'] else 0.0
+            )
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(name, **limits):
+    """Return the process-wide scheduler for an API, creating it with limits on first use."""
+    with _schedulers_lock:
+        if name not in _schedulers:
+            _schedulers[name] = RequestScheduler(name, **limits)
+        return _schedulers[name]
+
+
+def scheduler_metrics():
+    """Return the metrics of every scheduler created in this process, keyed by name."""
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return {scheduler.name: scheduler.metrics() for scheduler in schedulers}
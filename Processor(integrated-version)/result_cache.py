@@ -0,0 +1,123 @@
+# result_cache.py
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+
+def link_or_copy(source_path, destination_path):
+    """Hard-link a file if possible, otherwise copy it."""
+    if os.path.exists(destination_path):
+        os.remove(destination_path)
+    try:
+        os.link(source_path, destination_path)
+    except OSError:
+        shutil.copy2(source_path, destination_path)
+
+
+class ResultCache:
+    """Persistent, size-bounded LRU cache of pipeline stage artifacts.
+
+    Entries are content-addressed: the key is a hash of everything that determines a
+    stage's output (source object ETag/size, upstream keys, settings, model versions).
+    Each entry is a directory of named files; its mtime records the last access and
+    the least recently used entries are evicted once the cache exceeds ``max_bytes``.
+    Entries are published with an atomic rename, so concurrent workers can share a cache.
+    """
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts):
+        """Build a cache key from JSON-serializable parts."""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key):
+        """Return {file name: cached path} for a key, or None on a miss."""
+        entry_dir = self._entry_dir(key)
+        try:
+            files = {name: os.path.join(entry_dir, name) for name in os.listdir(entry_dir)}
+            os.utime(entry_dir)
+        except OSError:
+            files = None
+        with self._lock:
+            if files:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return files or None
+
+    def put(self, key, files):
+        """Store {file name: source path} under a key and return the cached paths."""
+        entry_dir = self._entry_dir(key)
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        staging_dir = tempfile.mkdtemp(prefix=".staging-", dir=os.path.dirname(entry_dir))
+        try:
+            for name, source_path in files.items():
+                link_or_copy(source_path, os.path.join(staging_dir, name))
+            try:
+                os.rename(staging_dir, entry_dir)
+            except OSError:
+                # Another job published the same entry first; keep theirs
+                shutil.rmtree(staging_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        self.evict()
+        return {name: os.path.join(entry_dir, name) for name in files}
+
+    def fetch(self, key, destinations):
+        """Materialize a cached entry into {file name: destination path}; return False on a miss."""
+        files = self.get(key)
+        if not files or not all(name in files for name in destinations):
+            return False
+        try:
+            for name, destination_path in destinations.items():
+                link_or_copy(files[name], destination_path)
+        except OSError:
+            # The entry was evicted while we were reading it
+            return False
+        return True
+
+    def size(self):
+        """Return the total size of the cache in bytes."""
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        """Yield (last access time, entry dir, size in bytes) for every cache entry."""
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if name.startswith('.staging-'):
+                    continue
+                entry_dir = os.path.join(prefix_dir, name)
+                try:
+                    size = sum(entry.stat().st_size for entry in os.scandir(entry_dir))
+                    yield os.stat(entry_dir).st_mtime, entry_dir, size
+                except OSError:
+                    continue
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, _, size in entries)
+            for _, entry_dir, size in entries:
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                total -= size
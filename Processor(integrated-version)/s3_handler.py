@@ -1,7 +1,168 @@
 # s3_handler.py
 
+import bisect
+import io
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
 import boto3
 
+
+class S3RangeFile(io.RawIOBase):
+    """Seekable, read-only file object backed by HTTP range GETs on an S3 object.
+
+    Reads are served from an LRU cache of fixed-size blocks. A cache miss fetches the
+    missing block together with the next ``readahead`` blocks in parallel, and
+    ``prefetch`` can warm arbitrary byte ranges (e.g. a ZIP central directory) up front.
+    Read-ahead stops at ``readahead_end`` (the end of the object by default), so a
+    reader that knows where its data ends is not sent blocks past it. Every range
+    request is pinned to the ETag seen at open time, so a concurrent overwrite of the
+    object fails loudly instead of mixing two versions.
+    """
+    def __init__(self, s3_client, bucket_name, file_key, block_size=1024 * 1024,
+                 cache_blocks=32, readahead=8, max_workers=8):
+        super().__init__()
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.file_key = file_key
+        self.block_size = block_size
+        self.cache_blocks = max(cache_blocks, readahead + 1)
+        self.readahead = readahead
+        head = s3_client.head_object(Bucket=bucket_name, Key=file_key)
+        self.size = head['ContentLength']
+        self.etag = head['ETag']
+        self.readahead_end = self.size
+        self.bytes_fetched = 0
+        self.requests_made = 0
+        self._position = 0
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._position = position
+        return self._position
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast('B')
+        written = 0
+        while written < len(view) and self._position < self.size:
+            index, offset = divmod(self._position, self.block_size)
+            block = self._get_block(index)
+            chunk = block[offset:offset + len(view) - written]
+            view[written:written + len(chunk)] = chunk
+            written += len(chunk)
+            self._position += len(chunk)
+        return written
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = max(self.size - self._position, 0)
+        buffer = bytearray(size)
+        return bytes(buffer[:self.readinto(buffer)])
+
+    def readall(self):
+        return self.read(-1)
+
+    def prefetch(self, start, end):
+        """Fetch the blocks covering bytes [start, end) in parallel, up to the cache size."""
+        start = max(start, 0)
+        end = min(end, self.size)
+        if start >= end:
+            return
+        first = start // self.block_size
+        last = (end - 1) // self.block_size
+        indices = list(range(first, last + 1))[:self.cache_blocks]
+        self._fetch_blocks(indices)
+
+    def close(self):
+        if not self.closed:
+            self._executor.shutdown(wait=True)
+            with self._lock:
+                self._blocks.clear()
+        super().close()
+
+    def _get_block(self, index):
+        """Return a cached block, fetching it (plus read-ahead) on a miss."""
+        with self._lock:
+            block = self._blocks.get(index)
+            if block is not None:
+                self._blocks.move_to_end(index)
+                return block
+        last_index = (min(self.readahead_end, self.size) - 1) // self.block_size
+        self._fetch_blocks(range(index, max(index, min(index + self.readahead, last_index)) + 1))
+        with self._lock:
+            block = self._blocks.get(index)
+        return block if block is not None else self._fetch_block(index)
+
+    def _fetch_blocks(self, indices):
+        """Fetch all uncached blocks among indices concurrently and cache them."""
+        with self._lock:
+            missing = [i for i in indices if i not in self._blocks]
+        if not missing:
+            return
+        blocks = list(self._executor.map(self._fetch_block, missing))
+        with self._lock:
+            for index, block in zip(missing, blocks):
+                self._blocks[index] = block
+                self._blocks.move_to_end(index)
+            while len(self._blocks) > self.cache_blocks:
+                self._blocks.popitem(last=False)
+
+    def _fetch_block(self, index):
+        """Fetch a single block with a range GET."""
+        start = index * self.block_size
+        end = min(start + self.block_size, self.size) - 1
+        response = self.s3_client.get_object(
+            Bucket=self.bucket_name,
+            Key=self.file_key,
+            Range=f"bytes={start}-{end}",
+            IfMatch=self.etag
+        )
+        data = response['Body'].read()
+        with self._lock:
+            self.bytes_fetched += len(data)
+            self.requests_made += 1
+        return data
+
+
+class S3ZipFile(zipfile.ZipFile):
+    """ZipFile over an S3RangeFile that keeps read-ahead within the member being read.
+
+    A member's data ends where the next member's local header (or the central
+    directory) starts, so extracting one member fetches only the blocks it spans.
+    """
+    def open(self, name, mode='r', pwd=None, *, force_zip64=False):
+        if mode == 'r' and isinstance(self.fp, S3RangeFile):
+            info = name if isinstance(name, zipfile.ZipInfo) else self.getinfo(name)
+            offsets = sorted(member.header_offset for member in self.infolist())
+            index = bisect.bisect_right(offsets, info.header_offset)
+            self.fp.readahead_end = offsets[index] if index < len(offsets) else self.start_dir
+        return super().open(name, mode, pwd, force_zip64=force_zip64)
+
+
 class S3Handler:
     """Class for handling S3 operations."""
     def __init__(self, config):
@@ -14,19 +175,62 @@ class S3Handler:
         )
         self.bucket_name = config.bucket_name
 
-    def list_files(self):
-        """List all files in the S3 bucket."""
+    def list_files(self, prefix=""):
+        """List all files in the S3 bucket, optionally restricted to a key prefix."""
         try:
-            response = self.s3_client.list_objects_v2(Bucket=self.bucket_name)
-            if 'Contents' in response:
-                return [file['Key'] for file in response['Contents']]
-            return []
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            files = []
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+                files.extend(file['Key'] for file in page.get('Contents', []))
+            return files
         except Exception as e:
             raise Exception(f"Failed to list files from S3: {str(e)}")
 
+    def head_file(self, file_key):
+        """Return the identity of an S3 object: its ETag and size."""
+        try:
+            head = self.s3_client.head_object(Bucket=self.bucket_name, Key=file_key)
+            return {'etag': head['ETag'], 'size': head['ContentLength']}
+        except Exception as e:
+            raise Exception(f"Failed to read file metadata from S3: {str(e)}")
+
+    def open_file(self, file_key):
+        """Open an S3 object as a seekable file object that reads with range GETs."""
+        try:
+            return S3RangeFile(
+                self.s3_client,
+                self.bucket_name,
+                file_key,
+                block_size=self.config.s3_block_size,
+                cache_blocks=self.config.s3_cache_blocks,
+                readahead=self.config.s3_readahead_blocks,
+                max_workers=self.config.s3_max_workers
+            )
+        except Exception as e:
+            raise Exception(f"Failed to open file from S3: {str(e)}")
+
+    @contextmanager
+    def open_zip(self, file_key):
+        """Open a ZIP object on S3 without downloading it; only members that are read are fetched."""
+        remote_file = self.open_file(file_key)
+        try:
+            # The end-of-central-directory record and the central directory sit at the tail
+            remote_file.prefetch(remote_file.size - self.config.s3_zip_tail_size, remote_file.size)
+            with S3ZipFile(remote_file, 'r') as zip_ref:
+                yield zip_ref
+        finally:
+            remote_file.close()
+
     def download_file(self, file_key, destination_path):
         """Download a file from S3."""
         try:
             self.s3_client.download_file(self.bucket_name, file_key, destination_path)
         except Exception as e:
             raise Exception(f"Failed to download file from S3: {str(e)}")
+
+    def upload_file(self, source_path, file_key):
+        """Upload a local file to S3."""
+        try:
+            self.s3_client.upload_file(source_path, self.bucket_name, file_key)
+        except Exception as e:
+            raise Exception(f"Failed to upload file to S3: {str(e)}")
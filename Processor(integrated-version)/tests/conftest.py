@@ -0,0 +1,41 @@
+# tests/conftest.py
+
+import itertools
+import os
+import sys
+
+import pytest
+
+# The modules live flat in the project directory, as main.py and worker.py import them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from fakes import FakeOpenAIServer
+from gpt_analyzer import GPTAnalyzer
+from llm_backends import LLMBackend
+
+# Rate-limit schedulers are per process and keyed by backend name, so every
+# analyzer gets a backend of its own
+_backend_ids = itertools.count()
+
+
+@pytest.fixture
+def openai_server():
+    with FakeOpenAIServer() as server:
+        yield server
+
+
+@pytest.fixture
+def make_analyzer(tmp_path):
+    """Return a factory of GPTAnalyzers talking to a FakeOpenAIServer, with Config settings overridden."""
+    def make(server, **settings):
+        config = Config()
+        config.gpt_cache_enabled = False
+        config.gpt_cache_dir = str(tmp_path / "llm-cache")
+        config.api_backoff_base = 0.01
+        for name, value in settings.items():
+            setattr(config, name, value)
+        backend = LLMBackend(f"test-{next(_backend_ids)}", server.base_url, 'test-model',
+                             json_mode=config.gpt_json_mode)
+        return GPTAnalyzer(config, backend=backend)
+    return make
@@ -0,0 +1,144 @@
+# tests/test_gpt_analyzer.py
+
+import json
+import os
+import time
+
+from fakes import TRANSCRIPT_LINE
+from gpt_analyzer import SYSTEM_MESSAGE, ResponseCache, merge_friction_points
+from prompt_compiler import count_tokens
+
+# Starts of the segments holding a friction cue of fakes.fake_friction_analysis; the
+# one at 100 s lies in the overlap of the first two 120 s windows, which overlap by 30 s
+CUE_STARTS = (100.0, 250.0, 470.0)
+
+
+def recording_segments(minutes=10):
+    """Whisper-like segments every 10 s, 2 s apart so they are not merged into one line."""
+    segments = []
+    for index in range(minutes * 6):
+        start = index * 10.0
+        text = "why is this so confusing" if start in CUE_STARTS else f"I open the settings page number {index}"
+        segments.append({'id': index, 'start': start, 'end': start + 8.0, 'text': f" {text}"})
+    return segments
+
+
+def window_settings(**settings):
+    return dict(gpt_window_seconds=120, gpt_window_overlap_seconds=30, **settings)
+
+
+def test_long_transcript_is_split_into_windows(openai_server, make_analyzer):
+    analyzer = make_analyzer(openai_server, **window_settings())
+    points = analyzer.analyze_friction_points(recording_segments())
+
+    assert len(openai_server.requests) > 5
+    for request in openai_server.requests:
+        prompt = request['messages'][-1]['content']
+        assert count_tokens(SYSTEM_MESSAGE + prompt) <= analyzer.compiler.token_budget
+        assert max(float(match.group(2)) for match in TRANSCRIPT_LINE.finditer(prompt)) <= 120
+    # Times are mapped back from each window onto the recording
+    assert [point['start'] for point in points] == list(CUE_STARTS)
+    assert [point['end'] for point in points] == [start + 8.0 for start in CUE_STARTS]
+
+
+def test_token_budget_splits_windows(openai_server, make_analyzer):
+    analyzer = make_analyzer(openai_server, gpt_prompt_token_budget=count_tokens(SYSTEM_MESSAGE) + 900)
+    points = analyzer.analyze_friction_points(recording_segments())
+
+    assert len(openai_server.requests) > 1
+    for request in openai_server.requests:
+        assert count_tokens(SYSTEM_MESSAGE + request['messages'][-1]['content']) <= analyzer.compiler.token_budget
+    assert [point['start'] for point in points] == list(CUE_STARTS)
+
+
+def test_points_in_window_overlap_are_merged(openai_server, make_analyzer):
+    analyzer = make_analyzer(openai_server, **window_settings())
+    segments = recording_segments()
+
+    streamed = list(analyzer.stream_friction_points(segments))
+    assert sum(point['start'] == CUE_STARTS[0] for point in streamed) == 2
+
+    merged = merge_friction_points(streamed)
+    assert [point['start'] for point in merged] == list(CUE_STARTS)
+    assert analyzer.analyze_friction_points(segments) == merged
+
+
+def test_merge_keeps_longest_description_and_highest_severity():
+    points = [
+        {'start': 10.0, 'end': 14.0, 'category': 'navigation', 'severity': 'low', 'description': "Lost"},
+        {'start': 12.0, 'end': 20.0, 'category': 'error', 'severity': 'high',
+         'description': "The save button reported an error"},
+        {'start': 40.0, 'end': 42.0, 'category': 'comprehension', 'severity': 'medium', 'description': "Unsure"}
+    ]
+
+    merged = merge_friction_points(points)
+
+    assert merged == [
+        {'start': 10.0, 'end': 20.0, 'category': 'error', 'severity': 'high',
+         'description': "The save button reported an error"},
+        points[2]
+    ]
+    assert points[0]['end'] == 14.0
+
+
+def test_repeated_analysis_is_answered_from_cache(openai_server, make_analyzer):
+    analyzer = make_analyzer(openai_server, gpt_cache_enabled=True, **window_settings())
+    segments = recording_segments()
+
+    first = analyzer.analyze_friction_points(segments)
+    sent = len(openai_server.requests)
+    second = analyzer.analyze_friction_points(segments)
+
+    assert second == first
+    assert len(openai_server.requests) == sent
+    assert analyzer.cache_stats() == {'hits': sent, 'misses': sent}
+
+
+def test_json_mode_responses_are_cached_apart(openai_server, make_analyzer):
+    segments = recording_segments()
+    make_analyzer(openai_server, gpt_cache_enabled=True, **window_settings()).analyze_friction_points(segments)
+    sent = len(openai_server.requests)
+
+    analyzer = make_analyzer(openai_server, gpt_cache_enabled=True, gpt_json_mode=True, **window_settings())
+    analyzer.analyze_friction_points(segments)
+
+    assert len(openai_server.requests) == 2 * sent
+    assert all(request['response_format'] == {'type': 'json_object'} for request in openai_server.requests[sent:])
+    assert analyzer.cache_stats() == {'hits': 0, 'misses': sent}
+
+
+def test_cache_entries_expire_after_ttl(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    cache.put('fresh', "{}")
+    cache.put('stale', "{}")
+    path = os.path.join(str(tmp_path), 'stale.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        entry = json.load(f)
+    entry['created'] -= 120
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f)
+
+    assert cache.get('stale') is None
+    assert not os.path.exists(path)
+    assert cache.get('fresh')['content'] == "{}"
+    assert cache.stats() == {'hits': 1, 'misses': 1}
+
+
+def test_cache_evicts_least_recently_used_over_max_bytes(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put('a', "x" * 100)
+    entry_bytes = os.path.getsize(os.path.join(str(tmp_path), 'a.json'))
+    # Room for two entries but not three
+    cache.max_bytes = 2 * entry_bytes + entry_bytes // 2
+    cache.put('b', "y" * 100)
+    now = time.time()
+    os.utime(os.path.join(str(tmp_path), 'a.json'), (now - 30, now - 30))
+    os.utime(os.path.join(str(tmp_path), 'b.json'), (now - 20, now - 20))
+
+    # A hit makes "a" the most recently used entry, so "b" goes first
+    assert cache.get('a') is not None
+    cache.put('c', "z" * 100)
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
@@ -0,0 +1,186 @@
+# tests/test_streaming.py
+
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from fakes import fake_friction_analysis
+from gpt_analyzer import FrictionPointStream
+from rate_limiter import RequestScheduler, RetryableError, parse_retry_after
+
+# Three friction cues of fakes.fake_friction_analysis, too far apart to be merged
+TRANSCRIPT = [
+    {'id': 0, 'start': 0.0, 'end': 4.0, 'text': " Where is the “Submit” button? I'm stuck"},
+    {'id': 1, 'start': 30.0, 'end': 33.0, 'text': " It says error — café form not working"},
+    {'id': 2, 'start': 60.0, 'end': 63.0, 'text': " Why is this so confusing ✓"}
+]
+
+
+class PiecewiseRaw:
+    """Stand-in for a urllib3 response body that returns the given byte pieces one read at a time."""
+    def __init__(self, pieces):
+        self.pieces = list(pieces)
+
+    def read(self, amount=None, **kwargs):
+        return self.pieces.pop(0) if self.pieces else b""
+
+    def close(self):
+        pass
+
+
+def sse_response(body, piece_bytes):
+    """A streamed requests.Response whose body arrives in piece_bytes-sized reads."""
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'text/event-stream'
+    # What requests guesses for a text type without a charset: ISO-8859-1
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.raw = PiecewiseRaw(body[offset:offset + piece_bytes] for offset in range(0, len(body), piece_bytes))
+    return response
+
+
+def sse_body(texts, after_done=()):
+    events = [json.dumps({'choices': [{'delta': {'content': text}}]}, ensure_ascii=False) for text in texts]
+    return "".join(f"data: {event}\n\n" for event in events + ['[DONE]'] + list(after_done)).encode('utf-8')
+
+
+@pytest.mark.parametrize('piece_bytes', [1, 2, 3, 7])
+def test_utf8_split_across_reads(openai_server, make_analyzer, piece_bytes):
+    analyzer = make_analyzer(openai_server)
+    texts = ["Le “café” ", "était fermé ✓", " — 東京"]
+    received = []
+
+    content, _ = analyzer._read_stream(sse_response(sse_body(texts), piece_bytes), received.append)
+
+    assert received == texts
+    assert content == "".join(texts)
+
+
+def test_events_after_done_are_ignored(openai_server, make_analyzer):
+    analyzer = make_analyzer(openai_server)
+    late = json.dumps({'choices': [{'delta': {'content': "late"}}]})
+    received = []
+
+    content, _ = analyzer._read_stream(sse_response(sse_body(["one ", "two"], [late]), 64), received.append)
+
+    assert content == "one two"
+    assert received == ["one ", "two"]
+
+
+def test_non_ascii_points_stream_intact(openai_server, make_analyzer):
+    openai_server.chunk_chars = 1
+    analyzer = make_analyzer(openai_server)
+
+    points = analyzer.analyze_friction_points(TRANSCRIPT)
+
+    expected = json.loads(fake_friction_analysis(openai_server.requests[0]['messages'][-1]['content']))
+    assert [point['description'] for point in points] == [
+        point['description'] for point in expected['friction_points']]
+    assert len(points) == 3
+
+
+def test_dropped_stream_is_retried_from_the_start(openai_server, make_analyzer):
+    openai_server.drop_streams = 1
+    analyzer = make_analyzer(openai_server)
+    prompt = analyzer._create_prompt("[0-4] Where is the button? I'm stuck\n[6-9] It says error")
+    received = []
+
+    content = analyzer._complete(prompt, received.append)
+
+    assert openai_server.dropped == 1
+    assert len(openai_server.requests) == 2
+    # on_text(None) starts every attempt, so the text of the lost attempt can be discarded
+    restarts = [index for index, text in enumerate(received) if text is None]
+    assert len(restarts) == 2 and restarts[0] == 0
+    assert "".join(received[restarts[1] + 1:]) == content
+    assert json.loads(content) == json.loads(fake_friction_analysis(prompt))
+
+
+def test_dropped_stream_yields_same_points(openai_server, make_analyzer):
+    expected = make_analyzer(openai_server).analyze_friction_points(TRANSCRIPT)
+    openai_server.drop_streams = 1
+
+    points = make_analyzer(openai_server).analyze_friction_points(TRANSCRIPT)
+
+    assert openai_server.dropped == 1
+    assert points == expected
+
+
+def test_parser_reset_discards_partial_object():
+    stream = FrictionPointStream()
+    response = json.dumps({'friction_points': [
+        {'start': 1, 'end': 2, 'category': 'error', 'severity': 'high', 'description': "Broken"}]})
+
+    assert stream.feed(response[:40]) == []
+    stream.reset()
+    points = stream.feed(response)
+
+    assert [point['description'] for point in points] == ["Broken"]
+    assert stream.rejected == 0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after({'retry-after': '2'}) == 2.0
+    assert parse_retry_after({'retry-after-ms': '250', 'retry-after': '9'}) == 0.25
+    assert parse_retry_after({'retry-after': 'soon'}) is None
+    assert parse_retry_after({}) is None
+    date = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(time.time() + 30))
+    assert 25 < parse_retry_after({'retry-after': date}) <= 30
+
+
+def test_scheduler_waits_for_retry_after():
+    scheduler = RequestScheduler('test-retry-after', max_concurrency=4, base_delay=0.001)
+    attempts = []
+
+    def request():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise RetryableError("429", retry_after=0.3)
+        return "ok"
+
+    assert scheduler.call(request) == "ok"
+    assert attempts[1] - attempts[0] >= 0.3
+    metrics = scheduler.metrics()
+    assert metrics['retries'] == 1 and metrics['throttled'] == 1
+    # Throttling halves the concurrency limit
+    assert metrics['concurrency_limit'] == 2
+
+
+def test_retry_after_pauses_other_calls():
+    scheduler = RequestScheduler('test-retry-pause', max_concurrency=4, base_delay=0.001)
+    throttled_at = []
+
+    def throttled_once():
+        if not throttled_at:
+            throttled_at.append(time.monotonic())
+            raise RetryableError("429", retry_after=0.3)
+
+    worker = threading.Thread(target=scheduler.call, args=(throttled_once,))
+    worker.start()
+    while not throttled_at:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    scheduler.call(lambda: None)
+    finished = time.monotonic()
+    worker.join()
+
+    assert finished - throttled_at[0] >= 0.3
+
+
+def test_429_is_retried_after_retry_after(openai_server, make_analyzer):
+    openai_server.rate_limit = 1
+    openai_server.retry_after = 1
+    openai_server.latency = 0.3
+    analyzer = make_analyzer(openai_server, gpt_window_seconds=10, gpt_window_overlap_seconds=0)
+
+    started = time.monotonic()
+    points = analyzer.analyze_friction_points(TRANSCRIPT)
+    elapsed = time.monotonic() - started
+
+    assert openai_server.throttled >= 1
+    assert len(points) == 3
+    assert elapsed >= 1.0
+    assert analyzer.scheduler.metrics()['throttled'] == openai_server.throttled
@@ -0,0 +1,101 @@
+# vad.py
+
+import numpy as np
+
+
+class SpeechChunk:
+    """A slice of speech packed for transcription, with the map back to the original timeline.
+
+    ``pieces`` holds (chunk_offset, source_offset, duration) triples in seconds: the
+    speech region starting at source_offset in the recording starts at chunk_offset in
+    the packed chunk audio.
+    """
+    def __init__(self, audio, pieces):
+        self.audio = audio
+        self.pieces = pieces
+
+    def to_source_time(self, t):
+        """Map a time in the chunk audio back to the original recording."""
+        for chunk_offset, source_offset, duration in reversed(self.pieces):
+            if t >= chunk_offset:
+                return source_offset + min(t - chunk_offset, duration)
+        return self.pieces[0][1]
+
+
+def detect_speech(audio, sample_rate, frame_ms=30, threshold_db=12.0, floor_db=-50.0,
+                  min_speech=0.25, min_silence=0.6, padding=0.2):
+    """Find speech regions in mono float audio with a frame-energy detector.
+
+    A frame counts as speech when its RMS level is threshold_db above the recording's
+    noise floor (its 10th-percentile frame level) and above floor_db dBFS. Regions
+    separated by less than min_silence seconds are merged, regions shorter than
+    min_speech are dropped, and the rest are padded by padding seconds on each side.
+    Returns a list of (start, end) sample indices.
+    """
+    frame_length = int(sample_rate * frame_ms / 1000)
+    frame_count = len(audio) // frame_length
+    if frame_count == 0:
+        return []
+
+    frames = np.asarray(audio[:frame_count * frame_length], dtype=np.float32).reshape(frame_count, frame_length)
+    levels = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    threshold = max(np.percentile(levels, 10) + threshold_db, floor_db)
+    voiced = np.flatnonzero(levels > threshold)
+    if len(voiced) == 0:
+        return []
+
+    # Merge voiced frames into regions, bridging pauses shorter than min_silence
+    max_gap = int(min_silence * 1000 / frame_ms)
+    regions = []
+    start = previous = voiced[0]
+    for frame in voiced[1:]:
+        if frame - previous > max_gap:
+            regions.append((start, previous + 1))
+            start = frame
+        previous = frame
+    regions.append((start, previous + 1))
+
+    min_frames = int(min_speech * 1000 / frame_ms)
+    pad = int(padding * sample_rate)
+    speech = []
+    for start, end in regions:
+        if end - start < min_frames:
+            continue
+        start = max(0, start * frame_length - pad)
+        end = min(len(audio), end * frame_length + pad)
+        if speech and start <= speech[-1][1]:
+            speech[-1] = (speech[-1][0], end)
+        else:
+            speech.append((start, end))
+    return [(int(start), int(end)) for start, end in speech]
+
+
+def pack_chunks(audio, regions, sample_rate, chunk_seconds=30.0, gap_seconds=0.3):
+    """Pack speech regions into chunks of at most chunk_seconds of audio.
+
+    Regions are concatenated in order with gap_seconds of silence between them, so
+    Whisper still sees a pause at each boundary. A region longer than chunk_seconds
+    becomes a chunk of its own. Returns a list of SpeechChunk.
+    """
+    gap = np.zeros(int(gap_seconds * sample_rate), dtype=np.float32)
+    limit = int(chunk_seconds * sample_rate)
+    chunks = []
+    parts, pieces, length = [], [], 0
+
+    def flush():
+        if parts:
+            chunks.append(SpeechChunk(np.concatenate(parts), pieces))
+
+    for start, end in regions:
+        size = end - start
+        if parts and length + len(gap) + size > limit:
+            flush()
+            parts, pieces, length = [], [], 0
+        if parts:
+            parts.append(gap)
+            length += len(gap)
+        pieces.append((length / sample_rate, start / sample_rate, size / sample_rate))
+        parts.append(np.asarray(audio[start:end], dtype=np.float32))
+        length += size
+    flush()
+    return chunks
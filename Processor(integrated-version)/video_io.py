@@ -0,0 +1,150 @@
+# video_io.py
+
+import os
+import queue
+import subprocess
+import threading
+
+
+def get_ffmpeg_exe():
+    """Return the ffmpeg binary shipped with moviepy (imageio-ffmpeg), falling back to PATH."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return 'ffmpeg'
+
+
+def read_ahead(frames, size):
+    """Iterate over frames while a background thread decodes up to size frames ahead.
+
+    Errors raised by the source are re-raised by the iterator; closing the iterator
+    early stops the background thread.
+    """
+    buffer = queue.Queue(maxsize=max(1, size))
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def decode():
+        try:
+            for frame in frames:
+                if not put(('frame', frame)):
+                    return
+            put(('done', None))
+        except BaseException as e:
+            put(('error', e))
+
+    thread = threading.Thread(target=decode, daemon=True)
+    thread.start()
+    try:
+        while True:
+            kind, value = buffer.get()
+            if kind == 'done':
+                return
+            if kind == 'error':
+                raise value
+            yield value
+    finally:
+        stop.set()
+        thread.join()
+
+
+class FFmpegFrameWriter:
+    """Encode raw frames to an H.264 file by piping them into ffmpeg."""
+    def __init__(self, output_path, fps, size, rgb=False):
+        width, height = size
+        command = [
+            get_ffmpeg_exe(), '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24' if rgb else 'bgr24',
+            '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+            '-an', '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p',
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+            output_path
+        ]
+        self.output_path = output_path
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, frame):
+        self.process.stdin.write(frame.tobytes())
+
+    def release(self):
+        self.process.stdin.close()
+        error = self.process.stderr.read()
+        if self.process.wait() != 0:
+            raise Exception(f"ffmpeg failed to encode {self.output_path}: {error.decode(errors='replace')}")
+
+
+class SegmentedVideoWriter:
+    """Write frames into fixed-length segment files, committing each finished segment.
+
+    With a FrameCheckpoint the writer continues after the segments already recorded in
+    it and commits every flushed segment back, so the pass can be resumed later.
+    """
+    def __init__(self, segment_dir, fps, size, segment_frames=None, checkpoint=None, rgb=False):
+        os.makedirs(segment_dir, exist_ok=True)
+        self.segment_dir = segment_dir
+        self.fps = fps
+        self.size = size
+        self.segment_frames = segment_frames
+        self.checkpoint = checkpoint
+        self.rgb = rgb
+        self.segments = list(checkpoint.segments) if checkpoint else []
+        self.frame_index = checkpoint.next_frame if checkpoint else 0
+        self._writer = None
+        self._segment_path = None
+        self._segment_length = 0
+
+    def write(self, frame):
+        """Append one frame, flushing the current segment once it is full."""
+        if self._writer is None:
+            self._segment_path = os.path.join(self.segment_dir, f"segment_{self.frame_index:08d}.mp4")
+            self._writer = FFmpegFrameWriter(self._segment_path, self.fps, self.size, rgb=self.rgb)
+            self._segment_length = 0
+        self._writer.write(frame)
+        self.frame_index += 1
+        self._segment_length += 1
+        if self.segment_frames and self._segment_length >= self.segment_frames:
+            self._flush()
+
+    def _flush(self):
+        if self._writer is None:
+            return
+        self._writer.release()
+        self._writer = None
+        self.segments.append(self._segment_path)
+        if self.checkpoint:
+            self.checkpoint.commit(self.segments, self.frame_index)
+
+    def close(self):
+        """Flush the last (possibly partial) segment and return all segment paths."""
+        self._flush()
+        return self.segments
+
+
+def concat_segments(segments, output_path, audio_source=None):
+    """Join segment files into output_path without re-encoding, optionally adding the audio of audio_source."""
+    if not segments:
+        raise Exception("No video segments to join.")
+    list_path = output_path + ".segments.txt"
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for segment in segments:
+            escaped = os.path.abspath(segment).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    command = [get_ffmpeg_exe(), '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', list_path]
+    if audio_source:
+        command += ['-i', audio_source, '-map', '0:v', '-map', '1:a?', '-c:a', 'aac']
+    command += ['-c:v', 'copy', output_path]
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise Exception(f"ffmpeg failed to join segments: {result.stderr.decode(errors='replace')}")
+    finally:
+        os.remove(list_path)
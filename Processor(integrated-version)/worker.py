@@ -0,0 +1,198 @@
+# worker.py
+
+import os
+os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
+import argparse
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import time
+
+from config import Config, PII_MODEL_AWS, PII_MODEL_PADDLEOCR
+
+# Command line names for the PII reduction backends
+PII_BACKENDS = {
+    'aws': PII_MODEL_AWS,
+    'paddleocr': PII_MODEL_PADDLEOCR
+}
+
+# Names of the uploaded result files, keyed by the process_file result entry
+OUTPUT_FILES = {
+    'vtt_path': 'transcription.vtt',
+    'transcript_path': 'transcript.txt',
+    'analysis_path': 'friction_points_analysis.txt',
+    'friction_points_path': 'friction_points.json',
+    'processed_video_path': 'pii_processed_video.mp4',
+    'events_path': 'events.jsonl'
+}
+
+# Per-process state, set up once by _init_worker
+_file_processor = None
+_output_prefix = None
+_resume = False
+_init_error = None
+
+
+def share_rate_limits(config, processes):
+    """Divide the outbound API rate limits of config evenly between processes.
+
+    Rate-limit schedulers only exist within one process, so each of the worker
+    processes gets an equal share of every requests-per-second and tokens-per-minute
+    limit and together they stay within the configured rates. A share is static:
+    an idle worker's share is not lent to busy ones.
+    """
+    config.gpt_requests_per_second /= processes
+    config.gpt_tokens_per_minute /= processes
+    config.rekognition_requests_per_second /= processes
+    config.comprehend_requests_per_second /= processes
+    for settings in config.llm_backends.values():
+        for limit in ('requests_per_second', 'tokens_per_minute'):
+            if settings.get(limit):
+                settings[limit] /= processes
+
+
+def _init_worker(backend, llm_backend, output_prefix, temp_root, resume, processes):
+    """Build a FileProcessor with its own temp directory for this worker process and load its models."""
+    global _file_processor, _output_prefix, _resume, _init_error
+    _output_prefix = output_prefix
+    _resume = resume
+    try:
+        from file_processor import FileProcessor
+
+        config = Config()
+        config.pii_reduction_model = PII_BACKENDS[backend]
+        config.llm_backend = llm_backend
+        share_rate_limits(config, processes)
+        worker_dir = tempfile.mkdtemp(prefix=f"worker-{os.getpid()}-", dir=temp_root)
+        _file_processor = FileProcessor(config, temp_root=worker_dir)
+    except Exception as e:
+        # Report the error per job instead of letting the pool respawn the worker forever
+        _init_error = str(e)
+        return
+    try:
+        # Load the models before the first job arrives, not during it
+        _file_processor.warmup()
+    except Exception as e:
+        # Jobs load the models on first use again, and fail with the error if it persists
+        print(f"Worker {os.getpid()}: model warmup failed: {e}", flush=True)
+
+
+def _output_key(file_key, file_name):
+    """Build the S3 key of a result file for the given upload."""
+    folder_name = os.path.splitext(file_key)[0]
+    return f"{_output_prefix}{folder_name}/{file_name}"
+
+
+def _process_job(file_key):
+    """Process one S3 key in a worker process and upload its results."""
+    if _file_processor is None:
+        return file_key, False, f"Worker initialization failed: {_init_error}"
+
+    started = time.time()
+    result = None
+    try:
+        result = _file_processor.process_file(file_key, resume=_resume)
+        for entry, file_name in OUTPUT_FILES.items():
+            source_path = result.get(entry)
+            if source_path and os.path.exists(source_path):
+                _file_processor.s3_handler.upload_file(source_path, _output_key(file_key, file_name))
+        stage_times = ", ".join(
+            f"{stage} {totals['wall_time']:.1f}s"
+            for stage, totals in result['event_summary']['stages'].items()
+            if stage in ('extract', 'convert_audio', 'transcribe', 'analyze', 'pii')
+        )
+        return file_key, True, f"done in {time.time() - started:.1f}s ({stage_times})"
+    except Exception as e:
+        # Keep the working files of a failed job only if a rerun can resume from them
+        if not _resume:
+            _file_processor.cleanup_job({'job_dir': getattr(e, 'job_dir', None)})
+        return file_key, False, str(e)
+    finally:
+        if result is not None:
+            _file_processor.cleanup_job(result)
+
+
+def _read_keys(args):
+    """Yield the S3 keys to process, lazily so stdin can be used as a job queue."""
+    for key in args.keys:
+        yield key
+    if args.keys_file:
+        source = sys.stdin if args.keys_file == '-' else open(args.keys_file, 'r', encoding='utf-8')
+        try:
+            for line in source:
+                key = line.strip()
+                if key and not key.startswith('#'):
+                    yield key
+        finally:
+            if source is not sys.stdin:
+                source.close()
+    if args.prefix is not None:
+        from s3_handler import S3Handler
+        for key in S3Handler(Config()).list_files(args.prefix):
+            if key.lower().endswith('.zip'):
+                yield key
+
+
+def parse_args(argv=None):
+    """Parse command line arguments for the headless worker."""
+    config = Config()
+    parser = argparse.ArgumentParser(description="Process uploaded recordings from S3 without the GUI.")
+    parser.add_argument('keys', nargs='*', help="S3 keys of the ZIP uploads to process")
+    parser.add_argument('--keys-file', help="file with one S3 key per line, or '-' to read keys from stdin")
+    parser.add_argument('--prefix', help="process every ZIP upload under this S3 prefix")
+    parser.add_argument('-j', '--concurrency', type=int, default=config.worker_concurrency,
+                        help="number of worker processes (default: %(default)s)")
+    parser.add_argument('--backend', choices=sorted(PII_BACKENDS), default='aws',
+                        help="PII reduction backend (default: %(default)s)")
+    parser.add_argument('--llm-backend', default=config.llm_backend,
+                        choices=['openai'] + sorted(config.llm_backends),
+                        help="LLM backend for the friction analysis (default: %(default)s)")
+    parser.add_argument('--output-prefix', default=config.output_prefix,
+                        help="S3 prefix the results are uploaded under (default: %(default)s)")
+    parser.add_argument('--temp-root', default=None, help="parent directory for the per-worker temp directories")
+    parser.add_argument('--resume', action='store_true',
+                        help="keep job state across runs and skip stages finished by a previous attempt")
+    parser.add_argument('--max-jobs-per-worker', type=int, default=None,
+                        help="restart a worker process after this many jobs")
+    args = parser.parse_args(argv)
+    if not args.keys and not args.keys_file and args.prefix is None:
+        parser.error("no jobs given: pass S3 keys, --keys-file or --prefix")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    return args
+
+
+def main(argv=None):
+    """Entry point for the headless multi-job worker."""
+    args = parse_args(argv)
+    # Spawn fresh interpreters so CUDA and model state are never shared through fork
+    context = multiprocessing.get_context('spawn')
+    temp_root = tempfile.mkdtemp(prefix="worker-pool-", dir=args.temp_root)
+    failures = 0
+    completed = 0
+    pool = context.Pool(processes=args.concurrency,
+                        initializer=_init_worker,
+                        initargs=(args.backend, args.llm_backend, args.output_prefix, temp_root, args.resume,
+                                  args.concurrency),
+                        maxtasksperchild=args.max_jobs_per_worker)
+    try:
+        for file_key, ok, message in pool.imap_unordered(_process_job, _read_keys(args)):
+            completed += 1
+            if not ok:
+                failures += 1
+            status = "OK" if ok else "FAILED"
+            print(f"[{completed}] {status} {file_key}: {message}", flush=True)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        shutil.rmtree(temp_root, ignore_errors=True)
+    print(f"Processed {completed} job(s), {failures} failed.", flush=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())